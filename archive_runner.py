@@ -0,0 +1,112 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from solver_core.queens import QueensSolver
+from solver_core.tango import TangoSolver, order_relations
+
+QUEENS = "queens"
+TANGO = "tango"
+
+
+def find_puzzles(directory: str):
+    """
+    Walk a directory of saved boards and group the .npy files into puzzles
+    queens puzzles are <prefix>queens.npy / <prefix>colors.npy pairs as written by OnlineConnectorQueens,
+    tango puzzles are the board / vertical / horizontal triples written by TangoConnector.save_boards
+    :param directory: root of the archive
+    :return: list of (game, name, paths) tasks, paths are the board files in solver order
+    """
+    tasks = []
+    for root, _, files in os.walk(directory):
+        files = set(files)
+        for file_name in sorted(files):
+            if not file_name.endswith(".npy"):
+                continue
+            stem = file_name[:-len(".npy")]
+
+            if stem.endswith("queens") and stem[:-len("queens")] + "colors.npy" in files:
+                colors_name = stem[:-len("queens")] + "colors.npy"
+                # harder_queens / harder_colors is the puzzle harder
+                puzzle_name = stem[:-len("queens")].rstrip("_") or stem
+                tasks.append((QUEENS, os.path.join(root, puzzle_name),
+                              (os.path.join(root, colors_name), os.path.join(root, file_name))))
+
+            elif "vertical" in stem and stem.replace("vertical", "horizontal") + ".npy" in files:
+                horizontal_name = stem.replace("vertical", "horizontal") + ".npy"
+                # interesting_example_vertical goes with interesting_example, vertical_board with tango_board
+                for board_stem in (stem.replace("_vertical", ""), stem.replace("vertical", "tango")):
+                    if board_stem != stem and board_stem + ".npy" in files:
+                        tasks.append((TANGO, os.path.join(root, board_stem),
+                                      (os.path.join(root, board_stem + ".npy"), os.path.join(root, file_name),
+                                       os.path.join(root, horizontal_name))))
+                        break
+    return tasks
+
+
+def solve_task(task):
+    """
+    Load and solve one puzzle
+    :param task: (game, name, paths) as returned by find_puzzles
+    :return: a json serialisable result
+    """
+    game, name, paths = task
+    arrays = [np.load(path) for path in paths]
+    start = time.perf_counter()
+    # the solvers print their progress, keep the workers quiet
+    with contextlib.redirect_stdout(io.StringIO()):
+        if game == QUEENS:
+            solver = QueensSolver(*arrays)
+            success = solver.solve()
+            solution = solver.get_queens()
+        else:
+            board, first, second = arrays
+            solver = TangoSolver(board, *order_relations(board, first, second))
+            success = solver.solve()
+            solution = solver.get_tango_board()
+
+    return {"game": game, "name": name, "success": bool(success), "time": time.perf_counter() - start,
+            "iterations": solver.nodes_visited, "solution": solution.tolist()}
+
+
+def _warm_worker():
+    # build the pattern tables once per worker instead of once per chunk
+    TangoSolver(np.zeros((6, 6), dtype=np.int8), np.zeros((6, 5), dtype=np.int8),
+                np.zeros((5, 6), dtype=np.int8))
+
+
+def run_archive(directory: str, results_file: str, processes: int | None = None, chunk_size: int = 16):
+    """
+    Solve every puzzle of an archive on a process pool and stream one json line per puzzle
+    :param directory: root of the archive
+    :param results_file: path of the json lines output
+    :param processes: number of workers, defaults to the number of cores
+    :param chunk_size: puzzles sent to a worker at once
+    :return: number of puzzles solved and number of puzzles found
+    """
+    tasks = find_puzzles(directory)
+    num_solved = 0
+    with Pool(processes, initializer=_warm_worker) as pool, open(results_file, "w") as results:
+        for result in pool.imap_unordered(solve_task, tasks, chunksize=chunk_size):
+            num_solved += result["success"]
+            results.write(json.dumps(result) + "\n")
+    return num_solved, len(tasks)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve every saved board of an archive directory")
+    parser.add_argument("directory")
+    parser.add_argument("--results", default="results.jsonl")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    solved, found = run_archive(args.directory, args.results, args.processes, args.chunk_size)
+    print(f"solved {solved}/{found} puzzles in {time.perf_counter() - start:.2f}s")
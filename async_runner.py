@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import os
+import time
+
+import dotenv
+
+from archive_runner import QUEENS, TANGO
+from browser_session import BrowserSessionPool
+from online_connector_queens import OnlineConnectorQueens
+from puzzle_store import open_store
+from solver_core.enums import SquareState
+from solver_core.queens import BitboardQueensSolver
+from solver_core.tango import TangoSolver
+from tango_connector import TangoConnector
+
+QUEEN_CLICKS = 2
+
+
+def _solve_queens(connector: OnlineConnectorQueens, emit):
+    """
+    The bitboard solver finishes in microseconds, the whole solution is emitted at once
+    """
+    solver = BitboardQueensSolver(connector.get_colors(), connector.get_queens())
+    if not solver.solve():
+        return False
+    emit([((row, col), QUEEN_CLICKS) for row, col in zip(*((solver.get_queens() == SquareState.Queen.value)
+                                                         .nonzero()))])
+    return True
+
+
+def _solve_tango(connector: TangoConnector, emit):
+    """
+    The propagation deductions are emitted before the search starts
+    """
+    # the solver names the relations after the edge, the connector after the neighbour
+    solver = TangoSolver(connector.tango_board, connector.get_horizontal_relations(),
+                         connector.get_vertical_relations())
+
+    def on_forced(cells):
+        emit([(cell, connector.CLICKS_PER_SYMBOL[value]) for cell, value in cells])
+
+    return solver.solve(on_forced=on_forced)
+
+
+GAMES = {
+    QUEENS: (OnlineConnectorQueens, _solve_queens, lambda connector: (connector.get_colors(), connector.get_queens())),
+    # puzzles are archived in solver order
+    TANGO: (TangoConnector, _solve_tango, lambda connector: (connector.tango_board,
+                                                             connector.get_horizontal_relations(),
+                                                             connector.get_vertical_relations())),
+}
+
+
+async def archive_writer(archive_queue: asyncio.Queue, store_prefix: str):
+    """
+    Append the extracted puzzles to the puzzle stores off the critical path, stops on None
+    """
+    # (game, shape) to its open store, the key index is built once per store
+    stores = {}
+    while (item := await archive_queue.get()) is not None:
+        game, key, arrays = item
+
+        def write():
+            store_key = (game, arrays[0].shape)
+            if store_key not in stores:
+                stores[store_key] = open_store(store_prefix, *store_key)
+            # a rerun on the same day keeps the first capture
+            if key not in stores[store_key]:
+                stores[store_key].append(key, *arrays)
+
+        await asyncio.to_thread(write)
+
+
+async def play_game(game: str, pool: BrowserSessionPool, archive_queue: asyncio.Queue, key: str,
+                    move_mode: str = 'script'):
+    """
+    Open, extract, solve and click one game, clicks start as soon as the solver emits cells
+    :return: whether the game was solved and the seconds it took
+    """
+    connector_class, solve, archive_arrays = GAMES[game]
+    start = time.perf_counter()
+    session = await asyncio.to_thread(pool.acquire)
+    try:
+        connector = await asyncio.to_thread(connector_class, pool.path_to_driver, session=session)
+        archive_queue.put_nowait((game, key, tuple(array.copy() for array in archive_arrays(connector))))
+
+        loop = asyncio.get_running_loop()
+        moves = asyncio.Queue()
+
+        def emit(cells):
+            loop.call_soon_threadsafe(moves.put_nowait, cells)
+
+        def solve_and_close():
+            try:
+                return solve(connector, emit)
+            finally:
+                emit(None)
+
+        solved = asyncio.ensure_future(asyncio.to_thread(solve_and_close))
+        while (cells := await moves.get()) is not None:
+            # take everything emitted while the previous batch was being clicked
+            while not moves.empty():
+                more_cells = moves.get_nowait()
+                if more_cells is None:
+                    moves.put_nowait(None)
+                    break
+                cells = cells + more_cells
+            await asyncio.to_thread(connector.submit_moves, cells, move_mode)
+
+        return await solved, time.perf_counter() - start
+    finally:
+        pool.release(session)
+
+
+async def run(path_to_driver, store_prefix: str = "archive", headless: bool = True, move_mode: str = 'script'):
+    """
+    Play Queens and Tango concurrently, each in its own browser
+    :param headless: hide the browsers, like main
+    """
+    pool = BrowserSessionPool(path_to_driver, size=len(GAMES), headless=headless)
+    archive_queue = asyncio.Queue()
+    writer = asyncio.create_task(archive_writer(archive_queue, store_prefix))
+    key = datetime.date.today().isoformat()
+    try:
+        results = await asyncio.gather(*(play_game(game, pool, archive_queue, key, move_mode) for game in GAMES))
+    finally:
+        archive_queue.put_nowait(None)
+        await writer
+    for game, (solved, elapsed) in zip(GAMES, results):
+        print("{} {} in {:.3f}s".format(game, "solved" if solved else "not solved", elapsed))
+    return pool
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    # headless unless SHOW_BROWSER is set, like main
+    browser_pool = asyncio.run(run(os.getenv('PATH_TO_GECKODRIVER'), headless=not os.getenv('SHOW_BROWSER')))
+    browser_pool.close()
@@ -0,0 +1,210 @@
+import argparse
+import time
+
+import numpy as np
+
+from solver_core.enums import SquareState, TangoBoardStates, EqualityStates
+from solver_core.queens import BitboardQueensSolver
+from solver_core.tango import TangoSolver, line_patterns
+
+
+def _pattern_table(length: int):
+    """
+    :return: the valid line patterns as a (num_patterns, length) array of sun/moon values
+    """
+    patterns = np.array(line_patterns(length), dtype=np.int64)
+    bits = (patterns[:, None] >> np.arange(length)) & 1
+    return np.where(bits == 1, TangoBoardStates.Sun.value, TangoBoardStates.Moon.value).astype(np.int8)
+
+
+def _relation_compatibility(relations: np.ndarray, table: np.ndarray):
+    """
+    :param relations: (N, num_lines, length - 1) relations between consecutive cells of each line
+    :param table: (num_patterns, length) valid line patterns
+    :return: (N, num_lines, num_patterns) mask of the patterns allowed by the relations of each line
+    """
+    same = table[:, 1:] == table[:, :-1]
+    relations = relations[:, :, None, :]
+    allowed = ((relations == EqualityStates.Free.value) | ((relations == EqualityStates.Equal.value) & same) |
+               ((relations == EqualityStates.NotEqual.value) & ~same))
+    return np.all(allowed, axis=-1)
+
+
+def _deduce_lines(lines: np.ndarray, relation_compatibility: np.ndarray, table: np.ndarray):
+    """
+    Fill in place the cells shared by every compatible pattern of every line
+    :param lines: (N, num_lines, length) view on the boards
+    :return: (N,) mask of the boards with a line that has no compatible pattern
+    """
+    known = lines[:, :, None, :]
+    compatible = relation_compatibility & np.all((known == TangoBoardStates.Empty.value) | (known == table), axis=-1)
+    num_compatible = compatible.sum(axis=-1)
+    num_suns = compatible.astype(np.int32) @ (table == TangoBoardStates.Sun.value).astype(np.int32)
+
+    has_pattern = (num_compatible > 0)[..., None]
+    empty = lines == TangoBoardStates.Empty.value
+    lines[empty & has_pattern & (num_suns == num_compatible[..., None])] = TangoBoardStates.Sun.value
+    lines[empty & has_pattern & (num_suns == 0)] = TangoBoardStates.Moon.value
+    return np.any(num_compatible == 0, axis=1)
+
+
+def solve_tango_batch(boards: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+    """
+    Solve a stack of Tango boards, the line rules run on the whole stack at once and only
+    the boards they cannot finish go through TangoSolver
+    :param boards: (N, H, W) boards
+    :param vertical_relations: (N, H, W - 1) relations between horizontally adjacent cells
+    :param horizontal_relations: (N, H - 1, W) relations between vertically adjacent cells
+    :return: the (N, H, W) solved boards and the (N,) mask of the solved ones
+    """
+    solved = np.array(boards, dtype=np.int8)
+    vertical_relations = np.asarray(vertical_relations, dtype=np.int8)
+    horizontal_relations = np.asarray(horizontal_relations, dtype=np.int8)
+    _, n_rows, n_cols = solved.shape
+
+    row_table = _pattern_table(n_cols)
+    col_table = _pattern_table(n_rows)
+    row_compatibility = _relation_compatibility(vertical_relations, row_table)
+    col_compatibility = _relation_compatibility(horizontal_relations.transpose(0, 2, 1), col_table)
+
+    contradiction = np.zeros(len(solved), dtype=bool)
+    while True:
+        num_empty = np.count_nonzero(solved == TangoBoardStates.Empty.value)
+        contradiction |= _deduce_lines(solved, row_compatibility, row_table)
+        contradiction |= _deduce_lines(solved.transpose(0, 2, 1), col_compatibility, col_table)
+        if np.count_nonzero(solved == TangoBoardStates.Empty.value) == num_empty:
+            break
+
+    success = ~contradiction & ~np.any(solved == TangoBoardStates.Empty.value, axis=(1, 2))
+    # the few boards line logic cannot finish are searched one by one
+    for index in np.flatnonzero(~success):
+        solver = TangoSolver(boards[index], vertical_relations[index], horizontal_relations[index])
+        if solver.solve():
+            solved[index] = solver.get_tango_board()
+            success[index] = True
+    return solved, success
+
+
+def _attacked(queens: np.ndarray):
+    """
+    :param queens: (N, H, W) mask of the queens
+    :return: (N, H, W) mask of the squares sharing a row, column or corner with a queen
+    """
+    attacked = np.any(queens, axis=2)[:, :, None] | np.any(queens, axis=1)[:, None, :]
+    padded = np.pad(queens, ((0, 0), (1, 1), (1, 1)))
+    height, width = queens.shape[1:]
+    for row_shift in (0, 1, 2):
+        for col_shift in (0, 1, 2):
+            attacked = attacked | padded[:, row_shift:row_shift + height, col_shift:col_shift + width]
+    return attacked
+
+
+def _touching(queens: np.ndarray):
+    """
+    :return: (N,) mask of the boards where two queens share a row, column or corner
+    """
+    touching = np.any(np.count_nonzero(queens, axis=1) > 1, axis=1) | np.any(np.count_nonzero(queens, axis=2) > 1,
+                                                                              axis=1)
+    touching |= np.any(queens[:, 1:, 1:] & queens[:, :-1, :-1], axis=(1, 2))
+    touching |= np.any(queens[:, 1:, :-1] & queens[:, :-1, 1:], axis=(1, 2))
+    return touching
+
+
+def solve_queens_batch(colors: np.ndarray, queens: np.ndarray | None = None):
+    """
+    Solve a stack of Queens boards, the elimination rules run on the whole stack at once and only
+    the boards they cannot finish go through BitboardQueensSolver
+    :param colors: (N, H, W) color regions, labelled with small non negative ints
+    :param queens: (N, H, W) preplaced queens, None for empty boards
+    :return: the (N, H, W) solved queens boards and the (N,) mask of the solved ones
+    """
+    colors = np.asarray(colors)
+    if queens is None:
+        queens = np.zeros(colors.shape, dtype=int)
+    num_boards, n_rows, _ = colors.shape
+
+    # one hot regions (N, K, H, W)
+    regions = colors[:, None, :, :] == np.arange(colors.max() + 1)[None, :, None, None]
+    present = np.any(regions, axis=(2, 3))
+
+    queen = queens == SquareState.Queen.value
+    contradiction = _touching(queen)
+    free = ~_attacked(queen) & ~queen
+
+    while True:
+        previous_free = free.copy()
+        done = np.any(regions & queen[:, None], axis=(2, 3))
+        color_free = regions & free[:, None]
+
+        # a color with a single free square gets its queen
+        single = (np.count_nonzero(color_free, axis=(2, 3)) == 1) & ~done
+        new_queens = np.any(color_free & single[:, :, None, None], axis=1)
+        if np.any(new_queens):
+            queen |= new_queens
+            contradiction |= _touching(queen)
+            free &= ~_attacked(queen) & ~queen
+            color_free = regions & free[:, None]
+
+        # a color confined to one row or column takes it, and a row or column
+        # only one color can use confines that color
+        for line_axis, other_axis in ((2, 3), (3, 2)):
+            color_lines = np.any(color_free, axis=other_axis)
+            confined = color_lines & (np.count_nonzero(color_lines, axis=2) == 1)[:, :, None]
+            confined_lines = np.expand_dims(confined, other_axis)
+            free &= ~np.any(confined_lines & ~regions, axis=1)
+
+            num_color_line = np.count_nonzero(color_free, axis=other_axis)
+            num_line = np.count_nonzero(free, axis=other_axis - 1)[:, None, :]
+            owned = (num_color_line == num_line) & (num_line > 0)
+            owns_a_line = np.any(owned, axis=2)[:, :, None, None]
+            free &= ~np.any(regions & owns_a_line & ~np.expand_dims(owned, other_axis), axis=1)
+
+        done = np.any(regions & queen[:, None], axis=(2, 3))
+        contradiction |= np.any(present & ~done & ~np.any(regions & free[:, None], axis=(2, 3)), axis=1)
+        if np.array_equal(free, previous_free):
+            break
+
+    solved = np.where(queen, SquareState.Queen.value, SquareState.Occupied.value)
+    success = ~contradiction & (np.count_nonzero(queen, axis=(1, 2)) == n_rows)
+    # the few boards the rules cannot finish are searched one by one
+    for index in np.flatnonzero(~success):
+        solver = BitboardQueensSolver(colors[index], queens[index])
+        if solver.solve():
+            solved[index] = solver.get_queens()
+            success[index] = True
+    return solved, success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve stacked boards saved as .npy files")
+    subparsers = parser.add_subparsers(dest="game", required=True)
+    tango_parser = subparsers.add_parser("tango")
+    tango_parser.add_argument("boards")
+    tango_parser.add_argument("vertical_relations")
+    tango_parser.add_argument("horizontal_relations")
+    queens_parser = subparsers.add_parser("queens")
+    queens_parser.add_argument("colors")
+    queens_parser.add_argument("queens", nargs="?")
+    store_parser = subparsers.add_parser("store")
+    store_parser.add_argument("path")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.game == "store":
+        from puzzle_store import PuzzleStore
+        from archive_runner import QUEENS
+
+        # the memmap fields are sliced without loading the loose files
+        store = PuzzleStore(args.path)
+        if store.game == QUEENS:
+            _, solved_mask = solve_queens_batch(store.field("colors"), store.field("queens"))
+        else:
+            _, solved_mask = solve_tango_batch(store.field("board"), store.field("vertical_relations"),
+                                               store.field("horizontal_relations"))
+    elif args.game == "tango":
+        _, solved_mask = solve_tango_batch(np.load(args.boards), np.load(args.vertical_relations),
+                                           np.load(args.horizontal_relations))
+    else:
+        _, solved_mask = solve_queens_batch(np.load(args.colors), None if args.queens is None else np.load(args.queens))
+    elapsed = time.perf_counter() - start
+    print(f"solved {solved_mask.sum()}/{len(solved_mask)} boards in {elapsed:.2f}s")
@@ -0,0 +1,153 @@
+import numpy as np
+
+from solver_core.enums import SquareState, TangoBoardStates, EqualityStates
+from solver_core.queens import DancingLinksQueensSolver
+from solver_core.tango import TangoSolver, line_patterns
+
+NEIGHBOURS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+def _queen_layout(size: int, rng: np.random.Generator):
+    """
+    :return: for every row the column of its queen, no two queens touching
+    """
+    while True:
+        columns = rng.permutation(size)
+        if np.all(np.abs(np.diff(columns)) > 1):
+            return columns
+
+
+def _grow_regions(size: int, columns: np.ndarray, rng: np.random.Generator):
+    """
+    Grow one region around every queen, a random frontier cell is annexed at every step
+    regions grow at random rates, the small regions they leave are what makes a solution unique
+    """
+    colors = np.full((size, size), -1)
+    colors[np.arange(size), columns] = np.arange(size)
+    growth_rates = rng.exponential(size=size)
+    frontier = [((row + d_row, col + d_col), row) for row, col in enumerate(columns) for d_row, d_col in NEIGHBOURS]
+    while frontier:
+        weights = growth_rates[[color for _, color in frontier]]
+        (row, col), color = frontier.pop(rng.choice(len(frontier), p=weights / weights.sum()))
+        if not (0 <= row < size and 0 <= col < size) or colors[row, col] >= 0:
+            continue
+        colors[row, col] = color
+        frontier.extend(((row + d_row, col + d_col), color) for d_row, d_col in NEIGHBOURS)
+    return colors
+
+
+def _is_connected(mask: np.ndarray):
+    cells = list(zip(*np.nonzero(mask)))
+    if not cells:
+        return False
+    seen = {cells[0]}
+    stack = [cells[0]]
+    while stack:
+        row, col = stack.pop()
+        for d_row, d_col in NEIGHBOURS:
+            neighbour = (row + d_row, col + d_col)
+            if neighbour not in seen and 0 <= neighbour[0] < mask.shape[0] and 0 <= neighbour[1] < mask.shape[1] \
+                    and mask[neighbour]:
+                seen.add(neighbour)
+                stack.append(neighbour)
+    return len(seen) == len(cells)
+
+
+def _break_solution(colors: np.ndarray, solution: np.ndarray, other: np.ndarray, rng: np.random.Generator):
+    """
+    Hand a queen square of the other solution to a neighbouring region, the regions stay connected
+    and keep the queen of solution
+    :return: False if no square can be moved
+    """
+    size = colors.shape[0]
+    candidates = np.argwhere((other == SquareState.Queen.value) & (solution != SquareState.Queen.value))
+    for row, col in candidates[rng.permutation(len(candidates))]:
+        color = colors[row, col]
+        remaining = colors == color
+        remaining[row, col] = False
+        if not _is_connected(remaining):
+            continue
+        neighbour_colors = {colors[row + d_row, col + d_col] for d_row, d_col in NEIGHBOURS
+                            if 0 <= row + d_row < size and 0 <= col + d_col < size} - {color}
+        if neighbour_colors:
+            colors[row, col] = rng.choice(sorted(neighbour_colors))
+            return True
+    return False
+
+
+def queens_puzzle(size: int, seed: int, max_repairs: int = 50):
+    """
+    Random connected color regions with a unique solution, regions are grown around a random queen layout
+    then squares of the other solutions are moved to a neighbouring region until only the layout is left
+    :param size: number of rows, columns and colors
+    :return: the colors and the solution queens board
+    """
+    rng = np.random.default_rng(seed)
+    while True:
+        columns = _queen_layout(size, rng)
+        colors = _grow_regions(size, columns, rng)
+        solution = np.full((size, size), SquareState.Occupied.value)
+        solution[np.arange(size), columns] = SquareState.Queen.value
+
+        for _ in range(max_repairs):
+            solver = DancingLinksQueensSolver(colors, np.zeros((size, size), dtype=int))
+            if solver.count_solutions(2) == 1:
+                return colors, solution
+            other = next(queens for queens in solver.get_solutions() if not np.array_equal(queens, solution))
+            if not _break_solution(colors, solution, other, rng):
+                break
+
+
+def _tango_solution(size: int, rng: np.random.Generator):
+    """
+    :return: a random full board, rows are drawn from the valid line patterns and the columns are kept valid
+    """
+    patterns = list(line_patterns(size))
+    rows = []
+
+    def columns_valid(board_rows):
+        board = np.array(board_rows)
+        suns = board.sum(axis=0)
+        if np.any(suns > size // 2) or np.any(len(board_rows) - suns > size // 2):
+            return False
+        return len(board_rows) < 3 or not np.any((board[-1] == board[-2]) & (board[-2] == board[-3]))
+
+    def extend():
+        if len(rows) == size:
+            return True
+        for pattern_index in rng.permutation(len(patterns)):
+            rows.append([(patterns[pattern_index] >> col) & 1 for col in range(size)])
+            if columns_valid(rows) and extend():
+                return True
+            rows.pop()
+        return False
+
+    extend()
+    return np.where(np.array(rows) == 1, TangoBoardStates.Sun.value, TangoBoardStates.Moon.value).astype(np.int8)
+
+
+def tango_puzzle(size: int, seed: int, relation_density: float = 0.25):
+    """
+    A Tango board with relation edges and a unique solution, a random share of the edges of a random
+    solution is kept then the givens are removed in random order while the solution stays unique
+    :param size: even board side
+    :param relation_density: share of the edges that get a relation
+    :return: the board, the relations between horizontal and between vertical neighbours, the solution
+    """
+    rng = np.random.default_rng(seed)
+    solution = _tango_solution(size, rng)
+    vertical_relations = np.where(rng.random((size, size - 1)) < relation_density,
+                                  np.where(solution[:, 1:] == solution[:, :-1], EqualityStates.Equal.value,
+                                           EqualityStates.NotEqual.value), EqualityStates.Free.value).astype(np.int8)
+    horizontal_relations = np.where(rng.random((size - 1, size)) < relation_density,
+                                    np.where(solution[1:] == solution[:-1], EqualityStates.Equal.value,
+                                             EqualityStates.NotEqual.value), EqualityStates.Free.value).astype(np.int8)
+
+    board = solution.copy()
+    for index in rng.permutation(size * size):
+        given = board.flat[index]
+        board.flat[index] = TangoBoardStates.Empty.value
+        if TangoSolver(board, vertical_relations, horizontal_relations).count_solutions(2) != 1:
+            board.flat[index] = given
+    return board, vertical_relations, horizontal_relations, solution
+
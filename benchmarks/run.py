@@ -0,0 +1,213 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO
+from benchmarks.generators import queens_puzzle, tango_puzzle
+from difficulty import grade
+from solver_core.enums import SquareState
+from solver_core.queens import QueensSolver, BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver
+from solver_core.tango import TangoSolver, SatTangoSolver
+
+RESULTS_FILE = os.path.join(os.path.dirname(__file__), "results.jsonl")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "cache")
+
+
+def _run_queens_solver(solver):
+    return (solver.get_queens() if solver.solve() else None), solver.nodes_visited
+
+
+def _run_tango_solver(solver):
+    return (solver.get_tango_board() if solver.solve() else None), solver.nodes_visited
+
+
+# engine name to function of the puzzle inputs returning the solution, None on failure, and the search nodes
+ENGINES = {
+    QUEENS: {
+        "QueensSolver": lambda colors, queens: _run_queens_solver(QueensSolver(colors, queens.copy())),
+        "BitboardQueensSolver": lambda colors, queens: _run_queens_solver(BitboardQueensSolver(colors, queens)),
+        "DancingLinksQueensSolver": lambda colors, queens: _run_queens_solver(
+            DancingLinksQueensSolver(colors, queens)),
+        "SatQueensSolver": lambda colors, queens: _run_queens_solver(SatQueensSolver(colors, queens)),
+    },
+    TANGO: {
+        "TangoSolver": lambda board, vertical_relations, horizontal_relations: _run_tango_solver(
+            TangoSolver(board, vertical_relations, horizontal_relations)),
+        "SatTangoSolver": lambda board, vertical_relations, horizontal_relations: _run_tango_solver(
+            SatTangoSolver(board, vertical_relations, horizontal_relations)),
+    },
+}
+
+
+def load_puzzles(game: str, size: int, count: int, seed: int = 0, cache_dir: str | None = CACHE_DIR):
+    """
+    Generate the puzzles of one size, or load them from cache_dir, generating large unique boards takes seconds
+    :return: the stacked puzzle inputs and the stacked solutions
+    """
+    path = None if cache_dir is None else os.path.join(cache_dir, "{}_{}_{}_{}.npz".format(game, size, count, seed))
+    if path is not None and os.path.exists(path):
+        with np.load(path) as cached:
+            arrays = [cached["arr_{}".format(index)] for index in range(len(cached.files))]
+        return arrays[:-1], arrays[-1]
+
+    puzzles = []
+    for index in range(count):
+        # seeds are spread so sizes and counts do not share puzzles
+        puzzle_seed = seed * 1_000_003 + size * 1_009 + index
+        if game == QUEENS:
+            colors, solution = queens_puzzle(size, puzzle_seed)
+            puzzles.append((colors, np.zeros((size, size), dtype=int), solution))
+        else:
+            puzzles.append(tango_puzzle(size, puzzle_seed))
+    arrays = [np.stack(array) for array in zip(*puzzles)]
+    if path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(path, *arrays)
+    return arrays[:-1], arrays[-1]
+
+
+def _is_solution(game: str, result: np.ndarray | None, solution: np.ndarray):
+    if result is None:
+        return False
+    if game == QUEENS:
+        return np.array_equal(result == SquareState.Queen.value, solution == SquareState.Queen.value)
+    return np.array_equal(result, solution)
+
+
+def benchmark_engine(game: str, engine: str, inputs: list, solutions: np.ndarray, repeats: int = 3):
+    """
+    Time an engine on every puzzle, the best of repeats is kept per puzzle, then measure the peak
+    traced allocations in a separate pass so tracing does not slow the timings down
+    :return: a json serialisable result row
+    """
+    run = ENGINES[game][engine]
+    times = []
+    nodes = []
+    num_solved = 0
+    # QueensSolver prints its progress
+    with contextlib.redirect_stdout(io.StringIO()):
+        for puzzle_index in range(len(solutions)):
+            puzzle = [array[puzzle_index].copy() for array in inputs]
+            best = None
+            for _ in range(repeats):
+                arguments = [array.copy() for array in puzzle]
+                start = time.perf_counter()
+                result, num_nodes = run(*arguments)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            times.append(best)
+            nodes.append(num_nodes)
+            num_solved += _is_solution(game, result, solutions[puzzle_index])
+
+        peaks = []
+        tracemalloc.start()
+        for puzzle_index in range(len(solutions)):
+            arguments = [array[puzzle_index].copy() for array in inputs]
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            run(*arguments)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+    times = np.array(times)
+    return {"game": game, "size": int(solutions.shape[1]), "engine": engine, "count": len(times),
+            "median_ms": float(np.median(times) * 1e3), "p99_ms": float(np.percentile(times, 99) * 1e3),
+            "mean_peak_kib": float(np.mean(peaks) / 1024), "solve_rate": num_solved / len(times),
+            "median_nodes": float(np.median(nodes))}
+
+
+def _git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit.strip(), bool(dirty.strip())
+
+
+def save_results(rows: list, results_file: str = RESULTS_FILE):
+    """
+    Append one record per run, keyed by the git commit the benchmark ran on
+    """
+    commit, dirty = _git_commit()
+    record = {"commit": commit, "dirty": dirty, "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "results": rows}
+    with open(results_file, "a") as results:
+        results.write(json.dumps(record) + "\n")
+    return record
+
+
+def previous_record(commit: str, results_file: str = RESULTS_FILE):
+    """
+    :return: the last saved record of another commit, None if there is none
+    """
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file) as results:
+        for line in results:
+            record = json.loads(line)
+            if record["commit"] != commit:
+                previous = record
+    return previous
+
+
+def format_rows(rows: list, previous: dict | None = None):
+    reference = {} if previous is None else {(row["game"], row["size"], row["engine"]): row
+                                             for row in previous["results"]}
+    lines = ["{:6s} {:>4s} {:26s} {:>10s} {:>10s} {:>10s} {:>6s} {:>8s}".format(
+        "game", "size", "engine", "median ms", "p99 ms", "peak KiB", "solved", "vs prev")]
+    for row in rows:
+        before = reference.get((row["game"], row["size"], row["engine"]))
+        change = "" if before is None else "{:+.0%}".format(row["median_ms"] / before["median_ms"] - 1)
+        lines.append("{:6s} {:4d} {:26s} {:10.3f} {:10.3f} {:10.1f} {:6.0%} {:>8s}".format(
+            row["game"], row["size"], row["engine"], row["median_ms"], row["p99_ms"], row["mean_peak_kib"],
+            row["solve_rate"], change))
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the solvers on generated unique puzzles")
+    parser.add_argument("--queens-sizes", type=int, nargs="*", default=list(range(6, 15)))
+    parser.add_argument("--tango-sizes", type=int, nargs="*", default=[6, 8, 10])
+    parser.add_argument("--count", type=int, default=20, help="puzzles per size")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engines", nargs="*", help="engine names to run, all by default")
+    parser.add_argument("--results", default=RESULTS_FILE)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--no-cache", action="store_true", help="regenerate the puzzles")
+    args = parser.parse_args()
+
+    result_rows = []
+    for game_name, sizes in ((QUEENS, args.queens_sizes), (TANGO, args.tango_sizes)):
+        for board_size in sizes:
+            puzzle_inputs, puzzle_solutions = load_puzzles(game_name, board_size, args.count, args.seed,
+                                                           None if args.no_cache else CACHE_DIR)
+            # the share of each grade tells whether a size got easier or the engine faster
+            grades = Counter(grade(game_name, *(array[index] for array in puzzle_inputs))[1].name
+                             for index in range(len(puzzle_solutions)))
+            for engine_name in ENGINES[game_name]:
+                if args.engines and engine_name not in args.engines:
+                    continue
+                result_rows.append(benchmark_engine(game_name, engine_name, puzzle_inputs, puzzle_solutions,
+                                                    args.repeats))
+                result_rows[-1]["grades"] = dict(grades)
+                print(format_rows(result_rows[-1:]).splitlines()[-1], flush=True)
+
+    current_commit, _ = _git_commit()
+    print()
+    print(format_rows(result_rows, previous_record(current_commit, args.results)))
+    if not args.no_save:
+        save_results(result_rows, args.results)
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from selenium.webdriver.firefox.service import Service as FirefoxService
+from selenium.webdriver.support import expected_conditions as ec
+from selenium.webdriver.support.ui import WebDriverWait
+
+
+class BrowserSession:
+    """
+    One Firefox instance that is navigated from game to game instead of being relaunched
+    """
+    IFRAME_LOCATOR = (By.CLASS_NAME, "game-launch-page__iframe")
+    START_LOCATOR = (By.CLASS_NAME, "artdeco-button--primary")
+    DISMISS_LOCATOR = (By.CLASS_NAME, "artdeco-modal__dismiss")
+
+    def __init__(self, path_to_driver, headless: bool = True, full_screen: bool = True, timeout: float = 10,
+                 url_map: dict | None = None):
+        """
+        :param url_map: game url to the url actually opened, e.g. a local fixture server
+        """
+        self.timeout = timeout
+        self.game_url = None
+        self.url_map = url_map or {}
+
+        options = FirefoxOptions()
+        if headless:
+            options.add_argument("-headless")
+        if full_screen:
+            options.add_argument("--start-fullscreen")
+        else:
+            options.add_argument("--width=800")
+            options.add_argument("--height=600")
+
+        self.driver = webdriver.Firefox(service=FirefoxService(executable_path=path_to_driver), options=options)
+
+    def open_game(self, game_url: str, grid_locator: tuple):
+        """
+        Navigate to a game and return once its grid is in the page
+        :param game_url: linkedin game page
+        :param grid_locator: (By, value) of the grid element, its presence means the game is ready
+        """
+        self.driver.switch_to.default_content()
+        self.driver.get(self.url_map.get(game_url, game_url))
+        self.game_url = game_url
+
+        wait = WebDriverWait(self.driver, self.timeout)
+        wait.until(ec.frame_to_be_available_and_switch_to_it(self.IFRAME_LOCATOR))
+
+        # the start button is only there the first time the game is opened today
+        wait.until(ec.any_of(ec.presence_of_element_located(grid_locator),
+                             ec.element_to_be_clickable(self.START_LOCATOR)))
+        for button in self.driver.find_elements(*self.START_LOCATOR):
+            if button.is_displayed():
+                button.click()
+                break
+        wait.until(ec.presence_of_element_located(grid_locator))
+
+        # close the popup if it is already up, the moves are dispatched to the cells either way
+        for button in self.driver.find_elements(*self.DISMISS_LOCATOR):
+            try:
+                button.click()
+            except WebDriverException:
+                pass
+
+    def is_alive(self):
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self):
+        self.driver.quit()
+
+
+class BrowserSessionPool:
+    """
+    Keeps up to size warm browser sessions and hands them out to connectors
+    """
+
+    def __init__(self, path_to_driver, size: int = 1, headless: bool = True, full_screen: bool = True):
+        self.path_to_driver = path_to_driver
+        self.size = size
+        self.headless = headless
+        self.full_screen = full_screen
+        self._idle = queue.LifoQueue()
+        self._sessions = []
+        self._num_launching = 0
+        # games can be played from several threads at once
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float | None = None):
+        """
+        :return: an idle session, a new one while the pool is not full, otherwise waits for a release
+        dead sessions are dropped on the way and replaced by new ones
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                while not self._idle.empty():
+                    session = self._idle.get_nowait()
+                    if session.is_alive():
+                        return session
+                    self._sessions.remove(session)
+                launch = len(self._sessions) + self._num_launching < self.size
+                if launch:
+                    self._num_launching += 1
+
+            if launch:
+                break
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            session = self._idle.get(timeout=remaining)
+            if session.is_alive():
+                return session
+            # the browser died while it was idle, the next round launches its replacement
+            with self._lock:
+                self._sessions.remove(session)
+
+        # browsers are launched outside the lock so they start in parallel
+        try:
+            session = BrowserSession(self.path_to_driver, headless=self.headless, full_screen=self.full_screen)
+        finally:
+            with self._lock:
+                self._num_launching -= 1
+        with self._lock:
+            self._sessions.append(session)
+        return session
+
+    def release(self, session: BrowserSession):
+        self._idle.put(session)
+
+    @contextmanager
+    def session(self):
+        session = self.acquire()
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def close(self):
+        for session in self._sessions:
+            session.quit()
+        self._sessions = []
+        self._idle = queue.LifoQueue()
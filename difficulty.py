@@ -0,0 +1,115 @@
+import argparse
+import time
+from collections import Counter
+from enum import Enum
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO, find_puzzles
+from solver_core.queens import QueensSolver, BitboardQueensSolver
+from solver_core.tango import TangoSolver, order_relations
+
+
+class Difficulty(Enum):
+    Basic = 1
+    Intermediate = 2
+    Advanced = 3
+    Guessing = 4
+
+
+# deduce level of each grade, the weakest one that fills the board is the grade
+QUEENS_LEVELS = {Difficulty.Basic: 1, Difficulty.Intermediate: 2, Difficulty.Advanced: 3}
+TANGO_LEVELS = {Difficulty.Basic: 1, Difficulty.Advanced: 2}
+
+
+def count_queens_solutions(colors: np.ndarray, queens: np.ndarray | None = None, limit: int = 2):
+    """
+    :return: number of solutions of the board, counting stops at limit
+    """
+    queens = np.zeros(colors.shape, dtype=int) if queens is None else queens
+    return BitboardQueensSolver(colors, queens).count_solutions(limit)
+
+
+def count_tango_solutions(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray,
+                          limit: int = 2):
+    """
+    :return: number of solutions of the board, counting stops at limit
+    """
+    return TangoSolver(board, vertical_relations, horizontal_relations).count_solutions(limit)
+
+
+def grade_queens(colors: np.ndarray, queens: np.ndarray | None = None):
+    """
+    The rule sets are tried from the weakest up on the same board, stronger rules carry on from
+    what the weaker ones found
+    :return: the weakest Difficulty whose rules solve the board, Guessing if none does
+    """
+    queens = np.zeros(colors.shape, dtype=int) if queens is None else queens.copy()
+    solver = QueensSolver(colors, queens)
+    for difficulty, level in QUEENS_LEVELS.items():
+        if not solver.deduce(level):
+            break
+        if solver.is_solved():
+            return difficulty
+    return Difficulty.Guessing
+
+
+def grade_tango(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+    """
+    :return: the weakest Difficulty whose rules solve the board, Guessing if none does
+    """
+    solver = TangoSolver(board, vertical_relations, horizontal_relations)
+    for difficulty, level in TANGO_LEVELS.items():
+        if not solver.deduce(level):
+            break
+        if solver.is_solved():
+            return difficulty
+    return Difficulty.Guessing
+
+
+def grade(game: str, *arrays):
+    """
+    :param arrays: the puzzle in solver order, colors and queens or board and both relations
+    :return: the number of solutions up to 2 and the Difficulty, None unless the solution is unique
+    """
+    if game == QUEENS:
+        num_solutions = count_queens_solutions(*arrays)
+        return num_solutions, grade_queens(*arrays) if num_solutions == 1 else None
+    num_solutions = count_tango_solutions(*arrays)
+    return num_solutions, grade_tango(*arrays) if num_solutions == 1 else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check uniqueness and grade the saved boards")
+    parser.add_argument("directory", nargs="?", help="archive directory of .npy boards")
+    parser.add_argument("--store", nargs="*", default=[], help="puzzle store files")
+    parser.add_argument("--quiet", action="store_true", help="only print the totals")
+    args = parser.parse_args()
+
+    puzzles = []
+    if args.directory:
+        for game_name, name, paths in find_puzzles(args.directory):
+            arrays = [np.load(path) for path in paths]
+            if game_name == TANGO:
+                arrays = [arrays[0], *order_relations(*arrays)]
+            puzzles.append((game_name, name, arrays))
+    for store_path in args.store:
+        from puzzle_store import PuzzleStore
+
+        store = PuzzleStore(store_path)
+        for key in store.keys():
+            puzzles.append((store.game, key, list(store.get(key))))
+
+    start = time.perf_counter()
+    totals = Counter()
+    for game_name, name, arrays in puzzles:
+        count, difficulty = grade(game_name, *arrays)
+        label = "multiple solutions" if count > 1 else "no solution" if count == 0 else difficulty.name
+        totals[(game_name, label)] += 1
+        if not args.quiet:
+            print("{} {}: {}".format(game_name, name, label))
+    elapsed = time.perf_counter() - start
+
+    for (game_name, label), total in sorted(totals.items()):
+        print("{:6s} {:20s} {:6d}".format(game_name, label, total))
+    print("graded {} boards in {:.2f}s".format(len(puzzles), elapsed))
@@ -0,0 +1,324 @@
+import argparse
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from browser_session import BrowserSession
+from linkedin_connector import LinkedinGameConnector
+from online_connector_queens import OnlineConnectorQueens
+from screenshot_extractor import QUEENS_PALETTE, SUN, MOON
+from tango_connector import TangoConnector, TangoBoardStates, EqualityStates
+
+# pages of the fixture server, the game sits in an iframe like on linkedin
+SERVER_PAGE = ('<!DOCTYPE html><html><body style="margin: 0">'
+               '<iframe class="game-launch-page__iframe" src="{}" width="1000" height="1000"></iframe></body></html>')
+FRAME_PAGE = '<!DOCTYPE html><html><head><style>{}</style></head><body>{}<script>{}</script></body></html>'
+# enough layout for the cells to have a size and the grid to look like a board on a screenshot
+FRAME_STYLE = """
+    .queens-grid, .lotka-grid {display: grid; grid-template-columns: repeat(var(--cols), 48px);
+                               grid-auto-rows: 48px; width: max-content}
+    .visually-hidden {position: absolute; width: 1px; height: 1px; overflow: hidden}
+    .queens-cell-with-border {box-sizing: border-box; border: 1px solid #282828}
+    .queens-cell-with-border[aria-label^="Queen"]::after {content: ""; display: block; margin: 14px;
+                                                          height: 20px; border-radius: 50%%; background: #141414}
+    .lotka-cell {position: relative; box-sizing: border-box; border: 1px solid #dedbd6; background: #fbfaf8}
+    .lotka-cell-content-img {display: block; margin: 10px; width: 26px; height: 26px; border-radius: 50%%}
+    svg.lotka-cell-content-img[aria-label="Sun"] {background: rgb(%s)}
+    svg.lotka-cell-content-img[aria-label="Moon"] {background: rgb(%s)}
+    .lotka-cell-edge {position: absolute; width: 10px; height: 10px; z-index: 1; background: #5a544c}
+    .lotka-cell-edge--right {right: -6px; top: 18px}
+    .lotka-cell-edge--down {bottom: -6px; left: 18px}
+""" % (", ".join(map(str, SUN)), ", ".join(map(str, MOON))) + "".join(
+    ".cell-color-{} {{background: rgb({})}}".format(color, ", ".join(map(str, rgb)))
+    for color, rgb in enumerate(QUEENS_PALETTE.tolist()))
+# the cells clicked in the frame, by position among the visible cells, read back with clicked_cells
+CLICK_RECORDER = """
+    window.fixtureClicks = [];
+    document.addEventListener('click', event => {
+        const cell = event.target.closest('#queens-grid > *, .lotka-grid > *');
+        if (cell !== null) {
+            const cells = Array.from(cell.parentNode.children).filter(
+                other => !other.classList.contains('visually-hidden'));
+            window.fixtureClicks.push(cells.indexOf(cell));
+        }
+    });
+"""
+
+
+def render_queens_html(colors: np.ndarray, queens: np.ndarray):
+    """
+    :return: a queens-grid element laid out like the live game
+    """
+    squares = ['<div class="visually-hidden">Queens grid</div>']
+    for (row, col), color in np.ndenumerate(colors):
+        label = "Queen of color {}".format(color) if queens[row, col] == 1 else "Empty of color {}".format(color)
+        squares.append('<div class="queens-cell-with-border cell-color-{}" aria-label="{}, row {}, column {}"></div>'
+                       .format(color, label, row + 1, col + 1))
+    return '<div id="queens-grid" class="queens-grid" style="--rows: {}; --cols: {};">{}</div>'.format(
+        colors.shape[0], colors.shape[1], "".join(squares))
+
+
+def render_tango_html(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+    """
+    :param vertical_relations: relations between horizontally adjacent cells, as in TangoSolver
+    :param horizontal_relations: relations between vertically adjacent cells, as in TangoSolver
+    :return: a lotka-grid element laid out like the live game
+    """
+    symbols = {TangoBoardStates.Sun.value: "Sun", TangoBoardStates.Moon.value: "Moon"}
+    edge_labels = {EqualityStates.Equal.value: "Equal", EqualityStates.NotEqual.value: "Cross"}
+    cells = []
+    for (row, col), value in np.ndenumerate(board):
+        if value in symbols:
+            content = '<svg class="lotka-cell-content-img" aria-label="{}"></svg>'.format(symbols[value])
+        else:
+            content = '<span class="lotka-cell-content-img"></span>'
+        edges = []
+        if col < board.shape[1] - 1 and vertical_relations[row, col] in edge_labels:
+            edges.append('<div class="lotka-cell-edge lotka-cell-edge--right"><svg aria-label="{}"></svg></div>'
+                         .format(edge_labels[vertical_relations[row, col]]))
+        if row < board.shape[0] - 1 and horizontal_relations[row, col] in edge_labels:
+            edges.append('<div class="lotka-cell-edge lotka-cell-edge--down"><svg aria-label="{}"></svg></div>'
+                         .format(edge_labels[horizontal_relations[row, col]]))
+        cells.append('<div class="lotka-cell">{}{}</div>'.format(content, "".join(edges)))
+    return '<div class="lotka-grid" style="--rows: {}; --cols: {};">{}</div>'.format(
+        board.shape[0], board.shape[1], "".join(cells))
+
+
+@contextmanager
+def serve_fixtures(pages: dict):
+    """
+    Serve grid snapshots on a local static HTTP server, each inside an iframe like the live game
+    :param pages: game url to grid html, read on every request so the grids can be swapped between page loads
+    :return: game url to the url of its local page
+    """
+    game_urls = list(pages)
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = re.fullmatch(r'/(\d+)(/frame)?', self.path)
+            if match is None or int(match.group(1)) >= len(game_urls):
+                self.send_error(404)
+                return
+            if match.group(2):
+                body = FRAME_PAGE.format(FRAME_STYLE, pages[game_urls[int(match.group(1))]], CLICK_RECORDER)
+            else:
+                body = SERVER_PAGE.format(self.path + "/frame")
+            body = body.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        base_url = "http://127.0.0.1:{}".format(server.server_address[1])
+        yield {game_url: "{}/{}".format(base_url, index) for index, game_url in enumerate(game_urls)}
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def browser_fixture_session(pages: dict, path_to_driver, headless: bool = True):
+    """
+    A real Firefox on the fixture server, the connectors run their javascript extraction and clicks on it
+    :return: a BrowserSession to hand to the connectors
+    """
+    with serve_fixtures(pages) as url_map:
+        session = BrowserSession(path_to_driver, headless=headless, full_screen=False, url_map=url_map)
+        try:
+            yield session
+        finally:
+            session.quit()
+
+
+def clicked_cells(connector: LinkedinGameConnector):
+    """
+    :return: the cells clicked since the game page was opened, by position among the visible cells, in click order
+    """
+    return connector.driver.execute_script("return window.fixtureClicks;")
+
+
+def expected_clicks(connector: LinkedinGameConnector, solution: np.ndarray):
+    """
+    :return: the cells solve_board clicks for solution, by position among the visible cells, nothing is clicked
+    """
+    moves = []
+    connector.submit_moves = lambda planned_moves, mode='script': moves.extend(planned_moves)
+    try:
+        connector.solve_board(solution)
+    finally:
+        del connector.submit_moves
+    num_cols = _board_arrays(connector)[0].shape[1]
+    return [int(row) * num_cols + int(col) for (row, col), clicks in moves for _ in range(int(clicks))]
+
+
+def _board_arrays(connector: LinkedinGameConnector):
+    # the connector names the relations after the neighbour, the solver after the edge, so tango comes out
+    # in the order render_tango_html takes
+    if isinstance(connector, OnlineConnectorQueens):
+        return connector.colors, connector.queens
+    return connector.tango_board, connector.horizontal_equals, connector.vertical_equals
+
+
+def check_connectors(path_to_driver, sizes: list, mode: str = 'script', seed: int = 0):
+    """
+    Read random rendered boards and click a solution with the connectors' javascript in Firefox, and compare with
+    what was rendered and with the cells the solution asks for
+    :return: the differences found, empty if the connectors read and click every board right
+    """
+    generator = np.random.default_rng(seed)
+    boards = []
+    for size in sizes:
+        colors, queens = _random_queens(size, generator)
+        queens[generator.integers(size), generator.integers(size)] = 1
+        solved = np.full((size, size), 2)
+        solved[np.arange(size), generator.permutation(size)] = 1
+        boards.append((OnlineConnectorQueens, render_queens_html(colors, queens), (colors, queens), solved))
+        if size % 2 == 0:
+            board, vertical_relations, horizontal_relations = _random_tango(size, generator)
+            boards.append((TangoConnector, render_tango_html(board, vertical_relations, horizontal_relations),
+                           (board, vertical_relations, horizontal_relations), generator.choice([-1, 1], (size, size))))
+
+    failures = []
+    pages = {OnlineConnectorQueens.GAME_URL: "", TangoConnector.GAME_URL: ""}
+    with browser_fixture_session(pages, path_to_driver) as session:
+        for connector_class, html, rendered, solution in boards:
+            pages[connector_class.GAME_URL] = html
+            name = "{} {}x{}".format(connector_class.__name__, *rendered[0].shape)
+            connector = connector_class(None, session=session)
+            if not all(np.array_equal(read, expected) for read, expected in zip(_board_arrays(connector), rendered)):
+                failures.append("{}: the board was misread".format(name))
+                continue
+            expected = expected_clicks(connector, solution)
+            connector.solve_board(solution, mode=mode)
+            if clicked_cells(connector) != expected:
+                failures.append("{}: clicked {} instead of {}".format(name, clicked_cells(connector), expected))
+    return failures
+
+
+def capture_fixture(connector: LinkedinGameConnector, path: str):
+    """
+    Save the grid of a live connector so it can be served offline later, with its screenshot and the arrays the
+    connector read from the page next to it, the .png and .npz pair is what screenshot_extractor bench checks
+    """
+    grid = connector.driver.find_element(*connector.GRID_LOCATOR)
+    with open(path, "w") as fixture_file:
+        fixture_file.write(grid.get_attribute("outerHTML"))
+    base_path = os.path.splitext(path)[0]
+    with open(base_path + ".png", "wb") as screenshot_file:
+        screenshot_file.write(grid.screenshot_as_png)
+    np.savez(base_path + ".npz", *_board_arrays(connector))
+
+
+def _random_queens(size: int, rng: np.random.Generator):
+    colors = rng.integers(0, size, (size, size))
+    return colors, np.zeros((size, size), dtype=int)
+
+
+def _random_tango(size: int, rng: np.random.Generator):
+    board = rng.choice([-1, 0, 0, 1], (size, size)).astype(np.int8)
+    return (board, rng.choice([-1, 0, 0, 0, 1], (size, size - 1)).astype(np.int8),
+            rng.choice([-1, 0, 0, 0, 1], (size - 1, size)).astype(np.int8))
+
+
+def time_connector(session: BrowserSession, connector_class, solution: np.ndarray, repeats: int = 20,
+                   mode: str = 'script', extraction: str = 'dom'):
+    """
+    :param session: session of browser_fixture_session, the grid is the page it serves for the game
+    :return: median seconds to open and parse the grid and median seconds to submit the solution
+    """
+    parse_times = []
+    click_times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        connector = connector_class(None, session=session, extraction=extraction)
+        parse_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        connector.solve_board(solution, mode=mode)
+        click_times.append(time.perf_counter() - start)
+    return float(np.median(parse_times)), float(np.median(click_times))
+
+
+if __name__ == "__main__":
+    import dotenv
+
+    parser = argparse.ArgumentParser(description="Offline fixtures for the connectors")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    capture_parser = subparsers.add_parser("capture", help="save the live grid of a game")
+    capture_parser.add_argument("game", choices=("queens", "tango"))
+    capture_parser.add_argument("path")
+    check_parser = subparsers.add_parser("check", help="run the connectors' javascript in headless Firefox on "
+                                                       "rendered boards and check what they read and click")
+    check_parser.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10, 12, 14])
+    check_parser.add_argument("--mode", default="script", choices=LinkedinGameConnector.MOVE_MODES)
+    bench_parser = subparsers.add_parser("bench", help="time parsing and clicking per board size in headless Firefox")
+    bench_parser.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10, 12, 14])
+    bench_parser.add_argument("--repeats", type=int, default=20)
+    bench_parser.add_argument("--mode", default="script", choices=LinkedinGameConnector.MOVE_MODES)
+    bench_parser.add_argument("--extraction", nargs="+", default=["dom"],
+                              choices=LinkedinGameConnector.EXTRACTION_MODES)
+    bench_parser.add_argument("--fixtures", nargs="*", default=[], help="captured grids to time as well")
+    args = parser.parse_args()
+
+    dotenv.load_dotenv()
+    driver_path = os.getenv('PATH_TO_GECKODRIVER')
+    if args.command == "capture":
+        connector_type = OnlineConnectorQueens if args.game == "queens" else TangoConnector
+        capture_fixture(connector_type(driver_path), args.path)
+    elif args.command == "check":
+        differences = check_connectors(driver_path, args.sizes, args.mode)
+        print("\n".join(differences) or "the connectors read and clicked every board right")
+    else:
+        generator = np.random.default_rng(0)
+        # the server reads the pages on every load, each board is swapped in before it is timed
+        fixture_pages = {OnlineConnectorQueens.GAME_URL: "", TangoConnector.GAME_URL: ""}
+        with browser_fixture_session(fixture_pages, driver_path) as fixture_session:
+            print("game    size  extraction  parse ms  click ms")
+            for size in args.sizes:
+                colors, queens = _random_queens(size, generator)
+                fixture_pages[OnlineConnectorQueens.GAME_URL] = render_queens_html(colors, queens)
+                solved = np.full((size, size), 2)
+                solved[np.arange(size), generator.permutation(size)] = 1
+                for extraction in args.extraction:
+                    timings = time_connector(fixture_session, OnlineConnectorQueens, solved, args.repeats, args.mode,
+                                             extraction)
+                    print("queens  {:4d}  {:10s}  {:8.2f}  {:8.2f}".format(size, extraction,
+                                                                          *(timing * 1e3 for timing in timings)))
+            # a tango line holds as many suns as moons
+            for size in (size for size in args.sizes if size % 2 == 0):
+                fixture_pages[TangoConnector.GAME_URL] = render_tango_html(*_random_tango(size, generator))
+                solved = generator.choice([-1, 1], (size, size))
+                for extraction in args.extraction:
+                    timings = time_connector(fixture_session, TangoConnector, solved, args.repeats, args.mode,
+                                             extraction)
+                    print("tango   {:4d}  {:10s}  {:8.2f}  {:8.2f}".format(size, extraction,
+                                                                          *(timing * 1e3 for timing in timings)))
+            for path in args.fixtures:
+                with open(path) as fixture_file:
+                    html = fixture_file.read()
+                connector_type = OnlineConnectorQueens if 'queens-grid' in html else TangoConnector
+                fixture_pages[connector_type.GAME_URL] = html
+                shape = _board_arrays(connector_type(None, session=fixture_session))[0].shape
+                if connector_type is OnlineConnectorQueens:
+                    solution = np.full(shape, 2)
+                    solution[np.arange(shape[0]), generator.permutation(shape[1])] = 1
+                else:
+                    solution = generator.choice([-1, 1], shape)
+                for extraction in args.extraction:
+                    timings = time_connector(fixture_session, connector_type, solution, args.repeats, args.mode,
+                                             extraction)
+                    print("{}  {:10s}  {:8.2f}  {:8.2f}".format(path, extraction,
+                                                                *(timing * 1e3 for timing in timings)))
@@ -1,44 +1,53 @@
-import re
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
-from bs4 import BeautifulSoup
-import numpy as np
-from queenssolver import QueensSolver
+from selenium.webdriver.common.action_chains import ActionChains
 from abc import ABC, abstractmethod
 
-class LinkedinGameConnector(ABC):
-    def __init__(self, path_to_driver, game_url, full_screen = True):
-        # setup the page go to linkedin
-        options = FirefoxOptions()
-
-        if full_screen:
-            options.add_argument("--start-fullscreen")
-        else:
-            options.add_argument("--width=800")
-            options.add_argument("--height=600")
+from browser_session import BrowserSession
 
-        self.driver = webdriver.Firefox(service=FirefoxService(executable_path=path_to_driver),
-                                        options=options)
-        self.driver.get(game_url)
+class LinkedinGameConnector(ABC):
+    # clicks arguments[0][i] arguments[1][i] times, all in one round trip
+    CLICK_SCRIPT = """
+        const elements = arguments[0];
+        const clicks = arguments[1];
+        for (let i = 0; i < elements.length; i++) {
+            for (let click = 0; click < clicks[i]; click++) {
+                for (const type of ['mousedown', 'mouseup', 'click']) {
+                    elements[i].dispatchEvent(new MouseEvent(type, {bubbles: true, cancelable: true, view: window}));
+                }
+            }
+        }
+    """
+    MOVE_MODES = ('script', 'actions', 'click')
+    # the board is read from the class names of the cells or from a screenshot of the grid
+    EXTRACTION_MODES = ('dom', 'screenshot')
+    # the clickable cells of arguments[0], the hidden labels have no size
+    CELLS_SCRIPT = """
+        return Array.from(arguments[0].children).filter(cell => cell.getBoundingClientRect().width > 2);
+    """
 
-        # switch to the right iframe
-        iframe = self.driver.find_element(By.CLASS_NAME, "game-launch-page__iframe")
-        self.driver.switch_to.frame(iframe)
+    # presence of the grid means the game is ready
+    GRID_LOCATOR = None
 
-        # click the start game button
-        wait = WebDriverWait(self.driver, 10)
-        button = wait.until(ec.element_to_be_clickable((By.CLASS_NAME, "artdeco-button--primary")))
-        button.click()
+    def __init__(self, path_to_driver, game_url, full_screen = True, session: BrowserSession | None = None,
+                 extraction: str = 'dom'):
+        """
+        :param path_to_driver: geckodriver executable, only used when no session is given
+        :param game_url: linkedin game page
+        :param full_screen: window size of a browser launched by the connector
+        :param session: warm browser session to reuse, e.g. from a BrowserSessionPool
+        :param extraction: one of EXTRACTION_MODES
+        """
+        if extraction not in self.EXTRACTION_MODES:
+            raise ValueError("Unknown extraction mode {}".format(extraction))
+        self.extraction = extraction
+        # launch a browser only when none is handed over
+        self._owns_session = session is None
+        if session is None:
+            session = BrowserSession(path_to_driver, headless=False, full_screen=full_screen)
+        self.session = session
+        self.driver = session.driver
 
-        # click to close popup
-        wait = WebDriverWait(self.driver, 10)
-        button = wait.until(ec.element_to_be_clickable((By.CLASS_NAME, "artdeco-modal__dismiss")))
-        button.click()
+        # go to the game, start it and wait for the grid
+        session.open_game(game_url, self.GRID_LOCATOR)
 
     @abstractmethod
     def extract_board(self):
@@ -48,5 +57,52 @@ class LinkedinGameConnector(ABC):
         """
         pass
 
+    @abstractmethod
+    def cell_element(self, row, col):
+        """
+        :return: the element to click for the cell at row, col
+        """
+        pass
+
+    def screenshot_grid(self):
+        """
+        :return: the png screenshot of the grid and its clickable cells in reading order
+        """
+        grid = self.driver.find_element(*self.GRID_LOCATOR)
+        return grid.screenshot_as_png, self.driver.execute_script(self.CELLS_SCRIPT, grid)
+
+    def submit_moves(self, moves, mode: str = 'script'):
+        """
+        Click a whole list of cells
+        :param moves: list of ((row, col), number of clicks)
+        :param mode: 'script' dispatches every click in one execute_script, 'actions' performs one ActionChains,
+        'click' falls back to one WebElement.click round trip per click
+        """
+        if mode not in self.MOVE_MODES:
+            raise ValueError("Unknown move mode {}".format(mode))
+        elements = [self.cell_element(row, col) for (row, col), clicks in moves if clicks > 0]
+        clicks = [int(clicks) for _, clicks in moves if clicks > 0]
+
+        if mode == 'script':
+            self.driver.execute_script(self.CLICK_SCRIPT, elements, clicks)
+        elif mode == 'actions':
+            chain = ActionChains(self.driver)
+            for element, num_clicks in zip(elements, clicks):
+                for _ in range(num_clicks):
+                    chain.click(element)
+            chain.perform()
+        else:
+            for element, num_clicks in zip(elements, clicks):
+                for _ in range(num_clicks):
+                    element.click()
+
+    def close(self):
+        """
+        Quit the browser if the connector launched it, pooled sessions stay open
+        """
+        if getattr(self, '_owns_session', False):
+            self.session.quit()
+            self._owns_session = False
+
     def __del__(self):
-        self.driver.quit()
+        self.close()
@@ -1,25 +1,53 @@
-import time
-
+from browser_session import BrowserSessionPool
 from online_connector_queens import OnlineConnectorQueens
-from queenssolver import QueensSolver
+from tango_connector import TangoConnector
+from portfolio import Portfolio
+from solution_cache import SolutionCache
+from solver_service import SolverClient, parse_address
 import dotenv
 import os
 
 if __name__ == "__main__":
     dotenv.load_dotenv()
 
-    connector = OnlineConnectorQueens(os.getenv('PATH_TO_GECKODRIVER'))
+    # one warm browser plays both games, headless unless SHOW_BROWSER is set to watch it play
+    pool = BrowserSessionPool(os.getenv('PATH_TO_GECKODRIVER'), size=1, headless=not os.getenv('SHOW_BROWSER'))
+    portfolio = None
+    if os.getenv('SOLVER_ADDRESS'):
+        # the solver service of this machine is warm and shares its cache with the other bots
+        cache = SolverClient(parse_address(os.getenv('SOLVER_ADDRESS')))
+    else:
+        # every strategy races on a new board, the wins reorder the strategies of the next runs
+        portfolio = Portfolio(stats_file="portfolio_stats.jsonl")
+        portfolio.start()
+        # a rerun on the same day does not solve again
+        cache = SolutionCache("solutions.sqlite", portfolio=portfolio)
 
-    colors = connector.get_colors()
-    queens = connector.get_queens()
-    connector.save_queens('harder_queens')
-    connector.save_colors('harder_colors')
+    try:
+        with pool.session() as session:
+            connector = OnlineConnectorQueens(os.getenv('PATH_TO_GECKODRIVER'), session=session)
 
-    solver = QueensSolver(colors, queens)
-    solver.solve()
-    solved_queens = solver.get_queens()
+            colors = connector.get_colors()
+            queens = connector.get_queens()
+            connector.save_queens('harder_queens')
+            connector.save_colors('harder_colors')
 
-    connector.solve_board(solved_queens)
+            solved_queens = cache.solve_queens(colors, queens)
+            if solved_queens is not None:
+                connector.solve_board(solved_queens)
+            else:
+                print("No solution found, not clicking")
 
-    while True:
-        time.sleep(1)
\ No newline at end of file
+            tango_connector = TangoConnector(os.getenv('PATH_TO_GECKODRIVER'), session=session)
+            # the solver names the relations after the edge, the connector after the neighbour
+            solved_board = cache.solve_tango(tango_connector.tango_board, tango_connector.get_horizontal_relations(),
+                                             tango_connector.get_vertical_relations())
+            if solved_board is not None:
+                tango_connector.solve_board(solved_board)
+            else:
+                print("No tango solution found, not clicking")
+    finally:
+        pool.close()
+        cache.close()
+        if portfolio is not None:
+            portfolio.close()
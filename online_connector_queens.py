@@ -1,66 +1,64 @@
-import re
-import time
-from selenium import webdriver
-from selenium.webdriver.firefox.service import Service as FirefoxService
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
-from bs4 import BeautifulSoup
 import numpy as np
+from selenium.webdriver.common.by import By
 
 from linkedin_connector import LinkedinGameConnector
-from queenssolver import QueensSolver
 
 
 class OnlineConnectorQueens(LinkedinGameConnector):
-
-    def __init__(self, path_to_driver):
+    # one round trip returns the grid shape, the color and queen of every square and the squares themselves
+    SNAPSHOT_SCRIPT = """
+        const grid = document.getElementById('queens-grid');
+        const shape = (grid.getAttribute('style') || '').match(/\\d+/g).map(Number);
+        const squares = [];
+        const elements = [];
+        for (const square of grid.children) {
+            if (square.classList[0] === 'visually-hidden') {
+                continue;
+            }
+            const color = (square.classList[1] || '').match(/\\d+/);
+            const queen = (square.getAttribute('aria-label') || '').startsWith('Queen');
+            squares.push([color ? Number(color[0]) : -1, queen ? 1 : 0]);
+            elements.push(square);
+        }
+        return {shape: shape, squares: squares, elements: elements};
+    """
+
+    GAME_URL = "https://linkedin.com/games/queens"
+    GRID_LOCATOR = (By.ID, "queens-grid")
+
+    def __init__(self, path_to_driver, session=None, extraction: str = 'dom'):
         # open up driver
-        super().__init__(path_to_driver, "https://linkedin.com/games/queens")
+        super().__init__(path_to_driver, self.GAME_URL, session=session, extraction=extraction)
 
         self.queens : None | np.ndarray = None
         self.colors : None | np.ndarray = None
+        self.list_of_squares = []
 
         self.extract_board()
 
-        board_element_selenium = self.driver.find_element(By.ID, "queens-grid")
-
-
-        self.list_of_squares = []
-        # get a list of squares
-        for child in board_element_selenium.find_elements(By.XPATH, './*'):
-            self.list_of_squares.append(child)
-
     def extract_board(self):
-        # take the dom
-        dom = self.driver.page_source
-        soup = BeautifulSoup(dom, 'html.parser')
-
-        # get all the elements we need
-        board_element = soup.find(id="queens-grid")
-        style = board_element.get('style')
-        str_row_col = re.findall(r'\d+', style)
-
-        shape = tuple(map(int, str_row_col))
-        self.colors = np.zeros(shape, dtype=int)
-        # the queen is 1, impossible is 2
-        self.queens = np.zeros(shape, dtype=int)
-
-        # iterate through all the squares and get the color
-        index = 0
-        for square in board_element.children:
-            # if string node ignore or if hidden cell
-            if isinstance(square, str) or square.get('class')[0] == 'visually-hidden':
-                    continue
-            # look for color
-            color_string = square.get('class')[1]
-            self.colors[int(np.floor(index / shape[1]))][index % shape[0]] = int(
-                re.search(r'\d+', color_string).group())
-
-            # look for queen
-            self.queens[int(np.floor(index / shape[1]))][index % shape[0]] = square.get('aria-label')[0:5] == 'Queen'
-            index += 1
+        if self.extraction == 'screenshot':
+            # only loaded when asked for, the default path does not need the image code
+            from png_codec import decode_png
+            from screenshot_extractor import extract_queens
+
+            screenshot, self.list_of_squares = self.screenshot_grid()
+            # the colors are numbered by first appearance instead of by the class names of the page
+            self.colors, self.queens = extract_queens(decode_png(screenshot))
+            return
+        snapshot = self.driver.execute_script(self.SNAPSHOT_SCRIPT)
+        self.colors, self.queens = self.board_from_snapshot(snapshot)
+        self.list_of_squares = snapshot['elements']
+
+    @staticmethod
+    def board_from_snapshot(snapshot: dict):
+        """
+        :param snapshot: result of SNAPSHOT_SCRIPT
+        :return: the colors and the queens (the queen is 1, impossible is 2) arrays
+        """
+        shape = tuple(snapshot['shape'][:2])
+        squares = np.array(snapshot['squares'], dtype=int).reshape(shape + (2,))
+        return squares[..., 0].copy(), squares[..., 1].copy()
 
     def save_queens(self, str_name: str = 'queens'):
         np.save(str_name + '.npy', self.queens)
@@ -71,16 +69,21 @@ class OnlineConnectorQueens(LinkedinGameConnector):
     def get_queens(self):
         return self.queens
 
-    def solve_board(self, solved_queens, fill_crosses: bool = False):
-        queen_indices = np.column_stack(np.where(solved_queens == 1))
+    def solve_board(self, solved_queens, fill_crosses: bool = False, mode: str = 'script'):
+        """
+        Click the solution, a queen takes two clicks and a cross one
+        :param solved_queens: queens board, the queen is 1, impossible is 2
+        :param fill_crosses: also click the impossible squares
+        :param mode: see LinkedinGameConnector.submit_moves
+        """
+        moves = []
         if fill_crosses:
-            cross_indices = np.column_stack(np.where(solved_queens == 2))
-            for index in cross_indices:
-                self.click_square(index[0], index[1])
+            moves += [((row, col), 1) for row, col in np.column_stack(np.where(solved_queens == 2))]
+        moves += [((row, col), 2) for row, col in np.column_stack(np.where(solved_queens == 1))]
+        self.submit_moves(moves, mode)
 
-        for index in queen_indices:
-            self.click_square(index[0], index[1])
-            self.click_square(index[0], index[1])
+    def cell_element(self, row, col):
+        return self.list_of_squares[row * self.colors.shape[1] + col]
 
     def get_colors(self):
         return self.colors
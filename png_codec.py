@@ -0,0 +1,236 @@
+import struct
+import zlib
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# color type to samples per pixel, 8 bit images only
+SAMPLES_PER_PIXEL = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# filter types of a scanline
+NONE, SUB, UP, AVERAGE, PAETH = range(5)
+
+
+def _chunks(data: bytes):
+    """
+    :return: the (type, body) of every chunk of a png file
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a png file")
+    chunks = []
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        chunks.append((chunk_type, data[offset + 8:offset + 8 + length]))
+        offset += 12 + length
+        if chunk_type == b"IEND":
+            break
+    return chunks
+
+
+def _paeth(left: np.ndarray, up: np.ndarray, up_left: np.ndarray):
+    # distances of left + up - up_left to left, up and up_left
+    from_up = up - up_left
+    from_left = left - up_left
+    distance_left = np.abs(from_up)
+    distance_up = np.abs(from_left)
+    distance_up_left = np.abs(from_up + from_left)
+    return np.where(distance_left <= np.minimum(distance_up, distance_up_left), left,
+                    np.where(distance_up <= distance_up_left, up, up_left))
+
+
+def _paeth_prediction(left: int, up: int, up_left: int):
+    distance_left = abs(up - up_left)
+    distance_up = abs(left - up_left)
+    distance_up_left = abs(left + up - 2 * up_left)
+    if distance_left <= distance_up and distance_left <= distance_up_left:
+        return left
+    return up if distance_up <= distance_up_left else up_left
+
+
+def _unfilter_paeth_line(line: np.ndarray, up: np.ndarray):
+    """
+    Undo Paeth on one row, where the pixel above equals the one above left the prediction is the left pixel, so the
+    row is a running sum between the few pixels where they differ, e.g. under the vertical edges of a screenshot
+    :param line: (width, samples) filtered bytes
+    :param up: (width, samples) the row above, already unfiltered
+    """
+    pixels = np.empty(line.shape, dtype=np.uint8)
+    filtered = line.astype(np.int64)
+    above = up.astype(np.int64)
+    above_left = np.zeros_like(above)
+    above_left[1:] = above[:-1]
+    position = 0
+    left = [0] * line.shape[1]
+    # the samples where the pixel above and the one above left are equal predict left in the general formula too
+    for edge in np.flatnonzero(np.any(above != above_left, axis=1)).tolist():
+        if edge > position:
+            run = (np.array(left) + np.cumsum(filtered[position:edge], axis=0)) & 0xFF
+            pixels[position:edge] = run
+            left = run[-1].tolist()
+        # plain ints, numpy costs more than the arithmetic on a handful of samples
+        left = [(value + _paeth_prediction(left_value, up_value, up_left_value)) & 0xFF
+                for value, left_value, up_value, up_left_value in zip(filtered[edge].tolist(), left,
+                                                                      above[edge].tolist(), above_left[edge].tolist())]
+        pixels[edge] = left
+        position = edge + 1
+    pixels[position:] = (left + np.cumsum(filtered[position:], axis=0)) & 0xFF
+    return pixels
+
+
+def _unfilter_rows(filters: np.ndarray, lines: np.ndarray):
+    """
+    Undo None, Sub, Up and Paeth, Sub is a running sum modulo 256 along the row and a run of Up rows one along
+    the columns
+    :param lines: (height, width, samples) filtered bytes
+    """
+    pixels = np.empty(lines.shape, dtype=np.uint8)
+    previous = np.zeros(lines.shape[1:], dtype=np.uint8)
+    filters = filters.tolist()
+    row = 0
+    while row < len(filters):
+        filter_type = filters[row]
+        end = row + 1
+        if filter_type == UP:
+            while end < len(filters) and filters[end] == UP:
+                end += 1
+            pixels[row:end] = np.cumsum(lines[row:end], axis=0, dtype=np.uint8) + previous
+        elif filter_type == SUB:
+            pixels[row] = np.cumsum(lines[row], axis=0, dtype=np.uint8)
+        elif filter_type == PAETH:
+            pixels[row] = _unfilter_paeth_line(lines[row], previous)
+        else:
+            pixels[row] = lines[row]
+        previous = pixels[end - 1]
+        row = end
+    return pixels
+
+
+def _skew(array: np.ndarray):
+    """
+    :param array: (height, width, ...) array
+    :return: (height, height + width - 1, ...) copy with row r shifted r places to the right, zeros around
+    """
+    height, width = array.shape[:2]
+    padded = np.zeros((height, width + height) + array.shape[2:], dtype=array.dtype)
+    padded[:, :width] = array
+    # one element less per row shifts every row one further than the one above,
+    # the start of a row reads the zero padding of the row above
+    return np.lib.stride_tricks.as_strided(padded, (height, width + height - 1) + array.shape[2:],
+                                           (padded.strides[0] - padded.strides[1],) + padded.strides[1:]).copy()
+
+
+def _unskew(array: np.ndarray, width: int):
+    """
+    Inverse of _skew
+    """
+    height = array.shape[0]
+    return np.lib.stride_tricks.as_strided(array, (height, width) + array.shape[2:],
+                                           (array.strides[0] + array.strides[1],) + array.strides[1:]).copy()
+
+
+def _unfilter_wavefront(filters: np.ndarray, lines: np.ndarray):
+    """
+    Undo any mix of filters, a pixel only depends on its left, up and up left neighbours so every
+    anti-diagonal of the image is decoded in one step, height + width steps in total
+    :param lines: (height, width, samples) filtered bytes
+    """
+    height, width, samples = lines.shape
+    # pixel (row, col) is stored at [row + col, row] so every anti-diagonal is a slice,
+    # the extra leading diagonal and row of zeros stand for the pixels outside the image
+    skewed_lines = _skew(lines.astype(np.int16)).swapaxes(0, 1)
+    skewed = np.zeros((height + width, height + 1, samples), dtype=np.int16)
+    # one 0 / 1 weight per filter and row byte, blending the predictions is cheaper than selecting them
+    weights = [np.repeat((filters == filter_type)[:, None], samples, axis=1).astype(np.int16)
+               for filter_type in (SUB, UP, AVERAGE, PAETH)]
+    for step in range(height + width - 1):
+        first, last = max(0, step - width + 1), min(height, step + 1)
+        left = skewed[step, first + 1:last + 1]
+        up = skewed[step, first:last]
+        # the last diagonal is still empty at step 0
+        up_left = skewed[step - 1, first:last]
+        sub, up_weight, average, paeth = (weight[first:last] for weight in weights)
+        prediction = sub * left + up_weight * up + average * ((left + up) >> 1) + paeth * _paeth(left, up, up_left)
+        skewed[step + 1, first + 1:last + 1] = (skewed_lines[step, first:last] + prediction) & 0xFF
+    return _unskew(np.ascontiguousarray(skewed[1:, 1:].swapaxes(0, 1)), width).astype(np.uint8)
+
+
+def decode_png(data: bytes):
+    """
+    Decode a non interlaced 8 bit png, e.g. a selenium screenshot
+    :return: (height, width, 3) uint8 RGB array, transparency is dropped
+    """
+    header = None
+    palette = None
+    compressed = []
+    for chunk_type, body in _chunks(data):
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", body)
+        elif chunk_type == b"PLTE":
+            palette = np.frombuffer(body, dtype=np.uint8).reshape(-1, 3)
+        elif chunk_type == b"IDAT":
+            compressed.append(body)
+    if header is None:
+        raise ValueError("The png has no header")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if bit_depth != 8 or color_type not in SAMPLES_PER_PIXEL or interlace:
+        raise ValueError("Only non interlaced 8 bit png are supported")
+
+    samples = SAMPLES_PER_PIXEL[color_type]
+    raw = np.frombuffer(zlib.decompress(b"".join(compressed)), dtype=np.uint8).reshape(height, 1 + width * samples)
+    filters = raw[:, 0]
+    if np.any(filters > PAETH):
+        raise ValueError("Unknown png filter")
+    lines = raw[:, 1:].reshape(height, width, samples)
+    # the left byte of an Average prediction always counts, those rows need the anti-diagonal order
+    if np.any(filters == AVERAGE):
+        pixels = _unfilter_wavefront(filters, lines)
+    else:
+        pixels = _unfilter_rows(filters, lines)
+
+    if color_type == 3:
+        if palette is None:
+            raise ValueError("The png has no palette")
+        return palette[pixels[..., 0]]
+    if color_type in (0, 4):
+        return np.repeat(pixels[..., :1], 3, axis=2)
+    return np.ascontiguousarray(pixels[..., :3])
+
+
+def _filter_all(image: np.ndarray):
+    """
+    :return: (5, height, width, samples) the image filtered with every filter type
+    """
+    pixels = image.astype(np.int32)
+    left = np.zeros_like(pixels)
+    left[:, 1:] = pixels[:, :-1]
+    up = np.zeros_like(pixels)
+    up[1:] = pixels[:-1]
+    up_left = np.zeros_like(pixels)
+    up_left[1:, 1:] = pixels[:-1, :-1]
+    predictions = (0, left, up, (left + up) >> 1, _paeth(left, up, up_left))
+    return np.stack([(pixels - prediction) & 0xFF for prediction in predictions]).astype(np.uint8)
+
+
+def encode_png(image: np.ndarray, filter_type: int | None = None, level: int = 6):
+    """
+    :param image: (height, width, 3) uint8 RGB array
+    :param filter_type: filter of every row, None picks per row the one with the smallest sum of absolute
+    differences like libpng does
+    :return: the png file
+    """
+    height, width, samples = image.shape
+    filtered = _filter_all(image)
+    if filter_type is None:
+        scores = np.abs(filtered.astype(np.int8).astype(np.int32)).sum(axis=(2, 3))
+        row_filters = np.argmin(scores, axis=0)
+    else:
+        row_filters = np.full(height, filter_type)
+    lines = filtered[row_filters, np.arange(height)].reshape(height, width * samples)
+    raw = np.concatenate([row_filters.astype(np.uint8)[:, None], lines], axis=1)
+
+    def chunk(chunk_type: bytes, body: bytes):
+        return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+    color_type = {1: 0, 3: 2, 4: 6}[samples]
+    return (PNG_SIGNATURE + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)) +
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + chunk(b"IEND", b""))
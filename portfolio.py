@@ -0,0 +1,299 @@
+import argparse
+import contextlib
+import datetime
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO, find_puzzles
+from solver_core.enums import SquareState, TangoBoardStates, EqualityStates
+from solver_core.queens import QueensSolver, BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver
+from solver_core.tango import TangoSolver, SatTangoSolver, order_relations
+
+
+def _queens_solution(solver):
+    return solver.get_queens() if solver.solve() else None
+
+
+def _tango_solution(solver, **solve_arguments):
+    return solver.get_tango_board() if solver.solve(**solve_arguments) else None
+
+
+# game to strategy name to function of the puzzle inputs returning the solution, None on failure
+STRATEGIES = {
+    QUEENS: {
+        "eliminators": lambda colors, queens: _queens_solution(QueensSolver(colors, queens.copy())),
+        "full_search": lambda colors, queens: _queens_solution(QueensSolver(colors, queens.copy(), full_search=True)),
+        "bitboard": lambda colors, queens: _queens_solution(BitboardQueensSolver(colors, queens)),
+        "dancing_links": lambda colors, queens: _queens_solution(DancingLinksQueensSolver(colors, queens)),
+        "sat": lambda colors, queens: _queens_solution(SatQueensSolver(colors, queens)),
+    },
+    TANGO: {
+        "line_first": lambda board, vertical_relations, horizontal_relations: _tango_solution(
+            TangoSolver(board, vertical_relations, horizontal_relations)),
+        "relation_first": lambda board, vertical_relations, horizontal_relations: _tango_solution(
+            TangoSolver(board, vertical_relations, horizontal_relations), relations_first=True),
+        "sat": lambda board, vertical_relations, horizontal_relations: _tango_solution(
+            SatTangoSolver(board, vertical_relations, horizontal_relations)),
+    },
+}
+
+
+def verify_queens(colors: np.ndarray, queens: np.ndarray, solution: np.ndarray):
+    """
+    :return: True if solution keeps the preplaced queens and has one queen per row, column and color,
+    no two of them touching
+    """
+    placed = np.asarray(solution) == SquareState.Queen.value
+    if placed.shape != colors.shape or np.any((queens == SquareState.Queen.value) & ~placed):
+        return False
+    if np.any(placed.sum(axis=0) != 1) or np.any(placed.sum(axis=1) != 1):
+        return False
+    if not np.array_equal(np.sort(colors[placed]), np.unique(colors)):
+        return False
+    # one queen per row, queens of consecutive rows touch when their columns are next to each other
+    return bool(np.all(np.abs(np.diff(np.argmax(placed, axis=1))) > 1))
+
+
+def verify_tango(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray,
+                 solution: np.ndarray):
+    """
+    :return: True if solution fills the board around its givens with as many suns as moons on every line,
+    no three equal symbols in a row and every relation kept
+    """
+    solution = np.asarray(solution)
+    if solution.shape != board.shape or not np.all(np.isin(solution, (TangoBoardStates.Sun.value,
+                                                                      TangoBoardStates.Moon.value))):
+        return False
+    if np.any((board != TangoBoardStates.Empty.value) & (board != solution)):
+        return False
+    for lines in (solution, solution.T):
+        if np.any(2 * np.sum(lines == TangoBoardStates.Sun.value, axis=1) != lines.shape[1]):
+            return False
+        if np.any((lines[:, 2:] == lines[:, 1:-1]) & (lines[:, 1:-1] == lines[:, :-2])):
+            return False
+    # sun and moon are +1 and -1 so the product of two neighbours is their relation
+    for products, relations in ((solution[:, :-1] * solution[:, 1:], vertical_relations),
+                                (solution[:-1] * solution[1:], horizontal_relations)):
+        if np.any((relations != EqualityStates.Free.value) & (products != relations)):
+            return False
+    return True
+
+
+VERIFIERS = {QUEENS: verify_queens, TANGO: verify_tango}
+
+
+def load_wins(stats_file: str | None):
+    """
+    :return: Counter of (game, strategy) over the wins recorded in stats_file
+    """
+    wins = Counter()
+    if stats_file is None or not os.path.exists(stats_file):
+        return wins
+    with open(stats_file) as stats:
+        for line in stats:
+            record = json.loads(line)
+            wins[(record["game"], record["strategy"])] += 1
+    return wins
+
+
+def default_order(game: str, stats_file: str | None = None):
+    """
+    :return: the strategy names of game, the ones that won most often first, ties keep the STRATEGIES order
+    """
+    wins = load_wins(stats_file)
+    return sorted(STRATEGIES[game], key=lambda name: -wins[(game, name)])
+
+
+def _worker(game: str, name: str, connection):
+    """
+    Run one strategy on every (task id, puzzle) received until None is received
+    """
+    run = STRATEGIES[game][name]
+    # the solvers print their progress, keep the workers quiet
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                return
+            if task is None:
+                return
+            task_id, arrays = task
+            try:
+                result = run(*arrays)
+            except Exception:
+                # a failing strategy loses the race, it must not take the worker down
+                result = None
+            connection.send((task_id, result))
+
+
+class Portfolio:
+    """
+    One worker process per strategy, every strategy of a game runs on the same board and the first
+    verified solution wins, the workers still searching are killed and restarted in the background
+    """
+
+    def __init__(self, strategies: dict | None = None, stats_file: str | None = None,
+                 max_strategies: int | None = None):
+        """
+        :param strategies: game to the strategy names to launch, by default every strategy in default_order
+        :param stats_file: json lines file the wins are appended to and the default order is read from
+        :param max_strategies: launch only the first ones of every game, for machines with few cores
+        """
+        if strategies is None:
+            strategies = {game: default_order(game, stats_file) for game in STRATEGIES}
+        self.strategies = {game: list(names)[:max_strategies] for game, names in strategies.items()}
+        self.stats_file = stats_file
+        self.wins = Counter()
+        # (game, strategy) to (process, connection)
+        self._workers = {}
+        self._num_tasks = 0
+        # restarts the killed workers while the caller uses the solution
+        self._restarter = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """
+        Start the missing workers, solve already restarts the ones it killed in the background and
+        this only waits for that
+        """
+        self._wait_restarter()
+        self._start_missing()
+
+    def _wait_restarter(self):
+        if self._restarter is not None:
+            self._restarter.join()
+            self._restarter = None
+
+    def _start_missing(self):
+        for game, names in self.strategies.items():
+            for name in names:
+                if (game, name) not in self._workers:
+                    connection, worker_connection = multiprocessing.Pipe()
+                    process = multiprocessing.Process(target=_worker, args=(game, name, worker_connection),
+                                                      daemon=True)
+                    process.start()
+                    worker_connection.close()
+                    self._workers[(game, name)] = (process, connection)
+
+    def solve(self, game: str, *arrays, timeout: float | None = None):
+        """
+        :param arrays: the puzzle in solver order, colors and queens or board and both relations
+        :param timeout: seconds to wait for a verified solution, None to wait for every strategy
+        :return: the winning strategy and its solution, (None, None) if no strategy found a verified one in time
+        """
+        self.start()
+        self._num_tasks += 1
+        task_id = self._num_tasks
+        start = time.perf_counter()
+        deadline = None if timeout is None else start + timeout
+
+        running = {}
+        for name in self.strategies[game]:
+            _, connection = self._workers[(game, name)]
+            connection.send((task_id, arrays))
+            running[connection] = name
+
+        winner = solution = None
+        while running and winner is None:
+            ready = wait(list(running), None if deadline is None else max(deadline - time.perf_counter(), 0))
+            if not ready:
+                break
+            for connection in ready:
+                try:
+                    result_id, result = connection.recv()
+                except EOFError:
+                    # the worker died, it is restarted with the cancelled ones
+                    self._cancel(game, running.pop(connection))
+                    continue
+                if result_id != task_id:
+                    continue
+                name = running.pop(connection)
+                if result is not None and VERIFIERS[game](*arrays, result):
+                    winner, solution = name, result
+                    break
+
+        for name in running.values():
+            self._cancel(game, name)
+        if running:
+            # the next board should not wait for the process start and the imports
+            self._restarter = threading.Thread(target=self._start_missing, daemon=True)
+            self._restarter.start()
+        if winner is not None:
+            self._record(game, winner, arrays[0].shape, time.perf_counter() - start)
+        return winner, solution
+
+    def _cancel(self, game: str, name: str):
+        process, connection = self._workers.pop((game, name))
+        process.kill()
+        process.join()
+        connection.close()
+
+    def _record(self, game: str, winner: str, shape: tuple, elapsed: float):
+        self.wins[(game, winner)] += 1
+        if self.stats_file is None:
+            return
+        record = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "game": game,
+                  "shape": list(shape), "strategy": winner, "time": elapsed}
+        with open(self.stats_file, "a") as stats:
+            stats.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self._wait_restarter()
+        for process, connection in self._workers.values():
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for process, connection in self._workers.values():
+            process.join(1)
+            if process.is_alive():
+                process.kill()
+                process.join()
+            connection.close()
+        self._workers = {}
+
+
+def solve_portfolio(game: str, *arrays, timeout: float | None = None, stats_file: str | None = None):
+    """
+    Solve a single board with a short lived Portfolio
+    :return: the winning strategy and its solution, (None, None) if no strategy found a verified one in time
+    """
+    with Portfolio({game: default_order(game, stats_file)}, stats_file) as portfolio:
+        return portfolio.solve(game, *arrays, timeout=timeout)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Race the solver strategies on every saved board of an archive")
+    parser.add_argument("directory")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per board")
+    parser.add_argument("--stats", default=None, help="json lines file the wins are appended to")
+    parser.add_argument("--max-strategies", type=int, default=None)
+    args = parser.parse_args()
+
+    with Portfolio(stats_file=args.stats, max_strategies=args.max_strategies) as board_portfolio:
+        for game_name, puzzle_name, paths in find_puzzles(args.directory):
+            puzzle = [np.load(path) for path in paths]
+            if game_name == TANGO:
+                puzzle = [puzzle[0], *order_relations(*puzzle)]
+            board_start = time.perf_counter()
+            strategy, _ = board_portfolio.solve(game_name, *puzzle, timeout=args.timeout)
+            print("{} {}: {} in {:.1f} ms".format(game_name, puzzle_name, strategy or "unsolved",
+                                                   (time.perf_counter() - board_start) * 1e3))
+
+        print()
+        for (game_name, strategy), total in board_portfolio.wins.most_common():
+            print("{:6s} {:16s} {:6d}".format(game_name, strategy, total))
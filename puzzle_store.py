@@ -0,0 +1,227 @@
+import argparse
+import os
+
+import numpy as np
+
+from archive_runner import find_puzzles, QUEENS, TANGO
+from solver_core.tango import order_relations, pack_cells, unpack_cells
+
+MAGIC = b"QTPSTORE"
+# version 2 packs the tango boards and relations at 2 bits per cell
+VERSION = 2
+KEY_SIZE = 48
+GAMES = (QUEENS, TANGO)
+
+HEADER_DTYPE = np.dtype([("magic", "S8"), ("version", "<u2"), ("game", "u1"), ("height", "u1"), ("width", "u1"),
+                         ("padding", "V3"), ("count", "<u8"), ("reserved", "V40")])
+
+
+def field_shapes(game: str, shape: tuple):
+    """
+    :return: the name and shape of the boards of a puzzle in solver order
+    """
+    height, width = shape
+    if game == QUEENS:
+        return [("colors", shape), ("queens", shape)]
+    return [("board", shape), ("vertical_relations", (height, width - 1)),
+            ("horizontal_relations", (height - 1, width))]
+
+
+def is_packed(game: str, version: int = VERSION):
+    return game == TANGO and version >= 2
+
+
+def record_dtype(game: str, shape: tuple, version: int = VERSION):
+    """
+    Fixed size record of one puzzle, a key (date or puzzle id) followed by the int8 boards,
+    tango boards are packed 4 cells per byte from version 2 on
+    :param game: QUEENS or TANGO
+    :param shape: board shape
+    """
+    if is_packed(game, version):
+        fields = [(name, "u1", (-(-field_shape[0] * field_shape[1] // 4),))
+                  for name, field_shape in field_shapes(game, shape)]
+    else:
+        fields = [(name, "i1", field_shape) for name, field_shape in field_shapes(game, shape)]
+    return np.dtype([("key", "S{}".format(KEY_SIZE))] + fields)
+
+
+class PuzzleStore:
+    """
+    Append only file of fixed size puzzle records of one game and one board shape
+    the records are read through np.memmap so batch loaders can slice them without copies
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != MAGIC:
+            raise ValueError("{} is not a puzzle store".format(path))
+        if not 1 <= header["version"][0] <= VERSION:
+            raise ValueError("Unsupported puzzle store version {}".format(header["version"][0]))
+
+        self.version = int(header["version"][0])
+        self.game = GAMES[header["game"][0]]
+        self.shape = (int(header["height"][0]), int(header["width"][0]))
+        self.dtype = record_dtype(self.game, self.shape, self.version)
+        self.packed = is_packed(self.game, self.version)
+        self.field_shapes = dict(field_shapes(self.game, self.shape))
+        self._count = int(header["count"][0])
+        self._records = None
+        self._index = None
+
+    @classmethod
+    def create(cls, path: str, game: str, shape: tuple):
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["game"] = GAMES.index(game)
+        header["height"], header["width"] = shape
+        header.tofile(path)
+        return cls(path)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def records(self):
+        """
+        :return: read only memmap of every record, fields are sliced zero copy e.g. store.records["colors"],
+        packed stores hold the 2 bit codes, see field
+        """
+        if self._records is None:
+            self._records = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_DTYPE.itemsize,
+                                      shape=(self._count,)) if self._count else np.zeros(0, dtype=self.dtype)
+        return self._records
+
+    def field(self, name: str):
+        """
+        :return: the boards of every record, e.g. store.field("board"), unpacked if the store is packed
+        """
+        if self.packed:
+            return unpack_cells(self.records[name], self.field_shapes[name])
+        return self.records[name]
+
+    def keys(self):
+        return [key.decode() for key in self.records["key"]]
+
+    def __contains__(self, key: str):
+        return key in self._load_index()
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {stored_key: position for position, stored_key in enumerate(self.keys())}
+        return self._index
+
+    def get(self, key: str):
+        """
+        :return: the boards of the puzzle in solver order
+        """
+        record = self.records[self._load_index()[key]]
+        if self.packed:
+            return tuple(unpack_cells(record[name], self.field_shapes[name]) for name in self.dtype.names[1:])
+        return tuple(record[name] for name in self.dtype.names[1:])
+
+    def append(self, key: str, *arrays: np.ndarray):
+        """
+        Append one puzzle at the end of the store
+        :param key: date or puzzle id, unique in the store
+        :param arrays: the boards in solver order, colors and queens or board and both relations
+        """
+        encoded_key = key.encode()
+        if len(encoded_key) > KEY_SIZE:
+            raise ValueError("Key {} is longer than {} bytes".format(key, KEY_SIZE))
+        if key in self._load_index():
+            raise KeyError("Key {} is already stored".format(key))
+
+        record = np.zeros(1, dtype=self.dtype)
+        record["key"] = encoded_key
+        for name, array in zip(self.dtype.names[1:], arrays):
+            if np.any(np.abs(array) > (1 if self.packed else np.iinfo(np.int8).max)):
+                raise ValueError("{} does not fit in {}".format(name, "2 bits" if self.packed else "int8"))
+            record[name] = pack_cells(np.asarray(array)) if self.packed else array
+
+        with open(self.path, "r+b") as store_file:
+            store_file.seek(HEADER_DTYPE.itemsize + self._count * self.dtype.itemsize)
+            store_file.write(record.tobytes())
+            # the count is only updated once the record is written
+            store_file.seek(HEADER_DTYPE.fields["count"][1])
+            store_file.write(np.array(self._count + 1, dtype="<u8").tobytes())
+
+        self._index[key] = self._count
+        self._count += 1
+        self._records = None
+
+
+def open_store(store_prefix: str, game: str, shape: tuple):
+    """
+    :return: the store of a game and board shape, created if it does not exist yet
+    """
+    path = "{}_{}_{}x{}.qtps".format(store_prefix, game, *shape)
+    return PuzzleStore(path) if os.path.exists(path) else PuzzleStore.create(path, game, shape)
+
+
+def import_npy_directory(directory: str, store_prefix: str):
+    """
+    Put every loose .npy puzzle of a directory in stores, one store per game and board shape
+    :param directory: archive written by the connectors
+    :param store_prefix: stores are written as <store_prefix>_<game>_<height>x<width>.qtps
+    :return: paths of the stores written to
+    """
+    stores = {}
+    for game, name, paths in find_puzzles(directory):
+        arrays = [np.load(path) for path in paths]
+        if game == TANGO:
+            arrays = [arrays[0], *order_relations(*arrays)]
+        shape = arrays[0].shape
+        if (game, shape) not in stores:
+            stores[(game, shape)] = open_store(store_prefix, game, shape)
+        key = os.path.relpath(name, directory)
+        # importing twice keeps the puzzles already stored
+        if key not in stores[(game, shape)]:
+            stores[(game, shape)].append(key, *arrays)
+    return [store.path for store in stores.values()]
+
+
+def export_npy_directory(store: PuzzleStore, directory: str):
+    """
+    Write the puzzles of a store back as loose .npy files with the connectors' naming
+    """
+    for key in store.keys():
+        stem = os.path.join(directory, key)
+        os.makedirs(os.path.dirname(stem) or ".", exist_ok=True)
+        if store.game == QUEENS:
+            colors, queens = store.get(key)
+            np.save(stem + "_colors.npy", colors)
+            np.save(stem + "_queens.npy", queens)
+        else:
+            board, vertical_relations, horizontal_relations = store.get(key)
+            # the connector names the relations after the direction of the neighbour, the solver after the edge
+            np.save(stem + ".npy", board)
+            np.save(stem + "_vertical.npy", horizontal_relations)
+            np.save(stem + "_horizontal.npy", vertical_relations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert between loose .npy boards and puzzle stores")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("store_prefix")
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("store")
+    export_parser.add_argument("directory")
+    info_parser = subparsers.add_parser("info")
+    info_parser.add_argument("store")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        for store_path in import_npy_directory(args.directory, args.store_prefix):
+            print(store_path)
+    elif args.command == "export":
+        export_npy_directory(PuzzleStore(args.store), args.directory)
+    else:
+        puzzle_store = PuzzleStore(args.store)
+        print("{} store of {} {}x{} puzzles, version {}{}".format(
+            puzzle_store.game, len(puzzle_store), *puzzle_store.shape, puzzle_store.version,
+            ", packed" if puzzle_store.packed else ""))
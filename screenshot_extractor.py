@@ -0,0 +1,432 @@
+import argparse
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO
+from png_codec import decode_png, encode_png
+from solver_core.enums import SquareState, TangoBoardStates, EqualityStates
+
+# region colors of the synthetic queens boards, close to the ones of the game
+QUEENS_PALETTE = np.array([(187, 163, 226), (255, 201, 146), (150, 190, 255), (179, 223, 160), (223, 223, 223),
+                           (255, 123, 96), (230, 243, 136), (185, 178, 158), (223, 160, 191), (163, 210, 216),
+                           (98, 239, 234), (255, 147, 243), (142, 160, 197), (205, 153, 95), (119, 205, 149),
+                           (237, 210, 79), (255, 255, 255), (209, 114, 114)], dtype=np.uint8)
+QUEENS_LINE = (40, 40, 40)
+QUEEN_ICON = (20, 20, 20)
+TANGO_BACKGROUND = (251, 250, 248)
+TANGO_LINE = (222, 219, 214)
+SUN = (255, 179, 30)
+MOON = (76, 140, 230)
+TANGO_MARKER = (90, 84, 76)
+
+# a pixel of a grid line is darker than the pixels this far on both sides
+LINE_REACH = 3
+# share of the pixels along a line that must be darker than both sides
+LINE_COVERAGE = 0.6
+# queens regions closer than this in RGB are the same region
+COLOR_TOLERANCE = 24.
+
+
+def _cell_origins(num_cells: int, cell_size: float, border: int):
+    """
+    :return: the first pixel of every cell and the first pixel of the closing border
+    """
+    return np.round(np.arange(num_cells + 1) * cell_size).astype(int) + border
+
+
+def _disk(image: np.ndarray, center: tuple, radius: float, color):
+    top, left = max(int(center[0] - radius) - 1, 0), max(int(center[1] - radius) - 1, 0)
+    bottom = min(int(center[0] + radius) + 2, image.shape[0])
+    right = min(int(center[1] + radius) + 2, image.shape[1])
+    rows, cols = np.ogrid[top:bottom, left:right]
+    image[top:bottom, left:right][(rows - center[0]) ** 2 + (cols - center[1]) ** 2 <= radius ** 2] = color
+
+
+def _draw_grid(image: np.ndarray, row_origins: np.ndarray, col_origins: np.ndarray, line_width: int, color):
+    """
+    Draw the border and a line centered on every boundary between cells
+    """
+    border = row_origins[0]
+    image[:border] = image[row_origins[-1]:] = color
+    image[:, :border] = image[:, col_origins[-1]:] = color
+    for origin in row_origins[1:-1]:
+        image[origin - line_width // 2:origin - line_width // 2 + line_width] = color
+    for origin in col_origins[1:-1]:
+        image[:, origin - line_width // 2:origin - line_width // 2 + line_width] = color
+
+
+def render_queens(colors: np.ndarray, queens: np.ndarray, cell_size: float = 48., line_width: int = 1,
+                  border_width: int = 3):
+    """
+    Draw a queens grid like the game does, thin lines between the squares of a region, thick ones between regions
+    :param colors: region of every square, mapped to QUEENS_PALETTE
+    :param queens: the queen is 1
+    :return: (height, width, 3) uint8 RGB image
+    """
+    n_rows, n_cols = colors.shape
+    row_origins = _cell_origins(n_rows, cell_size, border_width)
+    col_origins = _cell_origins(n_cols, cell_size, border_width)
+    # every pixel takes the color of its square, then the lines are drawn over
+    pixel_rows = np.searchsorted(row_origins, np.arange(row_origins[-1] + border_width), side="right") - 1
+    pixel_cols = np.searchsorted(col_origins, np.arange(col_origins[-1] + border_width), side="right") - 1
+    image = QUEENS_PALETTE[colors[np.clip(pixel_rows, 0, n_rows - 1)][:, np.clip(pixel_cols, 0, n_cols - 1)]
+                           % len(QUEENS_PALETTE)]
+    _draw_grid(image, row_origins, col_origins, line_width, QUEENS_LINE)
+
+    offset = border_width // 2
+    for row, col in zip(*np.nonzero(colors[1:] != colors[:-1])):
+        image[row_origins[row + 1] - offset:row_origins[row + 1] - offset + border_width,
+              col_origins[col] - offset:col_origins[col + 1] - offset + border_width] = QUEENS_LINE
+    for row, col in zip(*np.nonzero(colors[:, 1:] != colors[:, :-1])):
+        image[row_origins[row] - offset:row_origins[row + 1] - offset + border_width,
+              col_origins[col + 1] - offset:col_origins[col + 1] - offset + border_width] = QUEENS_LINE
+
+    for row, col in zip(*np.nonzero(queens == SquareState.Queen.value)):
+        _disk(image, ((row_origins[row] + row_origins[row + 1]) / 2 - 0.5,
+                      (col_origins[col] + col_origins[col + 1]) / 2 - 0.5), cell_size * 0.22, QUEEN_ICON)
+    return image
+
+
+def render_tango(board: np.ndarray, right_relations: np.ndarray, down_relations: np.ndarray,
+                 cell_size: float = 48., line_width: int = 2):
+    """
+    Draw a tango grid like the game does
+    :param right_relations: relation of every cell with its right neighbour, TangoConnector.horizontal_equals
+    :param down_relations: relation of every cell with the one below, TangoConnector.vertical_equals
+    :return: (height, width, 3) uint8 RGB image
+    """
+    n_rows, n_cols = board.shape
+    row_origins = _cell_origins(n_rows, cell_size, line_width)
+    col_origins = _cell_origins(n_cols, cell_size, line_width)
+    image = np.empty((row_origins[-1] + line_width, col_origins[-1] + line_width, 3), dtype=np.uint8)
+    image[...] = TANGO_BACKGROUND
+    _draw_grid(image, row_origins, col_origins, line_width, TANGO_LINE)
+    centers_y = (row_origins[:-1] + row_origins[1:]) / 2 - 0.5
+    centers_x = (col_origins[:-1] + col_origins[1:]) / 2 - 0.5
+
+    for (row, col), value in np.ndenumerate(board):
+        if value == TangoBoardStates.Sun.value:
+            _disk(image, (centers_y[row], centers_x[col]), cell_size * 0.3, SUN)
+        elif value == TangoBoardStates.Moon.value:
+            # a crescent, the disk minus a smaller one up and to the right
+            _disk(image, (centers_y[row], centers_x[col]), cell_size * 0.3, MOON)
+            _disk(image, (centers_y[row] - cell_size * 0.08, centers_x[col] + cell_size * 0.12), cell_size * 0.22,
+                  TANGO_BACKGROUND)
+
+    half = max(int(cell_size * 0.1), 3)
+    stroke = max(int(cell_size * 0.04), 1)
+    offsets = np.arange(-half, half + 1)
+    for relations, is_right in ((right_relations, True), (down_relations, False)):
+        for (row, col), relation in np.ndenumerate(relations):
+            if relation == EqualityStates.Free.value:
+                continue
+            center_y = int(round(centers_y[row])) if is_right else row_origins[row + 1]
+            center_x = col_origins[col + 1] if is_right else int(round(centers_x[col]))
+            # the marker sits on a patch of background hiding the line
+            image[center_y - half - 1:center_y + half + 2, center_x - half - 1:center_x + half + 2] = TANGO_BACKGROUND
+            if relation == EqualityStates.Equal.value:
+                gap = max(half // 2, 2)
+                for bar in (center_y - gap - stroke + 1, center_y + gap):
+                    image[bar:bar + stroke, center_x - half:center_x + half + 1] = TANGO_MARKER
+            else:
+                for shift in range(stroke):
+                    image[center_y + offsets, center_x + offsets + shift - stroke // 2] = TANGO_MARKER
+                    image[center_y + offsets, center_x - offsets + shift - stroke // 2] = TANGO_MARKER
+    return image
+
+
+def _luminance(image: np.ndarray):
+    # channel by channel in float32, a matrix product over the 3 channels is several times slower
+    return (image[..., 0] * np.float32(0.299) + image[..., 1] * np.float32(0.587) +
+            image[..., 2] * np.float32(0.114))
+
+
+def _saturation(image: np.ndarray):
+    """
+    :return: spread between the largest and the smallest channel of every pixel
+    """
+    red, green, blue = image[..., 0], image[..., 1], image[..., 2]
+    return np.maximum(np.maximum(red, green), blue) - np.minimum(np.minimum(red, green), blue)
+
+
+def _integral(values: np.ndarray):
+    """
+    :return: zero padded cumulative sums so any box sum takes 4 lookups, integer inputs are summed as integers
+    """
+    dtype = np.int64 if values.dtype.kind in "biu" else np.float64
+    integral = np.zeros((values.shape[0] + 1, values.shape[1] + 1) + values.shape[2:], dtype=dtype)
+    np.cumsum(values, axis=0, dtype=dtype, out=integral[1:, 1:])
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+    return integral
+
+
+def _box_means(integral: np.ndarray, tops: np.ndarray, bottoms: np.ndarray, lefts: np.ndarray, rights: np.ndarray):
+    """
+    Mean over every box [top, bottom) x [left, right), the arguments broadcast together
+    """
+    sums = integral[bottoms, rights] - integral[tops, rights] - integral[bottoms, lefts] + integral[tops, lefts]
+    area = np.maximum((bottoms - tops) * (rights - lefts), 1)
+    return sums / (area[..., None] if sums.ndim > area.ndim else area)
+
+
+def _grid_box_means(values: np.ndarray, tops: np.ndarray, bottoms: np.ndarray, lefts: np.ndarray,
+                    rights: np.ndarray):
+    """
+    Mean over the box of every cell when the boxes of a grid row share their rows and the boxes of a grid column
+    their columns, only the pixels of the boxes are read instead of building an integral image of the screenshot
+    :param tops: as returned by _cell_boxes
+    :return: (rows, cols, ...) means
+    """
+    tops, bottoms, lefts, rights = (np.ravel(edges) for edges in (tops, bottoms, lefts, rights))
+    heights, widths = bottoms - tops, rights - lefts
+    row_index = np.concatenate([np.arange(top, bottom) for top, bottom in zip(tops.tolist(), bottoms.tolist())])
+    col_index = np.concatenate([np.arange(left, right) for left, right in zip(lefts.tolist(), rights.tolist())])
+    boxes = values[np.ix_(row_index, col_index)]
+    sums = np.add.reduceat(np.add.reduceat(boxes, np.cumsum(heights) - heights, axis=0, dtype=np.float64),
+                           np.cumsum(widths) - widths, axis=1)
+    area = np.outer(heights, widths)
+    return sums / (area[..., None] if sums.ndim > area.ndim else area)
+
+
+def grid_lines(luminance: np.ndarray, axis: int):
+    """
+    Find the grid lines crossing an axis, a line pixel is darker than the pixels LINE_REACH away on both sides
+    and a line covers most of the grid, the edges of icons do not
+    :param axis: 1 for the vertical lines, 0 for the horizontal ones
+    :return: the center of every line
+    """
+    values = luminance if axis == 1 else luminance.T
+    padded = np.pad(values, ((0, 0), (LINE_REACH, LINE_REACH)), constant_values=255.)
+    contrast = np.minimum(padded[:, :-2 * LINE_REACH], padded[:, 2 * LINE_REACH:]) - values
+    coverage = np.mean(contrast > 8., axis=0)
+    is_line = np.concatenate([[False], coverage > LINE_COVERAGE, [False]])
+    starts = np.flatnonzero(is_line[1:] & ~is_line[:-1])
+    ends = np.flatnonzero(~is_line[1:] & is_line[:-1])
+    centers = (starts + ends - 1) / 2
+    if len(centers) < 2:
+        raise ValueError("No grid found in the screenshot")
+    # lines closer than half a cell are the two sides of one thick line
+    pitch = np.median(np.diff(centers))
+    kept = [centers[0]]
+    for center in centers[1:]:
+        if center - kept[-1] < pitch / 2:
+            kept[-1] = (kept[-1] + center) / 2
+        else:
+            kept.append(center)
+    return np.array(kept)
+
+
+def _cell_boxes(row_lines: np.ndarray, col_lines: np.ndarray, inset: float, size: float):
+    """
+    :param inset: distance from the top left corner of the cell to the box, share of the cell
+    :param size: side of the box, share of the cell
+    :return: tops, bottoms, lefts and rights of the box of every cell, broadcasting to the grid shape
+    """
+    heights = np.diff(row_lines)
+    widths = np.diff(col_lines)
+    tops = np.round(row_lines[:-1] + heights * inset).astype(int)
+    lefts = np.round(col_lines[:-1] + widths * inset).astype(int)
+    bottoms = np.maximum(np.round(row_lines[:-1] + heights * (inset + size)).astype(int), tops + 1)
+    rights = np.maximum(np.round(col_lines[:-1] + widths * (inset + size)).astype(int), lefts + 1)
+    return tops[:, None], bottoms[:, None], lefts[None, :], rights[None, :]
+
+
+def label_colors(cell_colors: np.ndarray, tolerance: float = COLOR_TOLERANCE):
+    """
+    :param cell_colors: (..., 3) mean color of every cell
+    :return: region labels numbered by first appearance in reading order
+    """
+    flat = cell_colors.reshape(-1, 3)
+    references = []
+    labels = np.empty(len(flat), dtype=int)
+    for index, color in enumerate(flat):
+        if references:
+            distances = np.linalg.norm(np.array(references) - color, axis=1)
+            closest = int(np.argmin(distances))
+            if distances[closest] <= tolerance:
+                labels[index] = closest
+                continue
+        labels[index] = len(references)
+        references.append(color)
+    return labels.reshape(cell_colors.shape[:-1])
+
+
+def extract_queens(image: np.ndarray):
+    """
+    Read a queens board from a screenshot of its grid
+    :return: the colors and the queens (the queen is 1) arrays, the colors are numbered by first appearance
+    """
+    luminance = _luminance(image)
+    row_lines, col_lines = grid_lines(luminance, 0), grid_lines(luminance, 1)
+
+    # the queen icon stays in the middle, the region color is read in the four corners
+    corners = []
+    for row_inset in (0.12, 0.73):
+        for col_inset in (0.12, 0.73):
+            tops, bottoms, _, _ = _cell_boxes(row_lines, col_lines, row_inset, 0.15)
+            _, _, lefts, rights = _cell_boxes(row_lines, col_lines, col_inset, 0.15)
+            corners.append(_grid_box_means(image, tops, bottoms, lefts, rights))
+    cell_colors = np.mean(corners, axis=0)
+    colors = label_colors(cell_colors)
+
+    center = _grid_box_means(luminance, *_cell_boxes(row_lines, col_lines, 0.35, 0.3))
+    background = cell_colors @ np.array([0.299, 0.587, 0.114])
+    queens = np.where(center < background - 40., SquareState.Queen.value, SquareState.Free.value)
+    return colors, queens
+
+
+def extract_tango(image: np.ndarray):
+    """
+    Read a tango board from a screenshot of its grid
+    :return: the board, the relations with the right neighbours and with the ones below,
+    the arrays of TangoConnector.extract_board
+    """
+    luminance = _luminance(image)
+    row_lines, col_lines = grid_lines(luminance, 0), grid_lines(luminance, 1)
+    colorful = _saturation(image) > 60
+
+    # the symbol is the dominant hue of the colorful pixels in the middle of the cell
+    boxes = _cell_boxes(row_lines, col_lines, 0.3, 0.4)
+    colorful_share = _grid_box_means(colorful, *boxes)
+    warmth = _grid_box_means((image[..., 0].astype(np.int16) - image[..., 2]) * colorful, *boxes) / np.maximum(
+        colorful_share, 1e-9)
+    board = np.where(colorful_share < 0.2, TangoBoardStates.Empty.value,
+                     np.where(warmth > 0, TangoBoardStates.Sun.value, TangoBoardStates.Moon.value)).astype(np.int8)
+
+    # markers are darker than the grid lines and grey, an x has marker pixels on every row of its box,
+    # an = only on its two bars
+    line_level = np.median(luminance[:, np.round(col_lines).astype(int)])
+    background_level = np.median(luminance)
+    marker = (luminance < min(line_level, background_level) - 40.) & ~colorful
+    marker_integral = _integral(marker)
+    pitch = np.median(np.concatenate([np.diff(row_lines), np.diff(col_lines)]))
+    half = max(int(round(pitch * 0.1)), 2)
+    offsets = np.arange(-half, half + 1)
+
+    def relations(centers_y: np.ndarray, centers_x: np.ndarray):
+        centers_y = np.round(centers_y).astype(int)[..., None]
+        centers_x = np.round(centers_x).astype(int)[..., None]
+        row_shares = _box_means(marker_integral, centers_y + offsets, centers_y + offsets + 1, centers_x - half,
+                                centers_x + half + 1)
+        present = row_shares.mean(axis=-1) > 0.08
+        crossed = np.mean(row_shares > 0, axis=-1) > 0.6
+        return np.where(present, np.where(crossed, EqualityStates.NotEqual.value, EqualityStates.Equal.value),
+                        EqualityStates.Free.value).astype(np.int8)
+
+    row_centers = (row_lines[:-1] + row_lines[1:]) / 2
+    col_centers = (col_lines[:-1] + col_lines[1:]) / 2
+    right_relations = relations(row_centers[:, None], col_lines[None, 1:-1])
+    down_relations = relations(row_lines[1:-1, None], col_centers[None, :])
+    return board, right_relations, down_relations
+
+
+def extract_from_png(game: str, data: bytes):
+    """
+    :return: the arrays of extract_queens or extract_tango
+    """
+    image = decode_png(data)
+    return extract_queens(image) if game == QUEENS else extract_tango(image)
+
+
+def render_samples(directory: str, sizes: list, count: int, seed: int = 0, cell_size: float = 48.):
+    """
+    Write synthetic screenshots and the arrays they show, <game>_<size>_<index>.png and .npz
+    """
+    from benchmarks.generators import queens_puzzle, tango_puzzle
+
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    for size in sizes:
+        for index in range(count):
+            colors, solution = queens_puzzle(size, seed * 1_000_003 + size * 1_009 + index)
+            queens = np.where((solution == SquareState.Queen.value) & (rng.random(colors.shape) < 0.2),
+                              SquareState.Queen.value, SquareState.Free.value)
+            name = os.path.join(directory, "{}_{}_{}".format(QUEENS, size, index))
+            with open(name + ".png", "wb") as png_file:
+                png_file.write(encode_png(render_queens(colors, queens, cell_size)))
+            np.savez(name + ".npz", colors, queens)
+
+            if size % 2:
+                continue
+            board, vertical_relations, horizontal_relations, _ = tango_puzzle(size, seed * 1_000_003 + size * 1_009
+                                                                              + index)
+            name = os.path.join(directory, "{}_{}_{}".format(TANGO, size, index))
+            with open(name + ".png", "wb") as png_file:
+                png_file.write(encode_png(render_tango(board, vertical_relations, horizontal_relations, cell_size)))
+            np.savez(name + ".npz", board, vertical_relations, horizontal_relations)
+
+
+def benchmark_directory(directory: str, repeats: int = 3):
+    """
+    Decode and read every png of a directory, the .npz next to a png holds the expected arrays
+    :return: {(game, size): (median decode seconds, median extraction seconds, number read right, number of files)}
+    """
+    # the cache numbers the regions by first appearance like extract_queens does
+    from solution_cache import _relabel
+
+    timings = defaultdict(lambda: ([], [], 0, 0))
+    for file_name in sorted(os.listdir(directory)):
+        if not file_name.endswith(".png"):
+            continue
+        game = QUEENS if file_name.startswith(QUEENS) else TANGO
+        with open(os.path.join(directory, file_name), "rb") as png_file:
+            data = png_file.read()
+        best_decode = best_extract = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            image = decode_png(data)
+            decoded = time.perf_counter()
+            arrays = extract_queens(image) if game == QUEENS else extract_tango(image)
+            extracted = time.perf_counter()
+            best_decode = decoded - start if best_decode is None else min(best_decode, decoded - start)
+            best_extract = extracted - decoded if best_extract is None else min(best_extract, extracted - decoded)
+
+        expected_path = os.path.join(directory, file_name[:-len(".png")] + ".npz")
+        right = False
+        if os.path.exists(expected_path):
+            with np.load(expected_path) as expected_file:
+                expected = [expected_file["arr_{}".format(index)] for index in range(len(expected_file.files))]
+            if game == QUEENS:
+                expected[0] = _relabel(expected[0])
+            right = all(np.array_equal(array, expected_array) for array, expected_array in zip(arrays, expected))
+
+        key = (game, arrays[0].shape[0])
+        decode_times, extract_times, num_right, num_files = timings[key]
+        decode_times.append(best_decode)
+        extract_times.append(best_extract)
+        timings[key] = (decode_times, extract_times, num_right + right, num_files + 1)
+    return {key: (float(np.median(decode)), float(np.median(extract)), right, total)
+            for key, (decode, extract, right, total) in timings.items() if total}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read boards from grid screenshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    render_parser = subparsers.add_parser("render", help="write synthetic screenshots with their arrays")
+    render_parser.add_argument("directory")
+    render_parser.add_argument("--sizes", type=int, nargs="+", default=[6, 8, 10, 12, 14])
+    render_parser.add_argument("--count", type=int, default=5)
+    render_parser.add_argument("--cell-size", type=float, default=48.)
+    bench_parser = subparsers.add_parser("bench", help="time and check the extraction of saved screenshots")
+    bench_parser.add_argument("directory")
+    bench_parser.add_argument("--repeats", type=int, default=3)
+    read_parser = subparsers.add_parser("read", help="print the arrays read from one screenshot")
+    read_parser.add_argument("game", choices=(QUEENS, TANGO))
+    read_parser.add_argument("png")
+    args = parser.parse_args()
+
+    if args.command == "render":
+        render_samples(args.directory, args.sizes, args.count, cell_size=args.cell_size)
+    elif args.command == "bench":
+        print("game    size  decode ms  extract ms  right")
+        for (game_name, board_size), (decode_time, extract_time, num_right, num_files) in sorted(
+                benchmark_directory(args.directory, args.repeats).items()):
+            print("{:6s}  {:4d}  {:9.2f}  {:10.2f}  {}/{}".format(game_name, board_size, decode_time * 1e3,
+                                                                  extract_time * 1e3, num_right, num_files))
+    else:
+        with open(args.png, "rb") as screenshot:
+            for array in extract_from_png(args.game, screenshot.read()):
+                print(array)
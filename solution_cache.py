@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO, find_puzzles
+from portfolio import Portfolio
+from solver_core.enums import SquareState
+from solver_core.queens import BitboardQueensSolver
+from solver_core.tango import TangoSolver, order_relations
+
+# every rotation, with and without a transpose
+SYMMETRIES = tuple((rotations, transpose) for rotations in range(4) for transpose in (False, True))
+
+
+def _transform(array: np.ndarray, symmetry: tuple):
+    rotations, transpose = symmetry
+    array = np.rot90(array, rotations)
+    return array.T if transpose else array
+
+
+def _inverse_transform(array: np.ndarray, symmetry: tuple):
+    rotations, transpose = symmetry
+    if transpose:
+        array = array.T
+    return np.rot90(array, -rotations)
+
+
+def _relabel(colors: np.ndarray):
+    """
+    :return: colors with the regions numbered by first appearance in reading order
+    """
+    flat = colors.ravel()
+    positions = np.arange(flat.size)
+    first_index = np.full(flat.max() + 1, flat.size)
+    # with repeated indices the last write wins, going backwards that is the first appearance
+    first_index[flat[::-1]] = positions[::-1]
+    rank = np.empty_like(first_index)
+    rank[np.argsort(first_index, kind="stable")] = np.arange(len(first_index))
+    return rank[colors]
+
+
+def _canonical_key(encodings):
+    """
+    :param encodings: (symmetry, bytes) of the input under each symmetry
+    :return: digest of the smallest encoding and the symmetry giving it
+    """
+    symmetry, encoding = min(encodings, key=lambda item: item[1])
+    return hashlib.blake2b(encoding, digest_size=16).digest(), symmetry
+
+
+def queens_key(colors: np.ndarray, queens: np.ndarray):
+    """
+    Key of a Queens board that ignores the color labels and the 8 symmetries of the square
+    :return: the key and the symmetry mapping the board to its canonical form
+    """
+    encodings = []
+    for symmetry in SYMMETRIES:
+        transformed_colors = _transform(colors, symmetry)
+        transformed_queens = _transform(queens, symmetry) == SquareState.Queen.value
+        encodings.append((symmetry, bytes(transformed_colors.shape) + _relabel(transformed_colors).astype(
+            np.uint8).tobytes() + np.packbits(transformed_queens).tobytes()))
+    return _canonical_key(encodings)
+
+
+def _tango_grid(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+    """
+    Interleave cells and edges in one (2H - 1, 2W - 1) grid so both transform together
+    """
+    height, width = board.shape
+    grid = np.zeros((2 * height - 1, 2 * width - 1), dtype=np.int8)
+    grid[::2, ::2] = board
+    grid[::2, 1::2] = vertical_relations
+    grid[1::2, ::2] = horizontal_relations
+    return grid
+
+
+def tango_key(board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+    """
+    Key of a Tango board with its relations that ignores the 8 symmetries of the square
+    :return: the key and the symmetry mapping the board to its canonical form
+    """
+    grid = _tango_grid(board, vertical_relations, horizontal_relations)
+    encodings = []
+    for symmetry in SYMMETRIES:
+        transformed = _transform(grid, symmetry)
+        encodings.append((symmetry, bytes(transformed.shape) + transformed.tobytes()))
+    return _canonical_key(encodings)
+
+
+KEY_FUNCTIONS = {QUEENS: queens_key, TANGO: tango_key}
+
+
+class SolutionCache:
+    """
+    Solutions stored in canonical orientation, an LRU in memory in front of an sqlite file
+    """
+
+    def __init__(self, path: str | None = None, capacity: int = 1024, portfolio: Portfolio | None = None):
+        """
+        :param path: sqlite file, None keeps the cache in memory only
+        :param capacity: number of solutions kept in the LRU layer
+        :param portfolio: misses are raced on it instead of being solved in process
+        """
+        self.capacity = capacity
+        self.portfolio = portfolio
+        self._memory = OrderedDict()
+        # raw input bytes to canonical key, repeats skip the 8 transforms
+        self._canonical = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._connection = None
+        if path is not None:
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                                     "(key BLOB PRIMARY KEY, game TEXT, height INTEGER, width INTEGER, solution BLOB)")
+
+    def get(self, key: bytes, count: bool = True):
+        """
+        :param count: add the read to hits or misses
+        :return: the canonical solution stored under key, None if missing
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += count
+            return self._memory[key]
+
+        solution = None
+        if self._connection is not None:
+            row = self._connection.execute("SELECT height, width, solution FROM solutions WHERE key = ?",
+                                           (key,)).fetchone()
+            if row is not None:
+                height, width, data = row
+                solution = np.frombuffer(data, dtype=np.int8).reshape(height, width)
+                self._remember(key, solution)
+
+        if solution is None:
+            self.misses += count
+        else:
+            self.hits += count
+        return solution
+
+    def put(self, key: bytes, game: str, solution: np.ndarray):
+        solution = np.ascontiguousarray(solution, dtype=np.int8)
+        self._remember(key, solution)
+        if self._connection is not None:
+            self._connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)",
+                                     (key, game, solution.shape[0], solution.shape[1], solution.tobytes()))
+            self._connection.commit()
+
+    def _remember(self, key: bytes, solution: np.ndarray):
+        self._memory[key] = solution
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def _lookup_key(self, key_function, *arrays):
+        raw = b"".join(bytes(array.shape) + array.tobytes() for array in arrays)
+        if raw in self._canonical:
+            self._canonical.move_to_end(raw)
+            return self._canonical[raw]
+        canonical = self._canonical[raw] = key_function(*arrays)
+        while len(self._canonical) > self.capacity:
+            self._canonical.popitem(last=False)
+        return canonical
+
+    def lookup(self, game: str, *arrays, count: bool = True):
+        """
+        :param arrays: the puzzle in solver order, colors and queens or board and both relations
+        :param count: add the lookup to hits or misses, off for boards whose miss was already counted
+        :return: the key and the symmetry of the board, and its solution in the orientation of arrays,
+        None if it was never solved
+        """
+        key, symmetry = self._lookup_key(KEY_FUNCTIONS[game], *arrays)
+        solution = self.get(key, count)
+        if solution is not None:
+            solution = _inverse_transform(solution, symmetry).astype(arrays[1].dtype if game == QUEENS else np.int8)
+        return key, symmetry, solution
+
+    def store(self, game: str, key: bytes, symmetry: tuple, solution: np.ndarray):
+        """
+        Save the solution of the board lookup returned key and symmetry for
+        """
+        self.put(key, game, _transform(solution, symmetry))
+
+    def solve_queens(self, colors: np.ndarray, queens: np.ndarray, solver_class=BitboardQueensSolver):
+        """
+        :return: the solved queens board, from the cache if the board or one of its symmetries was seen,
+        None if the solver fails
+        """
+        key, symmetry, solution = self.lookup(QUEENS, colors, queens)
+        if solution is not None:
+            return solution
+        if self.portfolio is not None:
+            _, solution = self.portfolio.solve(QUEENS, colors, queens)
+        else:
+            solver = solver_class(colors, queens.copy())
+            solution = solver.get_queens() if solver.solve() else None
+        if solution is None:
+            return None
+        self.store(QUEENS, key, symmetry, solution)
+        return solution.astype(queens.dtype)
+
+    def solve_tango(self, board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+        """
+        :return: the solved tango board, from the cache if the board or one of its symmetries was seen,
+        None if the solver fails
+        """
+        key, symmetry, solution = self.lookup(TANGO, board, vertical_relations, horizontal_relations)
+        if solution is not None:
+            return solution
+        if self.portfolio is not None:
+            _, solution = self.portfolio.solve(TANGO, board, vertical_relations, horizontal_relations)
+        else:
+            solver = TangoSolver(board, vertical_relations, horizontal_relations)
+            solution = solver.get_tango_board() if solver.solve() else None
+        if solution is None:
+            return None
+        self.store(TANGO, key, symmetry, solution)
+        return solution.astype(np.int8)
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay an archive directory through the solution cache")
+    parser.add_argument("directory")
+    parser.add_argument("--cache", default="solutions.sqlite")
+    args = parser.parse_args()
+
+    cache = SolutionCache(args.cache)
+    start = time.perf_counter()
+    num_solved = 0
+    tasks = find_puzzles(args.directory)
+    for game, _, paths in tasks:
+        arrays = [np.load(path) for path in paths]
+        if game == QUEENS:
+            solution = cache.solve_queens(*arrays)
+        else:
+            board, first, second = arrays
+            solution = cache.solve_tango(board, *order_relations(board, first, second))
+        num_solved += solution is not None
+    cache.close()
+    print(f"solved {num_solved}/{len(tasks)} puzzles in {time.perf_counter() - start:.2f}s, "
+          f"{cache.hits} cache hits, {cache.misses} misses")
@@ -0,0 +1,10 @@
+"""
+The solvers without the browser side, importing solver_core only pulls in numpy
+"""
+from solver_core.enums import SquareState, EqualityStates, TangoBoardStates
+from solver_core.instrumentation import instrumented, SolverInstrumentation
+from solver_core.queens import QueensSolver, BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver
+from solver_core.sat import CDCLSolver, at_most_one, exactly_one, at_most_k, at_least_k, exactly_k
+from solver_core.constraints import encode_queens, encode_tango, cell_values, count_models
+from solver_core.tango import (TangoSolver, SatTangoSolver, CELL_CODES, line_patterns, relation_patterns, line_to_masks,
+                               masks_to_line, deduce_line, pack_cells, unpack_cells, order_relations)
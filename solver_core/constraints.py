@@ -0,0 +1,88 @@
+"""
+Both games as clauses on one CDCLSolver, a boolean per cell and the rules written with the cardinality
+encodings of solver_core.sat, a new game only needs a new encoder here
+"""
+import numpy as np
+
+from solver_core.enums import SquareState, TangoBoardStates, EqualityStates
+from solver_core.sat import CDCLSolver, exactly_one, exactly_k
+
+
+def _cell_variables(solver: CDCLSolver, shape: tuple):
+    return np.array(solver.new_vars(shape[0] * shape[1]), dtype=np.int64).reshape(shape)
+
+
+def encode_queens(solver: CDCLSolver, colors: np.ndarray, queens: np.ndarray):
+    """
+    One queen per row, column and color and no two queens touching, preplaced queens and occupied squares
+    are fixed
+    :return: (H, W) variables, true where a queen stands
+    """
+    cells = _cell_variables(solver, colors.shape)
+    # the givens first, the clauses they satisfy are then never stored
+    for variable in cells[queens == SquareState.Queen.value].tolist():
+        solver.add_clause([variable])
+    for variable in cells[queens == SquareState.Occupied.value].tolist():
+        solver.add_clause([-variable])
+    for line in (*cells, *cells.T):
+        exactly_one(solver, line.tolist())
+    for color in np.unique(colors):
+        exactly_one(solver, cells[colors == color].tolist())
+    # rows and columns already keep side by side queens apart, only the diagonal neighbours are left
+    for first, second in zip(cells[:-1, :-1].ravel().tolist(), cells[1:, 1:].ravel().tolist()):
+        solver.add_clause([-first, -second])
+    for first, second in zip(cells[:-1, 1:].ravel().tolist(), cells[1:, :-1].ravel().tolist()):
+        solver.add_clause([-first, -second])
+    return cells
+
+
+def encode_tango(solver: CDCLSolver, board: np.ndarray, vertical_relations: np.ndarray,
+                 horizontal_relations: np.ndarray):
+    """
+    As many suns as moons on every line, no three equal symbols in a row and the = / x relations, the
+    relation arrays are the ones of TangoSolver
+    :param vertical_relations: (H, W - 1) relations between horizontally adjacent cells
+    :param horizontal_relations: (H - 1, W) relations between vertically adjacent cells
+    :return: (H, W) variables, true where a sun stands
+    """
+    cells = _cell_variables(solver, board.shape)
+    for variable in cells[board == TangoBoardStates.Sun.value].tolist():
+        solver.add_clause([variable])
+    for variable in cells[board == TangoBoardStates.Moon.value].tolist():
+        solver.add_clause([-variable])
+    for line in (*cells, *cells.T):
+        line = line.tolist()
+        exactly_k(solver, line, len(line) // 2)
+        for first, second, third in zip(line, line[1:], line[2:]):
+            solver.add_clause([first, second, third])
+            solver.add_clause([-first, -second, -third])
+    for relations, first_cells, second_cells in ((vertical_relations, cells[:, :-1], cells[:, 1:]),
+                                                 (horizontal_relations, cells[:-1], cells[1:])):
+        for relation, first, second in zip(relations.ravel().tolist(), first_cells.ravel().tolist(),
+                                           second_cells.ravel().tolist()):
+            if relation == EqualityStates.Equal.value:
+                solver.add_clauses([[-first, second], [first, -second]])
+            elif relation == EqualityStates.NotEqual.value:
+                solver.add_clauses([[first, second], [-first, -second]])
+    return cells
+
+
+def cell_values(solver: CDCLSolver, cells: np.ndarray):
+    """
+    :return: boolean array of the cell variables in the last model
+    """
+    return np.array([solver.value(variable) for variable in cells.ravel().tolist()], dtype=bool).reshape(
+        cells.shape)
+
+
+def count_models(solver: CDCLSolver, cells: np.ndarray, limit: int = 2):
+    """
+    Count the distinct assignments of cells by blocking every model found, the solver keeps the blocking clauses
+    :return: number of models found, at most limit
+    """
+    count = 0
+    variables = cells.ravel().tolist()
+    while count < limit and solver.solve():
+        count += 1
+        solver.add_clause([-variable if solver.value(variable) else variable for variable in variables])
+    return count
@@ -0,0 +1,19 @@
+from enum import Enum
+
+
+class SquareState(Enum):
+    Free = 0
+    Queen = 1
+    Occupied = 2
+
+
+class EqualityStates(Enum):
+    Free = 0
+    Equal = 1
+    NotEqual = -1
+
+
+class TangoBoardStates(Enum):
+    Empty = 0
+    Sun = 1
+    Moon = -1
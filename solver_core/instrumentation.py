@@ -0,0 +1,109 @@
+import functools
+import json
+import time
+
+
+def instrumented(method):
+    """
+    Record the calls of a solver rule in solver.instrumentation, a single attribute check when it is None
+    the solver provides _num_decided() so the cells a rule decides can be counted
+    """
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return method(self, *args, **kwargs)
+        return self.instrumentation.call(method.__qualname__, self._num_decided, method, self, *args, **kwargs)
+
+    return wrapper
+
+
+class SolverInstrumentation:
+    """
+    Per rule calls, decided cells and wall time of one or more solves, with the board changes of every
+    propagation step, set it as solver.instrumentation before solving
+    rule counts and times are inclusive, a rule calling another one is charged for both
+    """
+
+    def __init__(self):
+        # rule qualname to {"calls", "cells", "time"}
+        self.rules = {}
+        self.counters = {}
+        self.deltas = []
+        # (call stack, start ns, duration ns) of every rule call
+        self.events = []
+        self._stack = []
+        self._origin = time.perf_counter_ns()
+
+    def call(self, name: str, num_decided, function, *args, **kwargs):
+        self._stack.append(name)
+        stack = tuple(self._stack)
+        decided = num_decided()
+        start = time.perf_counter_ns()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            duration = time.perf_counter_ns() - start
+            self._stack.pop()
+            stats = self.rules.setdefault(name, {"calls": 0, "cells": 0, "time": 0.})
+            stats["calls"] += 1
+            stats["cells"] += num_decided() - decided
+            stats["time"] += duration / 1e9
+            self.events.append((stack, start - self._origin, duration))
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_delta(self, label: str, changes):
+        """
+        :param label: propagation step, e.g. the iteration or the line
+        :param changes: list of ((row, col), value) written during the step
+        """
+        self.deltas.append({"label": label, "changes": [[row, col, value] for (row, col), value in changes]})
+
+    def to_dict(self):
+        return {"rules": self.rules, "counters": self.counters, "deltas": self.deltas}
+
+    def to_chrome_trace(self):
+        """
+        :return: the rule calls in the Chrome trace event format, opens in chrome://tracing, Perfetto or speedscope
+        """
+        return {"traceEvents": [{"name": stack[-1], "ph": "X", "ts": start / 1e3, "dur": duration / 1e3, "pid": 0,
+                                 "tid": 0} for stack, start, duration in sorted(self.events, key=lambda e: e[1])],
+                "displayTimeUnit": "ms"}
+
+    def to_folded(self):
+        """
+        :return: folded stacks with their self time in microseconds, the input of flamegraph.pl and inferno
+        """
+        total = {}
+        for stack, _, duration in self.events:
+            total[stack] = total.get(stack, 0) + duration
+        self_time = dict(total)
+        for stack, duration in total.items():
+            if len(stack) > 1 and stack[:-1] in self_time:
+                self_time[stack[:-1]] -= duration
+        return "\n".join("{} {}".format(";".join(stack), max(duration, 0) // 1000)
+                         for stack, duration in sorted(self_time.items()))
+
+    def save_json(self, path: str):
+        with open(path, "w") as json_file:
+            json.dump(self.to_dict(), json_file)
+
+    def save_chrome_trace(self, path: str):
+        with open(path, "w") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+    def save_folded(self, path: str):
+        with open(path, "w") as folded_file:
+            folded_file.write(self.to_folded() + "\n")
+
+    def summary(self):
+        lines = ["{:48s} {:>8s} {:>8s} {:>10s}".format("rule", "calls", "cells", "ms")]
+        for name, stats in sorted(self.rules.items(), key=lambda item: -item[1]["time"]):
+            lines.append("{:48s} {:8d} {:8d} {:10.3f}".format(name, stats["calls"], stats["cells"],
+                                                              stats["time"] * 1e3))
+        for name, value in sorted(self.counters.items()):
+            lines.append("{:48s} {:8d}".format(name, value))
+        return "\n".join(lines)
+
@@ -0,0 +1,901 @@
+import time
+
+import numpy as np
+
+from solver_core.constraints import encode_queens, cell_values, count_models
+from solver_core.enums import SquareState
+from solver_core.instrumentation import instrumented
+from solver_core.sat import CDCLSolver
+
+
+def _touching(mask: np.ndarray):
+    """
+    :return: mask of the squares next to a square of mask, diagonals included
+    """
+    padded = np.pad(mask, 1)
+    height, width = mask.shape
+    touching = np.zeros(mask.shape, dtype=bool)
+    for row_shift in (0, 1, 2):
+        for col_shift in (0, 1, 2):
+            if row_shift != 1 or col_shift != 1:
+                touching |= padded[row_shift:row_shift + height, col_shift:col_shift + width]
+    return touching
+
+
+def _maximum_matching(adjacency, num_right):
+    """
+    Maximum bipartite matching with augmenting paths
+    :param adjacency: for every left vertex the list of right vertices it can be matched to
+    :param num_right: number of right vertices
+    :return: for every right vertex the matched left vertex or None
+    """
+    right_match = [None] * num_right
+
+    def augment(left, visited):
+        for right in adjacency[left]:
+            if right not in visited:
+                visited.add(right)
+                if right_match[right] is None or augment(right_match[right], visited):
+                    right_match[right] = left
+                    return True
+        return False
+
+    for left in range(len(adjacency)):
+        augment(left, set())
+    return right_match
+
+
+class QueensSolver:
+    MAX_NUM_ITER = 100
+    # seconds search may take before solve gives up, bounds the worst case of the backtracking
+    SEARCH_TIME_LIMIT = 10.
+    # set to a SolverInstrumentation to record the rules
+    instrumentation = None
+
+    def __init__(self, colors: np.ndarray, queens: np.ndarray, full_search: bool = False):
+        """
+        :param full_search: n_color_checker compares every color against all the others, slower rounds
+        that can find confined sets sooner
+        """
+        self.colors = colors
+        self.queens = queens
+        self.full_search = full_search
+        self.eliminated_colors = []
+
+        # every write to the board is recorded as (flat indices, previous values) so search can undo it
+        self._trail = []
+        # moves played through place as ((row, col), value, mark before the move)
+        self._moves = []
+        self.nodes_visited = 0
+        self.solve_time = 0.
+        self.timed_out = False
+
+    def append_queen(self, row, col):
+        mask = self.__create_queen_mask(np.array([row, col]))
+        self._occupy(mask)
+        self._set_squares((row, col), SquareState.Queen.value)
+        # eliminate the color
+        self.eliminated_colors.append(self.colors[row, col])
+
+    @instrumented
+    def solve(self, search: bool = True, time_limit: float | None = SEARCH_TIME_LIMIT):
+        """
+        Propagate the eliminators and, if they stall, backtrack over the most constrained color
+        :param search: fall back to backtracking search when propagation stalls
+        :param time_limit: max number of seconds spent searching, None for no bound
+        :return: True if all queens were found
+        """
+        start = time.perf_counter()
+        self.nodes_visited = 0
+        self.timed_out = False
+
+        # first pass to eliminate around queens
+        queen_positions_rows, queen_positions_col = np.where(self.queens == SquareState.Queen.value)
+        for queen_position in zip(queen_positions_rows, queen_positions_col):
+            self.append_queen(queen_position[0], queen_position[1])
+
+        # iterate until all queens are found or nothing changes anymore
+        self._propagate(QueensSolver.MAX_NUM_ITER)
+
+        if search and not self.is_solved() and not self._is_contradiction():
+            deadline = None if time_limit is None else start + time_limit
+            mark = self._mark()
+            try:
+                self._search(deadline)
+            except TimeoutError:
+                # drop the guesses of the interrupted branch
+                self._undo(mark)
+                self.timed_out = True
+
+        self.solve_time = time.perf_counter() - start
+        return bool(self.is_solved())
+
+    def is_solved(self):
+        return np.sum(self.queens == SquareState.Queen.value) == len(self.queens)
+
+    @instrumented
+    def _propagate(self, max_iter: int | None = None):
+        """
+        Run the eliminators until the board stops changing
+        :param max_iter: max number of rounds, None to go to the fixpoint
+        :return: False if the board became contradictory
+        """
+        iteration = 0
+        while max_iter is None or iteration < max_iter:
+            iteration += 1
+            if self._is_contradiction():
+                return False
+            if self.is_solved():
+                return True
+
+            trail_length = len(self._trail)
+            self.simple_possibilities_eliminator()
+
+            # if the board is equal to the previous one deeper search
+            if len(self._trail) == trail_length:
+                self.semi_greedy_eliminator()
+                if len(self._trail) == trail_length:
+                    break
+            if self.instrumentation is not None:
+                self.instrumentation.record_delta("iteration {}".format(iteration), self._changes_since(trail_length))
+        else:
+            if self.instrumentation is not None:
+                self.instrumentation.count("max_num_iter_reached")
+        return not self._is_contradiction()
+
+    def _num_decided(self):
+        return int(np.count_nonzero(self.queens != SquareState.Free.value))
+
+    def _is_contradiction(self):
+        free = self.queens == SquareState.Free.value
+        queens = self.queens == SquareState.Queen.value
+        # a row or col without queen needs a free square
+        if np.any(~np.any(free | queens, axis=0)) or np.any(~np.any(free | queens, axis=1)):
+            return True
+        uncovered_unique_colors = np.setdiff1d(np.unique(self.colors), self.eliminated_colors)
+        return not np.all(np.isin(uncovered_unique_colors, self.colors[free]))
+
+    def _search(self, deadline: float | None):
+        """
+        Depth first search branching on a free square of the color with the fewest free squares
+        :param deadline: perf_counter value after which TimeoutError is raised
+        :return: True if the board was solved, on failure the board is left as it was found
+        """
+        self.nodes_visited += 1
+        if deadline is not None and time.perf_counter() > deadline:
+            raise TimeoutError("Queens search exceeded its time limit")
+
+        uncovered_unique_colors = np.setdiff1d(np.unique(self.colors), self.eliminated_colors)
+        free = self.queens == SquareState.Free.value
+        color_sizes = [np.sum(free & (self.colors == color)) for color in uncovered_unique_colors]
+        color = uncovered_unique_colors[int(np.argmin(color_sizes))]
+
+        row, col = np.column_stack(np.where(free & (self.colors == color)))[0]
+
+        # either the queen of the color is on its first free square or that square is occupied
+        mark = self._mark()
+        self.append_queen(row, col)
+        if self._propagate() and (self.is_solved() or self._search(deadline)):
+            return True
+        self._undo(mark)
+
+        self._occupy((row, col))
+        if self._propagate() and (self.is_solved() or self._search(deadline)):
+            return True
+        self._undo(mark)
+        return False
+
+    def _set_squares(self, index, value):
+        """
+        Write value on the board at index and record the previous values on the trail
+        :param index: anything numpy can index the board with
+        :param value: the new square state value
+        """
+        mask = np.zeros(self.queens.shape, dtype=bool)
+        mask[index] = True
+        flat_indices = np.flatnonzero(mask & (self.queens != value))
+        if flat_indices.size:
+            self._trail.append((flat_indices, self.queens.flat[flat_indices].copy()))
+            self.queens.flat[flat_indices] = value
+
+    def _occupy(self, index):
+        """
+        Mark the free squares at index as occupied
+        """
+        mask = np.zeros(self.queens.shape, dtype=bool)
+        mask[index] = True
+        self._set_squares(mask & (self.queens == SquareState.Free.value), SquareState.Occupied.value)
+
+    def _mark(self):
+        return len(self._trail), len(self.eliminated_colors)
+
+    def _undo(self, mark):
+        trail_length, num_eliminated_colors = mark
+        while len(self._trail) > trail_length:
+            flat_indices, previous_values = self._trail.pop()
+            self.queens.flat[flat_indices] = previous_values
+        del self.eliminated_colors[num_eliminated_colors:]
+
+    def place(self, cell, value: int):
+        """
+        Play one move on the current board and propagate only the rows, columns and colors it touches
+        the preplaced queens are not propagated, call solve(search=False) first for that
+        :param cell: (row, col) of the move
+        :param value: SquareState.Queen.value or SquareState.Occupied.value
+        :return: list of ((row, col), value) squares written by the move and its consequences
+        """
+        row, col = int(cell[0]), int(cell[1])
+        mark = self._mark()
+        current = self.queens[row, col]
+        if current != value:
+            if current != SquareState.Free.value:
+                raise ValueError("Square {} is already {}".format(cell, SquareState(current).name))
+            if value == SquareState.Queen.value:
+                if self.colors[row, col] in self.eliminated_colors:
+                    raise ValueError("Color {} already has a queen".format(self.colors[row, col]))
+                self.append_queen(row, col)
+                # the other squares of the region are out as well
+                self._occupy(self.colors == self.colors[row, col])
+            else:
+                self._occupy((row, col))
+
+        if not self._propagate_changes(mark[0]):
+            self._undo(mark)
+            raise ValueError("Move {} on {} leaves a row, column or color without queen".format(value, cell))
+        self._moves.append(((row, col), value, mark))
+        return self._changes_since(mark[0])
+
+    def retract(self, cell):
+        """
+        Take back the last move played on cell, the moves played after it are replayed on the freed board
+        """
+        cell = (int(cell[0]), int(cell[1]))
+        for move_index in range(len(self._moves) - 1, -1, -1):
+            if self._moves[move_index][0] == cell:
+                break
+        else:
+            raise ValueError("No move was played on {}".format(cell))
+
+        later_moves = self._moves[move_index + 1:]
+        saved_state = (self.queens.copy(), list(self._trail), list(self.eliminated_colors), list(self._moves))
+        self._undo(self._moves[move_index][2])
+        del self._moves[move_index:]
+        try:
+            for later_cell, value, _ in later_moves:
+                self.place(later_cell, value)
+        except ValueError:
+            # a later move is impossible without this one, leave the board as it was before the retract
+            queens, self._trail, self.eliminated_colors, self._moves = saved_state
+            self.queens[...] = queens
+            raise
+
+    def _changes_since(self, trail_length: int):
+        flat_indices = np.unique(np.concatenate([indices for indices, _ in self._trail[trail_length:]] or [[]])
+                                 ).astype(int)
+        return [(tuple(int(coordinate) for coordinate in np.unravel_index(index, self.queens.shape)),
+                 int(self.queens.flat[index])) for index in flat_indices]
+
+    def _propagate_changes(self, trail_length: int, pending: set | None = None):
+        """
+        Worklist propagation over the rows, columns and colors of the squares written since trail_length
+        a line or color with a single free square gets its queen, a color confined to a line takes it,
+        the free squares of colors that already have their queen do not count for the lines
+        :param pending: ("row" | "col" | "color", key) to check on top of the written squares
+        :return: False if a row, column or color has no square left for its queen
+        """
+        pending = set() if pending is None else set(pending)
+        position = trail_length
+        while True:
+            while position < len(self._trail):
+                flat_indices = self._trail[position][0]
+                position += 1
+                rows, cols = np.unravel_index(flat_indices, self.queens.shape)
+                pending.update(("row", int(row)) for row in rows)
+                pending.update(("col", int(col)) for col in cols)
+                pending.update(("color", color) for color in self.colors.flat[flat_indices].tolist())
+            if not pending:
+                return True
+
+            kind, key = pending.pop()
+            if kind == "color":
+                if key in self.eliminated_colors:
+                    continue
+                free = (self.colors == key) & (self.queens == SquareState.Free.value)
+            else:
+                free = np.zeros(self.queens.shape, dtype=bool)
+                line = (key, slice(None)) if kind == "row" else (slice(None), key)
+                if np.any(self.queens[line] == SquareState.Queen.value):
+                    continue
+                free[line] = ((self.queens[line] == SquareState.Free.value) &
+                              ~np.isin(self.colors[line], self.eliminated_colors))
+
+            rows, cols = np.nonzero(free)
+            if rows.size == 0:
+                return False
+            if rows.size == 1:
+                self.append_queen(rows[0], cols[0])
+                self._occupy(self.colors == self.colors[rows[0], cols[0]])
+            elif kind == "color" and np.all(rows == rows[0]):
+                self._occupy((rows[0], self.colors[rows[0]] != key))
+            elif kind == "color" and np.all(cols == cols[0]):
+                self._occupy((self.colors[:, cols[0]] != key, cols[0]))
+
+    def deduce(self, level: int = 3):
+        """
+        Propagate without guessing, with the rule sets up to level
+        1: a row, column or color with a single free square gets its queen, a color inside one line takes it
+        2: adds simple_possibilities_eliminator, a line only one color can use belongs to it
+        3: adds semi_greedy_eliminator, border blockers and confined sets of colors
+        :return: False if the board became contradictory
+        """
+        for row, col in zip(*np.where(self.queens == SquareState.Queen.value)):
+            if self.colors[row, col] not in self.eliminated_colors:
+                self.append_queen(row, col)
+
+        everything = ({("row", row) for row in range(self.queens.shape[0])} |
+                      {("col", col) for col in range(self.queens.shape[1])} |
+                      {("color", color) for color in np.unique(self.colors).tolist()})
+        while not self.is_solved():
+            trail_length = len(self._trail)
+            if not self._propagate_changes(trail_length, everything):
+                return False
+            if level >= 2 and len(self._trail) == trail_length:
+                self.simple_possibilities_eliminator()
+            if level >= 3 and len(self._trail) == trail_length:
+                self.semi_greedy_eliminator()
+            if len(self._trail) == trail_length or self._is_contradiction():
+                break
+        return not self._is_contradiction()
+
+    @instrumented
+    def semi_greedy_eliminator(self):
+        unique_colors = np.unique(self.colors)
+        uncovered_unique_colors = np.setdiff1d(unique_colors, self.eliminated_colors)
+        for color in uncovered_unique_colors:
+            self.eliminate_border_blockers(color)
+            self.n_color_checker(color, uncovered_unique_colors, full_search=self.full_search)
+
+    @instrumented
+    def eliminate_border_blockers(self, color):
+        # get all the border squares
+        free_color_spots = (self.colors == color) & (self.queens == SquareState.Free.value)
+        next_points_to_test = _touching(free_color_spots) & (~free_color_spots) & (
+                self.queens == SquareState.Free.value)
+        indices = np.column_stack(np.where(next_points_to_test))
+        for index in indices:
+            mask = self.__create_queen_mask(index)
+            if not np.any((~mask & free_color_spots)):
+                self._occupy(tuple(index))
+
+    @instrumented
+    def n_color_checker(self, color, uncovered_color_list, full_search=False):
+        """
+        check if there are patterns of n colors using n cols (or rows) limiting queens to these n colors
+        the confined sets are found with a matching between colors and lines so it runs in polynomial time
+        :param color:
+        :param uncovered_color_list:
+        :param full_search: check against every other color instead of the colors after color
+        :return:
+        """
+        colors_to_check = uncovered_color_list.copy()
+        if full_search:
+            colors_to_check = colors_to_check[colors_to_check != color]
+        else:
+            colors_to_check = colors_to_check[np.where(colors_to_check == color)[0][0] + 1:]
+
+        if len(colors_to_check) < 2:
+            return
+
+        # axis 0 gives the active columns of each color, axis 1 the active rows
+        for axis in (0, 1):
+            self.__hall_set_eliminator(colors_to_check, axis)
+
+    def __hall_set_eliminator(self, colors_to_check, axis):
+        """
+        Eliminate the squares of the lines that a set of n colors confines to n lines
+        :param colors_to_check: colors the confined sets are made of
+        :param axis: 0 to work on columns, 1 to work on rows
+        """
+        free = self.queens == SquareState.Free.value
+        color_masks = [(self.colors == color) & free for color in colors_to_check]
+        color_lines = [np.flatnonzero(np.any(color_mask, axis=axis)).tolist() for color_mask in color_masks]
+        num_lines = self.queens.shape[1 - axis]
+
+        line_match = _maximum_matching(color_lines, num_lines)
+        color_match = [None] * len(colors_to_check)
+        for line, color_index in enumerate(line_match):
+            if color_index is not None:
+                color_match[color_index] = line
+        # some colors do not fit in distinct lines, the board is contradictory
+        if None in color_match:
+            return
+
+        # lines reachable from an unmatched line through alternating paths can be freed, the others are confined
+        line_colors = [[] for _ in range(num_lines)]
+        for color_index, lines in enumerate(color_lines):
+            for line in lines:
+                line_colors[line].append(color_index)
+        reachable_lines = [line_match[line] is None for line in range(num_lines)]
+        stack = [line for line in range(num_lines) if reachable_lines[line]]
+        while stack:
+            for color_index in line_colors[stack.pop()]:
+                line = color_match[color_index]
+                if not reachable_lines[line]:
+                    reachable_lines[line] = True
+                    stack.append(line)
+
+        # colors in the same alternating cycle can swap their lines
+        num_colors = len(colors_to_check)
+        color_reach = []
+        for color_index in range(num_colors):
+            seen = {color_index}
+            stack = [color_index]
+            while stack:
+                for line in color_lines[stack.pop()]:
+                    other_color_index = line_match[line]
+                    if other_color_index is not None and other_color_index not in seen:
+                        seen.add(other_color_index)
+                        stack.append(other_color_index)
+            color_reach.append(seen)
+
+        for line in range(num_lines):
+            if reachable_lines[line]:
+                continue
+            owner = line_match[line]
+            allowed = np.zeros(self.queens.shape, dtype=bool)
+            for color_index in range(num_colors):
+                if color_index in color_reach[owner] and owner in color_reach[color_index]:
+                    allowed |= color_masks[color_index]
+            zone_to_eliminate = np.zeros(self.queens.shape, dtype=bool)
+            if axis == 0:
+                zone_to_eliminate[:, line] = True
+            else:
+                zone_to_eliminate[line, :] = True
+            self._occupy(zone_to_eliminate & ~allowed)
+
+    def __create_queen_mask(self, index):
+        mask = np.zeros(self.queens.shape, dtype=bool)
+        mask[:, index[1]] = True
+        mask[index[0], :] = True
+        mask[max(index[0] - 1, 0):min(index[0] + 2, self.queens.shape[0]),
+        max(index[1] - 1, 0): min(index[1] + 2, self.queens.shape[1])] = True
+        mask[index[0], index[1]] = False
+        return mask
+
+    @instrumented
+    def simple_possibilities_eliminator(self):
+        unique_colors = np.unique(self.colors)
+        uncovered_unique_colors = np.setdiff1d(unique_colors, self.eliminated_colors)
+        # first pass try to find easy queens
+        for color in uncovered_unique_colors:
+            free_color_spots = (self.colors == color) & (self.queens == SquareState.Free.value)
+            # if one spot is left for the color
+            if np.sum(free_color_spots) == 1:
+                row, col = np.where(free_color_spots)
+                self.append_queen(row[0], col[0])
+
+        # second pass
+        uncovered_unique_colors = np.setdiff1d(unique_colors, self.eliminated_colors)
+        for color in uncovered_unique_colors:
+            self.handle_color_in_depth(color)
+
+    @instrumented
+    def handle_color_in_depth(self, color):
+        if color not in self.colors:
+            return
+
+        free_color_spots = (self.colors == color) & (self.queens == SquareState.Free.value)
+
+        # if all the free spots are on the same row or column
+        if np.sum(free_color_spots) == 0:
+            return
+        indices = np.column_stack(np.where(free_color_spots))
+        if np.all(indices[:, 0] == indices[0, 0]):
+            row_mask = np.zeros(self.queens.shape, dtype=bool)
+            row_mask[indices[0, 0], :] = True
+            self._occupy(row_mask & ~free_color_spots)
+
+        if np.all(indices[:, 1] == indices[0, 1]):
+            col_mask = np.zeros(self.queens.shape, dtype=bool)
+            col_mask[:, indices[0, 1]] = True
+            self._occupy(col_mask & ~free_color_spots)
+
+        # if a color is the only one remaining in a row or column eliminate the rest
+        possibility_and_color = (self.colors == color) | (self.queens == SquareState.Occupied.value)
+        full_col_care = np.all(possibility_and_color, axis=0)
+        col = np.where(full_col_care)
+        if col[0].size == 1:
+            mask = np.ones(self.queens.shape, dtype=bool)
+            mask[:, col] = False
+            self._occupy((self.colors == color) & mask)
+
+        full_row_care = np.all(possibility_and_color, axis=1)
+        row = np.where(full_row_care)
+        if row[0].size == 1:
+            mask = np.ones(self.queens.shape, dtype=bool)
+            mask[row, :] = False
+            self._occupy((self.colors == color) & mask)
+
+    def get_queens(self):
+        return self.queens
+
+    def __str__(self):
+        return str(self.queens)
+
+
+class BitboardQueensSolver:
+    """
+    Queens solver keeping the board as python integer bitboards, cell (row, col) is bit row * n_cols + col
+    """
+    # attack masks only depend on the board shape so they are shared between solvers
+    _attack_masks_cache = {}
+
+    def __init__(self, colors: np.ndarray, queens: np.ndarray):
+        self.colors = colors
+        self.queens = queens
+        self.n_rows, self.n_cols = colors.shape
+        self.nodes_visited = 0
+
+        self.row_masks = [((1 << self.n_cols) - 1) << (row * self.n_cols) for row in range(self.n_rows)]
+        self.attack_masks = self.__get_attack_masks(colors.shape)
+
+        # one int per color region
+        self.region_masks = {}
+        for index, color in enumerate(colors.flat):
+            self.region_masks[color] = self.region_masks.get(color, 0) | (1 << index)
+
+    @classmethod
+    def __get_attack_masks(cls, shape):
+        if shape not in cls._attack_masks_cache:
+            n_rows, n_cols = shape
+            attack_masks = []
+            for row in range(n_rows):
+                for col in range(n_cols):
+                    mask = 0
+                    for other_row in range(n_rows):
+                        for other_col in range(n_cols):
+                            if other_row == row or other_col == col or (
+                                    abs(other_row - row) <= 1 and abs(other_col - col) <= 1):
+                                mask |= 1 << (other_row * n_cols + other_col)
+                    # the queen itself is not attacked
+                    attack_masks.append(mask & ~(1 << (row * n_cols + col)))
+            cls._attack_masks_cache[shape] = attack_masks
+        return cls._attack_masks_cache[shape]
+
+    def solve(self):
+        """
+        Place the preplaced queens then search over the most constrained color region
+        :return: True if a full solution was found
+        """
+        solutions = self.__run(1)
+        if not solutions:
+            return False
+
+        self.queens = np.full(self.colors.shape, SquareState.Occupied.value, dtype=self.queens.dtype)
+        self.queens.flat[solutions[0]] = SquareState.Queen.value
+        return True
+
+    def count_solutions(self, limit: int = 2):
+        """
+        Count the solutions of the board, stopping at limit
+        :param limit: stop counting once this many solutions are found, 2 is enough to check uniqueness
+        :return: number of solutions found
+        """
+        return len(self.__run(limit))
+
+    def __run(self, limit):
+        free = (1 << (self.n_rows * self.n_cols)) - 1
+        open_regions = dict(self.region_masks)
+        open_rows = (1 << self.n_rows) - 1
+        placed = []
+
+        self.nodes_visited = 0
+        for index in np.flatnonzero(self.queens == SquareState.Queen.value):
+            index = int(index)
+            if not free >> index & 1:
+                return []
+            free &= ~self.attack_masks[index] & ~(1 << index)
+            open_regions.pop(self.colors.flat[index], None)
+            open_rows &= ~(1 << (index // self.n_cols))
+            placed.append(index)
+
+        solutions = []
+        self.__search(free, list(open_regions.values()), open_rows, placed, solutions, limit)
+        return solutions
+
+    def __search(self, free, open_regions, open_rows, placed, solutions, limit):
+        """
+        Append the solutions below this node to solutions until there are limit of them
+        """
+        self.nodes_visited += 1
+        if not open_regions:
+            if open_rows == 0:
+                solutions.append(placed)
+            return
+
+        # every row without a queen still needs a free square
+        rows = open_rows
+        while rows:
+            row_bit = rows & -rows
+            if not free & self.row_masks[row_bit.bit_length() - 1]:
+                return
+            rows ^= row_bit
+
+        # pick the region with the fewest free squares
+        best_position = 0
+        best_free = open_regions[0] & free
+        best_count = best_free.bit_count()
+        for position in range(1, len(open_regions)):
+            region_free = open_regions[position] & free
+            count = region_free.bit_count()
+            if count < best_count:
+                best_position, best_free, best_count = position, region_free, count
+                if count == 0:
+                    break
+        if best_count == 0:
+            return
+
+        remaining_regions = open_regions[:best_position] + open_regions[best_position + 1:]
+        candidates = best_free
+        while candidates and len(solutions) < limit:
+            bit = candidates & -candidates
+            candidates ^= bit
+            index = bit.bit_length() - 1
+            self.__search(free & ~self.attack_masks[index] & ~bit, remaining_regions,
+                          open_rows & ~(1 << (index // self.n_cols)), placed + [index], solutions, limit)
+
+    def get_queens(self):
+        return self.queens
+
+    def __str__(self):
+        return str(self.queens)
+
+
+class DancingLinksQueensSolver:
+    """
+    Queens as an exact cover solved with Algorithm X on dancing links
+    primary columns are the rows, cols and colors, secondary columns are the 2x2 blocks (no touching queens)
+    """
+
+    def __init__(self, colors: np.ndarray, queens: np.ndarray):
+        self.colors = colors
+        self.queens = queens
+        self.n_rows, self.n_cols = colors.shape
+        self.nodes_visited = 0
+        self._solutions = []
+
+        unique_colors = np.unique(colors)
+        color_column = {color: index for index, color in enumerate(unique_colors)}
+        num_primary = self.n_rows + self.n_cols + len(unique_colors)
+        num_blocks = max(self.n_rows - 1, 0) * max(self.n_cols - 1, 0)
+        num_columns = num_primary + num_blocks
+
+        # node 0 is the root, nodes 1..num_columns the column headers
+        self._left = [column - 1 for column in range(num_columns + 1)]
+        self._right = [column + 1 for column in range(num_columns + 1)]
+        self._left[0] = num_primary
+        self._right[num_primary] = 0
+        # secondary columns are not linked to the root
+        for column in range(num_primary + 1, num_columns + 1):
+            self._left[column] = column
+            self._right[column] = column
+        self._up = list(range(num_columns + 1))
+        self._down = list(range(num_columns + 1))
+        self._column = list(range(num_columns + 1))
+        self._cell = [None] * (num_columns + 1)
+        self._size = [0] * (num_columns + 1)
+
+        # one option per square, remember its first node
+        self._square_nodes = {}
+        for row in range(self.n_rows):
+            for col in range(self.n_cols):
+                columns = [1 + row, 1 + self.n_rows + col, 1 + self.n_rows + self.n_cols + color_column[colors[row, col]]]
+                for block_row in range(max(row - 1, 0), min(row + 1, self.n_rows - 1)):
+                    for block_col in range(max(col - 1, 0), min(col + 1, self.n_cols - 1)):
+                        columns.append(1 + num_primary + block_row * (self.n_cols - 1) + block_col)
+                self._square_nodes[(row, col)] = self.__append_option(columns, row * self.n_cols + col)
+
+    def __append_option(self, columns, cell):
+        first = len(self._column)
+        for offset, column in enumerate(columns):
+            node = first + offset
+            self._column.append(column)
+            self._cell.append(cell)
+            self._up.append(self._up[column])
+            self._down.append(column)
+            self._down[self._up[column]] = node
+            self._up[column] = node
+            self._size[column] += 1
+            self._left.append(first + (offset - 1) % len(columns))
+            self._right.append(first + (offset + 1) % len(columns))
+        return first
+
+    def __cover(self, column):
+        self._right[self._left[column]] = self._right[column]
+        self._left[self._right[column]] = self._left[column]
+        row_node = self._down[column]
+        while row_node != column:
+            node = self._right[row_node]
+            while node != row_node:
+                self._down[self._up[node]] = self._down[node]
+                self._up[self._down[node]] = self._up[node]
+                self._size[self._column[node]] -= 1
+                node = self._right[node]
+            row_node = self._down[row_node]
+
+    def __uncover(self, column):
+        row_node = self._up[column]
+        while row_node != column:
+            node = self._left[row_node]
+            while node != row_node:
+                self._size[self._column[node]] += 1
+                self._down[self._up[node]] = node
+                self._up[self._down[node]] = node
+                node = self._left[node]
+            row_node = self._up[row_node]
+        self._right[self._left[column]] = column
+        self._left[self._right[column]] = column
+
+    def __select(self, row_node):
+        node = row_node
+        while True:
+            self.__cover(self._column[node])
+            node = self._right[node]
+            if node == row_node:
+                break
+
+    def __deselect(self, row_node):
+        node = self._left[row_node]
+        while True:
+            self.__uncover(self._column[node])
+            if node == row_node:
+                break
+            node = self._left[node]
+
+    def __search(self, partial, limit):
+        self.nodes_visited += 1
+        if self._right[0] == 0:
+            self._solutions.append(list(partial))
+            return
+
+        # most constrained primary column
+        column = self._right[0]
+        best_column = column
+        while column != 0:
+            if self._size[column] < self._size[best_column]:
+                best_column = column
+            column = self._right[column]
+        if self._size[best_column] == 0:
+            return
+
+        self.__cover(best_column)
+        row_node = self._down[best_column]
+        while row_node != best_column and len(self._solutions) < limit:
+            partial.append(self._cell[row_node])
+            node = self._right[row_node]
+            while node != row_node:
+                self.__cover(self._column[node])
+                node = self._right[node]
+
+            self.__search(partial, limit)
+
+            node = self._left[row_node]
+            while node != row_node:
+                self.__uncover(self._column[node])
+                node = self._left[node]
+            partial.pop()
+            row_node = self._down[row_node]
+        self.__uncover(best_column)
+
+    def __run(self, limit):
+        self.nodes_visited = 0
+        self._solutions = []
+
+        # the preplaced queens are selected before the search
+        selected = []
+        covered_columns = set()
+        for row, col in zip(*np.where(self.queens == SquareState.Queen.value)):
+            row_node = self._square_nodes[(row, col)]
+            option_columns = {self._column[node] for node in self.__option_nodes(row_node)}
+            # a column of this option was already covered by another preplaced queen
+            if option_columns & covered_columns:
+                break
+            covered_columns |= option_columns
+            self.__select(row_node)
+            selected.append(row_node)
+        else:
+            self.__search([self._cell[row_node] for row_node in selected], limit)
+
+        for row_node in reversed(selected):
+            self.__deselect(row_node)
+
+    def __option_nodes(self, row_node):
+        nodes = [row_node]
+        node = self._right[row_node]
+        while node != row_node:
+            nodes.append(node)
+            node = self._right[node]
+        return nodes
+
+    def solve(self):
+        """
+        Find the first exact cover
+        :return: True if a solution was found
+        """
+        self.__run(1)
+        if not self._solutions:
+            return False
+        self.queens = np.full(self.colors.shape, SquareState.Occupied.value, dtype=self.queens.dtype)
+        self.queens.flat[self._solutions[0]] = SquareState.Queen.value
+        return True
+
+    def count_solutions(self, limit: int = 2):
+        """
+        Count the solutions of the board, stopping at limit
+        :param limit: stop counting once this many solutions are found, 2 is enough to check uniqueness
+        :return: number of solutions found
+        """
+        self.__run(limit)
+        return len(self._solutions)
+
+    def get_solutions(self):
+        """
+        :return: the queens boards of the solutions found by the last solve or count_solutions
+        """
+        solutions = []
+        for cells in self._solutions:
+            solution = np.full(self.colors.shape, SquareState.Occupied.value, dtype=self.queens.dtype)
+            solution.flat[cells] = SquareState.Queen.value
+            solutions.append(solution)
+        return solutions
+
+    def get_queens(self):
+        return self.queens
+
+    def __str__(self):
+        return str(self.queens)
+
+
+class SatQueensSolver:
+    """
+    Queens encoded by solver_core.constraints and solved by the CDCL engine
+    """
+
+    def __init__(self, colors: np.ndarray, queens: np.ndarray):
+        self.colors = colors
+        self.queens = queens
+        self.nodes_visited = 0
+
+    def _encode(self):
+        solver = CDCLSolver()
+        return solver, encode_queens(solver, self.colors, self.queens)
+
+    def solve(self):
+        """
+        :return: True if a solution was found
+        """
+        solver, cells = self._encode()
+        solved = solver.solve()
+        self.nodes_visited = solver.decisions
+        if not solved:
+            return False
+        self.queens = np.where(cell_values(solver, cells), SquareState.Queen.value,
+                               SquareState.Occupied.value).astype(self.queens.dtype)
+        return True
+
+    def count_solutions(self, limit: int = 2):
+        """
+        Count the solutions of the board, stopping at limit
+        :param limit: stop counting once this many solutions are found, 2 is enough to check uniqueness
+        :return: number of solutions found
+        """
+        solver, cells = self._encode()
+        count = count_models(solver, cells, limit)
+        self.nodes_visited = solver.decisions
+        return count
+
+    def get_queens(self):
+        return self.queens
+
+    def __str__(self):
+        return str(self.queens)
@@ -0,0 +1,434 @@
+import heapq
+
+
+def _luby(index: int):
+    """
+    :return: the index-th term of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ..., index starting at 0
+    """
+    size, power = 1, 0
+    while size < index + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != index:
+        size = (size - 1) >> 1
+        power -= 1
+        index %= size
+    return 1 << power
+
+
+class CDCLSolver:
+    """
+    Conflict driven clause learning on DIMACS style clauses, variables are 1, 2, ... and -v is the negation of v
+    Two watched literals per clause, first UIP learning with non chronological backjumping, VSIDS branching
+    with saved phases, Luby restarts and removal of the learned clauses with the most decision levels
+    Inside, literal v is 2 * v and -v is 2 * v + 1 so the negation of a literal is lit ^ 1
+    """
+    # conflicts between restarts are this times the Luby sequence
+    RESTART_UNIT = 64
+    ACTIVITY_DECAY = 0.95
+
+    def __init__(self, num_vars: int = 0):
+        self.num_vars = 0
+        # 1 true, -1 false, 0 unassigned, indexed by internal literal
+        self._values = [0, 0]
+        self._levels = [0]
+        # clause that implied a variable, None for decisions and unassigned variables
+        self._reasons = [None]
+        self._activity = [0.]
+        # last value of every variable, branching tries it again
+        self._phases = [False]
+        # clauses watching a literal, visited when the literal becomes false
+        self._watches = [[], []]
+        self._heap = []
+        self._bump = 1.
+
+        self._clauses = []
+        self._learned = []
+        # number of decision levels of every learned clause, keyed by id
+        self._glue = {}
+        self._max_learned = 2000
+        self._trail = []
+        # trail length at the start of every decision level
+        self._trail_limits = []
+        self._queue_head = 0
+        # False once the clauses are known to be unsatisfiable
+        self._ok = True
+        self._model = None
+
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+        for _ in range(num_vars):
+            self.new_var()
+
+    def new_var(self):
+        """
+        :return: the new variable
+        """
+        self.num_vars += 1
+        self._values += [0, 0]
+        self._levels.append(0)
+        self._reasons.append(None)
+        self._activity.append(0.)
+        self._phases.append(False)
+        self._watches += [[], []]
+        heapq.heappush(self._heap, (0., self.num_vars))
+        return self.num_vars
+
+    def new_vars(self, count: int):
+        """
+        :return: list of count new variables
+        """
+        return [self.new_var() for _ in range(count)]
+
+    def add_clause(self, literals):
+        """
+        Add a clause at the root, literals false at the root are dropped and satisfied clauses are skipped
+        :param literals: iterable of non zero ints
+        :return: False if the clauses became unsatisfiable
+        """
+        if not self._ok:
+            return False
+        if self._trail_limits:
+            self._backtrack(0)
+        values = self._values
+        clause = []
+        for literal in literals:
+            if literal == 0 or abs(literal) > self.num_vars:
+                raise ValueError("Unknown literal {}".format(literal))
+            internal = 2 * literal if literal > 0 else -2 * literal + 1
+            value = values[internal]
+            if value == 1 or internal ^ 1 in clause:
+                return True
+            if value == 0 and internal not in clause:
+                clause.append(internal)
+
+        if not clause:
+            self._ok = False
+        elif len(clause) == 1:
+            self._assign(clause[0], None)
+            self._ok = self._propagate() is None
+        else:
+            self._clauses.append(clause)
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+        return self._ok
+
+    def add_clauses(self, clauses):
+        for clause in clauses:
+            if not self.add_clause(clause):
+                return False
+        return True
+
+    def solve(self, conflict_limit: int | None = None):
+        """
+        :param conflict_limit: give up after this many conflicts
+        :return: True if satisfiable, False if not, None if the limit was reached first
+        """
+        self._model = None
+        if not self._ok:
+            return False
+        start_conflicts = self.conflicts
+        restart = 0
+        while True:
+            result = self._search(self.RESTART_UNIT * _luby(restart))
+            restart += 1
+            if result is not None:
+                break
+            if conflict_limit is not None and self.conflicts - start_conflicts >= conflict_limit:
+                break
+            self._reduce_learned()
+        if result:
+            self._model = [False] + [self._values[2 * var] == 1 for var in range(1, self.num_vars + 1)]
+        self._backtrack(0)
+        if result is False:
+            self._ok = False
+        return result
+
+    def value(self, literal: int):
+        """
+        :return: the value of literal in the model of the last successful solve
+        """
+        if self._model is None:
+            raise ValueError("No model, solve did not succeed")
+        return self._model[literal] if literal > 0 else not self._model[-literal]
+
+    def model(self):
+        """
+        :return: the true literal of every variable in the model of the last successful solve
+        """
+        return [var if self.value(var) else -var for var in range(1, self.num_vars + 1)]
+
+    def _assign(self, literal: int, reason):
+        var = literal >> 1
+        self._values[literal] = 1
+        self._values[literal ^ 1] = -1
+        self._levels[var] = len(self._trail_limits)
+        self._reasons[var] = reason
+        self._trail.append(literal)
+
+    def _propagate(self):
+        """
+        Assign every literal implied by unit clauses
+        :return: the conflicting clause, None if there is none
+        """
+        values = self._values
+        watches = self._watches
+        trail = self._trail
+        while self._queue_head < len(trail):
+            false_literal = trail[self._queue_head] ^ 1
+            self._queue_head += 1
+            self.propagations += 1
+            watchers = watches[false_literal]
+            kept = 0
+            position = 0
+            num_watchers = len(watchers)
+            while position < num_watchers:
+                clause = watchers[position]
+                position += 1
+                # keep the false literal second so the first one is the implied one
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                first = clause[0]
+                if values[first] == 1:
+                    watchers[kept] = clause
+                    kept += 1
+                    continue
+                for index in range(2, len(clause)):
+                    candidate = clause[index]
+                    if values[candidate] != -1:
+                        clause[1], clause[index] = candidate, false_literal
+                        watches[candidate].append(clause)
+                        break
+                else:
+                    watchers[kept] = clause
+                    kept += 1
+                    if values[first] == -1:
+                        # keep the watchers not visited yet
+                        while position < num_watchers:
+                            watchers[kept] = watchers[position]
+                            kept += 1
+                            position += 1
+                        del watchers[kept:]
+                        self._queue_head = len(trail)
+                        return clause
+                    self._assign(first, clause)
+            del watchers[kept:]
+        return None
+
+    def _analyze(self, conflict):
+        """
+        Resolve the conflict back to the first unique implication point of the current level
+        :return: the learned clause, its asserting literal first, and the level to jump back to
+        """
+        levels = self._levels
+        reasons = self._reasons
+        trail = self._trail
+        level = len(self._trail_limits)
+        seen = set()
+        learned = [0]
+        pending = 0
+        literal = None
+        clause = conflict
+        index = len(trail) - 1
+        while True:
+            # the first literal of a reason clause is the one it implied
+            for other in (clause if literal is None else clause[1:]):
+                var = other >> 1
+                if var not in seen and levels[var] > 0:
+                    seen.add(var)
+                    self._bump_var(var)
+                    if levels[var] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            while trail[index] >> 1 not in seen:
+                index -= 1
+            literal = trail[index]
+            index -= 1
+            # resolved away, it must not count as part of the clause for the minimization
+            seen.discard(literal >> 1)
+            pending -= 1
+            if pending == 0:
+                break
+            clause = reasons[literal >> 1]
+        learned[0] = literal ^ 1
+
+        # drop the literals implied by the other literals of the clause
+        kept = [learned[0]]
+        for other in learned[1:]:
+            reason = reasons[other >> 1]
+            if reason is None or any(item >> 1 not in seen and levels[item >> 1] > 0 for item in reason[1:]):
+                kept.append(other)
+
+        back_level = 0
+        if len(kept) > 1:
+            deepest = max(range(1, len(kept)), key=lambda position: levels[kept[position] >> 1])
+            kept[1], kept[deepest] = kept[deepest], kept[1]
+            back_level = levels[kept[1] >> 1]
+        self._bump *= 1 / self.ACTIVITY_DECAY
+        return kept, back_level
+
+    def _bump_var(self, var: int):
+        activity = self._activity
+        activity[var] += self._bump
+        if activity[var] > 1e100:
+            for index in range(1, self.num_vars + 1):
+                activity[index] *= 1e-100
+            self._bump *= 1e-100
+            self._heap = [(-activity[index], index) for index in range(1, self.num_vars + 1)
+                          if self._values[2 * index] == 0]
+            heapq.heapify(self._heap)
+        elif self._values[2 * var] == 0:
+            heapq.heappush(self._heap, (-activity[var], var))
+
+    def _backtrack(self, level: int):
+        if len(self._trail_limits) <= level:
+            return
+        start = self._trail_limits[level]
+        values = self._values
+        for literal in self._trail[start:]:
+            var = literal >> 1
+            values[literal] = values[literal ^ 1] = 0
+            self._reasons[var] = None
+            self._phases[var] = not literal & 1
+            heapq.heappush(self._heap, (-self._activity[var], var))
+        del self._trail[start:]
+        del self._trail_limits[level:]
+        self._queue_head = start
+
+    def _pick_branch(self):
+        """
+        :return: the decision literal, None if every variable is assigned
+        """
+        if len(self._heap) > 4 * self.num_vars + 64:
+            self._heap = [(-self._activity[var], var) for var in range(1, self.num_vars + 1)
+                          if self._values[2 * var] == 0]
+            heapq.heapify(self._heap)
+        heap = self._heap
+        while heap:
+            activity, var = heapq.heappop(heap)
+            # entries are pushed on every bump, the older ones are stale
+            if self._values[2 * var] == 0 and -activity == self._activity[var]:
+                return 2 * var + (not self._phases[var])
+        # stale entries of unassigned variables are gone, look the slow way
+        for var in range(1, self.num_vars + 1):
+            if self._values[2 * var] == 0:
+                return 2 * var + (not self._phases[var])
+        return None
+
+    def _search(self, max_conflicts: int):
+        """
+        :return: True on a model, False if unsatisfiable, None after max_conflicts conflicts
+        """
+        conflicts = 0
+        while True:
+            conflict = self._propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self._trail_limits:
+                    return False
+                learned, back_level = self._analyze(conflict)
+                self._backtrack(back_level)
+                if len(learned) == 1:
+                    self._assign(learned[0], None)
+                else:
+                    self._learned.append(learned)
+                    self._glue[id(learned)] = len({self._levels[literal >> 1] for literal in learned})
+                    self._watches[learned[0]].append(learned)
+                    self._watches[learned[1]].append(learned)
+                    self._assign(learned[0], learned)
+                continue
+
+            if conflicts >= max_conflicts:
+                self._backtrack(0)
+                return None
+            literal = self._pick_branch()
+            if literal is None:
+                return True
+            self.decisions += 1
+            self._trail_limits.append(len(self._trail))
+            self._assign(literal, None)
+
+    def _reduce_learned(self):
+        """
+        At the root, forget the half of the learned clauses spanning the most decision levels, clauses over
+        two levels or less are kept
+        """
+        if len(self._learned) < self._max_learned:
+            return
+        self._max_learned = int(self._max_learned * 1.1)
+        glue = self._glue
+        ordered = sorted(self._learned, key=lambda clause: glue[id(clause)])
+        half = len(ordered) // 2
+        kept = ordered[:half] + [clause for clause in ordered[half:] if glue[id(clause)] <= 2]
+        self._glue = {id(clause): glue[id(clause)] for clause in kept}
+        self._learned = kept
+
+        # at the root no clause is a reason, the watches are rebuilt from the first two literals
+        self._watches = [[] for _ in range(2 * self.num_vars + 2)]
+        for clause in self._clauses + kept:
+            self._watches[clause[0]].append(clause)
+            self._watches[clause[1]].append(clause)
+
+
+def at_most_one(solver: CDCLSolver, literals):
+    """
+    Pairwise up to 6 literals, a sequential counter above
+    """
+    literals = list(literals)
+    if len(literals) <= 6:
+        for index, first in enumerate(literals):
+            for second in literals[index + 1:]:
+                solver.add_clause([-first, -second])
+        return
+    at_most_k(solver, literals, 1)
+
+
+def exactly_one(solver: CDCLSolver, literals):
+    literals = list(literals)
+    solver.add_clause(literals)
+    at_most_one(solver, literals)
+
+
+def at_most_k(solver: CDCLSolver, literals, k: int):
+    """
+    Sinz sequential counter, counter[i][j] is true when j + 1 of the first i + 1 literals are true,
+    unit propagation enforces the bound as soon as k literals are true
+    """
+    literals = list(literals)
+    if k >= len(literals):
+        return
+    if k <= 0:
+        for literal in literals:
+            solver.add_clause([-literal])
+        return
+    counter = [solver.new_vars(k) for _ in range(len(literals) - 1)]
+    solver.add_clause([-literals[0], counter[0][0]])
+    for j in range(1, k):
+        solver.add_clause([-counter[0][j]])
+    for i in range(1, len(literals) - 1):
+        solver.add_clause([-literals[i], counter[i][0]])
+        solver.add_clause([-counter[i - 1][0], counter[i][0]])
+        for j in range(1, k):
+            solver.add_clause([-literals[i], -counter[i - 1][j - 1], counter[i][j]])
+            solver.add_clause([-counter[i - 1][j], counter[i][j]])
+        solver.add_clause([-literals[i], -counter[i - 1][k - 1]])
+    solver.add_clause([-literals[-1], -counter[-1][k - 1]])
+
+
+def at_least_k(solver: CDCLSolver, literals, k: int):
+    literals = list(literals)
+    if k > len(literals):
+        # more than there are literals, the empty clause makes the solver unsatisfiable
+        solver.add_clause([])
+        return
+    at_most_k(solver, [-literal for literal in literals], len(literals) - k)
+
+
+def exactly_k(solver: CDCLSolver, literals, k: int):
+    literals = list(literals)
+    at_most_k(solver, literals, k)
+    at_least_k(solver, literals, k)
@@ -0,0 +1,640 @@
+from collections import deque
+from functools import lru_cache
+
+import numpy as np
+
+from solver_core.constraints import encode_tango, cell_values, count_models
+from solver_core.enums import TangoBoardStates, EqualityStates
+from solver_core.instrumentation import instrumented
+from solver_core.sat import CDCLSolver
+
+# 2 bit code of the cell and relation values, sun or equal is 1, moon or not equal is 2
+CELL_CODES = np.array([TangoBoardStates.Empty.value, TangoBoardStates.Sun.value, TangoBoardStates.Moon.value],
+                      dtype=np.int8)
+
+
+@lru_cache(maxsize=None)
+def line_patterns(length: int):
+    """
+    Every valid line as a bitmask, bit i is set when cell i holds a sun
+    a valid line has as many suns as moons and never three equal symbols in a row
+    :param length: number of cells in the line
+    :return: tuple of the valid patterns
+    """
+    patterns = []
+    triple = 0b111
+    for pattern in range(1 << length):
+        if pattern.bit_count() != length // 2:
+            continue
+        if any((pattern >> index) & triple in (0, triple) for index in range(length - 2)):
+            continue
+        patterns.append(pattern)
+    return tuple(patterns)
+
+
+@lru_cache(maxsize=None)
+def relation_patterns(length: int, relations: tuple):
+    """
+    The valid line patterns that also respect the edge relations of the line
+    :param length: number of cells in the line
+    :param relations: EqualityStates values between cell i and i + 1
+    :return: tuple of the compatible patterns
+    """
+    patterns = []
+    for pattern in line_patterns(length):
+        for index, relation in enumerate(relations):
+            same = ((pattern >> index) & 1) == ((pattern >> (index + 1)) & 1)
+            if (relation == EqualityStates.Equal.value and not same) or (
+                    relation == EqualityStates.NotEqual.value and same):
+                break
+        else:
+            patterns.append(pattern)
+    return tuple(patterns)
+
+
+def line_to_masks(line: np.ndarray):
+    """
+    :return: the bitmask of the suns and the bitmask of the moons of the line
+    """
+    suns = 0
+    moons = 0
+    for index, value in enumerate(line.tolist()):
+        if value == TangoBoardStates.Sun.value:
+            suns |= 1 << index
+        elif value == TangoBoardStates.Moon.value:
+            moons |= 1 << index
+    return suns, moons
+
+
+def masks_to_line(suns: int, moons: int, length: int):
+    line = np.zeros(length, dtype=np.int8)
+    for index in range(length):
+        if (suns >> index) & 1:
+            line[index] = TangoBoardStates.Sun.value
+        elif (moons >> index) & 1:
+            line[index] = TangoBoardStates.Moon.value
+    return line
+
+
+def deduce_line(suns: int, moons: int, patterns: tuple, length: int):
+    """
+    Intersect every pattern compatible with the known cells
+    :param suns: bitmask of the known suns
+    :param moons: bitmask of the known moons
+    :param patterns: candidate patterns, see relation_patterns
+    :param length: number of cells in the line
+    :return: the forced suns and moons bitmasks, None if no pattern fits
+    """
+    always_sun = (1 << length) - 1
+    ever_sun = 0
+    found = False
+    for pattern in patterns:
+        if pattern & moons or pattern & suns != suns:
+            continue
+        always_sun &= pattern
+        ever_sun |= pattern
+        found = True
+    if not found:
+        return None
+    return always_sun, ((1 << length) - 1) & ~ever_sun
+
+
+def pack_cells(cells: np.ndarray):
+    """
+    Pack boards or relations at 2 bits per cell or edge, 4 per byte
+    :param cells: (..., H, W) array of TangoBoardStates or EqualityStates values
+    :return: (..., ceil(H * W / 4)) uint8 array
+    """
+    codes = np.mod(cells.reshape(cells.shape[:-2] + (-1,)), 3).astype(np.uint8)
+    padding = -codes.shape[-1] % 4
+    codes = np.concatenate([codes, np.zeros(codes.shape[:-1] + (padding,), dtype=np.uint8)], axis=-1)
+    codes = codes.reshape(codes.shape[:-1] + (-1, 4))
+    return codes[..., 0] | codes[..., 1] << 2 | codes[..., 2] << 4 | codes[..., 3] << 6
+
+
+def unpack_cells(packed: np.ndarray, shape: tuple):
+    """
+    :param packed: (..., ceil(H * W / 4)) array written by pack_cells
+    :param shape: (H, W) of the packed boards
+    :return: (..., H, W) int8 array
+    """
+    codes = (packed[..., None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3
+    codes = codes.reshape(packed.shape[:-1] + (-1,))[..., :shape[0] * shape[1]]
+    return CELL_CODES[codes].reshape(packed.shape[:-1] + tuple(shape))
+
+
+def order_relations(board: np.ndarray, first: np.ndarray, second: np.ndarray):
+    """
+    The connector names the relation arrays after the neighbour direction and the solver after the edge
+    direction, sort them by shape instead
+    :return: the relations between horizontal neighbours then the relations between vertical neighbours
+    """
+    if first.shape == (board.shape[0], board.shape[1] - 1):
+        return first, second
+    return second, first
+
+
+class TangoSolver:
+    # set to a SolverInstrumentation to record the rules
+    instrumentation = None
+
+    def __init__(self, tango_board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+        # boards and vertical relations
+        self.tango_board = np.array(tango_board, dtype=np.int8)
+        self.vertical_relations = np.array(vertical_relations, dtype=np.int8)
+        self.horizontal_relations = np.array(horizontal_relations, dtype=np.int8)
+
+        # working boards
+        self._working_horizontal_relations = self.horizontal_relations.copy()
+        self._working_vertical_relations = self.vertical_relations.copy()
+        self._working_tango_board = self.tango_board.copy()
+
+        # patterns allowed by the relations of every row and column
+        self.n_rows, self.n_cols = self.tango_board.shape
+        self._row_patterns = [relation_patterns(self.n_cols, tuple(relations)) for relations in
+                              self.vertical_relations.tolist()]
+        self._col_patterns = [relation_patterns(self.n_rows, tuple(relations)) for relations in
+                              self.horizontal_relations.T.tolist()]
+
+        # suns and moons of every line as bitmasks, kept in sync with the working board
+        self._row_suns = [0] * self.n_rows
+        self._row_moons = [0] * self.n_rows
+        self._col_suns = [0] * self.n_cols
+        self._col_moons = [0] * self.n_cols
+
+        self._load_masks()
+        # moves played through place as ((row, col), value, state before the move)
+        self._moves = []
+
+        self.nodes_visited = 0
+        self.lines_visited = 0
+
+    @instrumented
+    def solve(self, search: bool = True, on_forced=None, relations_first: bool = False):
+        """
+        Propagate the line rules to a fixpoint then branch if the board is not full
+        :param search: fall back to branching when propagation stalls
+        :param on_forced: called with a list of ((row, col), value) as soon as cells are known for sure,
+        first with the deductions of the propagation then with the cells found by search
+        :param relations_first: fill the cells the neighbour relations and the counting rules force,
+        see deduce level 1, before matching the lines against their patterns
+        :return: True if the board was filled
+        """
+        self.nodes_visited = 0
+        self.lines_visited = 0
+        if relations_first and not self.deduce(1):
+            return False
+        self._apply_all_relations()
+        self._load_masks()
+
+        if not self._propagate([(True, row) for row in range(self.n_rows)] +
+                               [(False, col) for col in range(self.n_cols)]):
+            return False
+        emitted = self.tango_board != TangoBoardStates.Empty.value
+        if on_forced is not None:
+            self._emit_filled(on_forced, emitted)
+
+        if search and not self.is_solved():
+            if not self._search():
+                return False
+            if on_forced is not None:
+                self._emit_filled(on_forced, emitted)
+        return self.is_solved()
+
+    def _emit_filled(self, on_forced, emitted: np.ndarray):
+        """
+        Hand the cells filled since the last call to on_forced
+        :param emitted: mask of the cells already handed over, updated in place
+        """
+        new_cells = (self._working_tango_board != TangoBoardStates.Empty.value) & ~emitted
+        if np.any(new_cells):
+            emitted |= new_cells
+            on_forced([((row, col), int(self._working_tango_board[row, col])) for row, col in
+                       zip(*np.where(new_cells))])
+
+    def is_solved(self):
+        return not np.any(self._working_tango_board == TangoBoardStates.Empty.value)
+
+    def _load_masks(self):
+        for row in range(self.n_rows):
+            self._row_suns[row], self._row_moons[row] = line_to_masks(self._working_tango_board[row])
+        for col in range(self.n_cols):
+            self._col_suns[col], self._col_moons[col] = line_to_masks(self._working_tango_board[:, col])
+
+    def _set_cell(self, row: int, col: int, value: int):
+        self._working_tango_board[row, col] = value
+        if value == TangoBoardStates.Sun.value:
+            self._row_suns[row] |= 1 << col
+            self._col_suns[col] |= 1 << row
+        else:
+            self._row_moons[row] |= 1 << col
+            self._col_moons[col] |= 1 << row
+
+    @instrumented
+    def _propagate(self, lines):
+        """
+        Deduce lines from a worklist, every filled cell puts its crossing line back in the worklist
+        :param lines: initial worklist of (is_row, index)
+        :return: False if a line has no valid pattern left
+        """
+        worklist = deque(lines)
+        queued = set(lines)
+        while worklist:
+            line = worklist.popleft()
+            queued.discard(line)
+            is_row, index = line
+            self.lines_visited += 1
+
+            if is_row:
+                suns, moons, patterns, length = self._row_suns[index], self._row_moons[index], self._row_patterns[
+                    index], self.n_cols
+            else:
+                suns, moons, patterns, length = self._col_suns[index], self._col_moons[index], self._col_patterns[
+                    index], self.n_rows
+
+            deduced = deduce_line(suns, moons, patterns, length)
+            if deduced is None:
+                if self.instrumentation is not None:
+                    self.instrumentation.count("line_without_pattern")
+                return False
+
+            new_suns = deduced[0] & ~suns
+            new_moons = deduced[1] & ~moons
+            if self.instrumentation is not None and new_suns | new_moons:
+                self._record_line_delta(is_row, index, new_suns, new_moons, length)
+            for new_cells, value in ((new_suns, TangoBoardStates.Sun.value), (new_moons, TangoBoardStates.Moon.value)):
+                while new_cells:
+                    bit = new_cells & -new_cells
+                    new_cells ^= bit
+                    position = bit.bit_length() - 1
+                    if is_row:
+                        self._set_cell(index, position, value)
+                    else:
+                        self._set_cell(position, index, value)
+
+                    crossing_line = (not is_row, position)
+                    if crossing_line not in queued:
+                        queued.add(crossing_line)
+                        worklist.append(crossing_line)
+        return True
+
+    def _record_line_delta(self, is_row: bool, index: int, new_suns: int, new_moons: int, length: int):
+        changes = []
+        for position, value in enumerate(masks_to_line(new_suns, new_moons, length).tolist()):
+            if value != TangoBoardStates.Empty.value:
+                changes.append(((index, position) if is_row else (position, index), value))
+        self.instrumentation.record_delta("{} {}".format("row" if is_row else "col", index), changes)
+
+    def _num_decided(self):
+        return int(np.count_nonzero(self._working_tango_board != TangoBoardStates.Empty.value))
+
+    def _branch_cell(self):
+        """
+        :return: the first empty cell of the line with the fewest compatible patterns, None if the board is full
+        """
+        best_line = None
+        best_count = None
+        for is_row, num_lines in ((True, self.n_rows), (False, self.n_cols)):
+            for index in range(num_lines):
+                if is_row:
+                    suns, moons, patterns = self._row_suns[index], self._row_moons[index], self._row_patterns[index]
+                    length = self.n_cols
+                else:
+                    suns, moons, patterns = self._col_suns[index], self._col_moons[index], self._col_patterns[index]
+                    length = self.n_rows
+                if (suns | moons).bit_count() == length:
+                    continue
+                count = sum(1 for pattern in patterns if not pattern & moons and pattern & suns == suns)
+                if best_count is None or count < best_count:
+                    best_line, best_count = (is_row, index, suns | moons, length), count
+
+        if best_line is None:
+            return None
+
+        is_row, index, known, length = best_line
+        empty = ~known & ((1 << length) - 1)
+        position = (empty & -empty).bit_length() - 1
+        return (index, position) if is_row else (position, index)
+
+    def _search(self):
+        """
+        Branch on an empty cell of the line with the fewest compatible patterns
+        :return: True if the board was filled, otherwise the board is left as it was found
+        """
+        self.nodes_visited += 1
+        cell = self._branch_cell()
+        if cell is None:
+            return True
+
+        row, col = cell
+        saved_state = self._save_state()
+        for value in (TangoBoardStates.Sun.value, TangoBoardStates.Moon.value):
+            self._set_cell(row, col, value)
+            if self._propagate([(True, row), (False, col)]) and self._search():
+                return True
+            self._restore_state(saved_state)
+        return False
+
+    def count_solutions(self, limit: int = 2):
+        """
+        Count the fillings of the board, the working board is left as it was
+        :param limit: stop counting once this many solutions are found, 2 is enough to check uniqueness
+        :return: number of solutions found
+        """
+        self.nodes_visited = 0
+        saved_state = self._save_state()
+        self._load_masks()
+        count = 0
+        if self._propagate([(True, row) for row in range(self.n_rows)] +
+                           [(False, col) for col in range(self.n_cols)]):
+            count = self._count(limit)
+        self._restore_state(saved_state)
+        return count
+
+    def _count(self, limit: int):
+        self.nodes_visited += 1
+        cell = self._branch_cell()
+        if cell is None:
+            return 1
+
+        row, col = cell
+        count = 0
+        saved_state = self._save_state()
+        for value in (TangoBoardStates.Sun.value, TangoBoardStates.Moon.value):
+            self._set_cell(row, col, value)
+            if self._propagate([(True, row), (False, col)]):
+                count += self._count(limit - count)
+            self._restore_state(saved_state)
+            if count >= limit:
+                break
+        return count
+
+    def deduce(self, level: int = 2):
+        """
+        Fill the cells forced by the rule sets up to level, without guessing
+        1: full counts, no three in a row and the relation of a filled neighbour,
+        see apply_fill_row_col and apply_stop_triple_row_col
+        2: the cells shared by every valid pattern of their line, see _propagate
+        :return: False if the board became contradictory
+        """
+        board = self._working_tango_board
+        while True:
+            previous_board = board.copy()
+            try:
+                for line in list(board) + list(board.T):
+                    self.apply_fill_row_col(line)
+                    self.apply_stop_triple_row_col(line)
+            except ValueError:
+                return False
+            self._apply_neighbour_relations()
+            if np.array_equal(previous_board, board):
+                break
+
+        self._load_masks()
+        if level >= 2:
+            return self._propagate([(True, row) for row in range(self.n_rows)] +
+                                   [(False, col) for col in range(self.n_cols)])
+        return all(deduce_line(self._row_suns[row], self._row_moons[row], self._row_patterns[row], self.n_cols)
+                   is not None for row in range(self.n_rows)) and all(
+            deduce_line(self._col_suns[col], self._col_moons[col], self._col_patterns[col], self.n_rows)
+            is not None for col in range(self.n_cols))
+
+    def _apply_neighbour_relations(self):
+        """
+        Fill the empty side of every relation whose other side is known, sun and moon are +1 and -1
+        so the other side is the known one times the relation
+        """
+        board = self._working_tango_board
+        for first, second, relations in ((board[:, :-1], board[:, 1:], self.vertical_relations),
+                                         (board[:-1], board[1:], self.horizontal_relations)):
+            for known, empty in ((first, second), (second, first)):
+                fill = (empty == TangoBoardStates.Empty.value) & (relations != EqualityStates.Free.value)
+                empty[fill] = (known * relations)[fill]
+
+    def place(self, cell, value: int):
+        """
+        Play one move on the working board and propagate only its row and column, and the lines they fill
+        :param cell: (row, col) of the move
+        :param value: TangoBoardStates.Sun.value or TangoBoardStates.Moon.value
+        :return: list of ((row, col), value) cells filled by the move and its consequences
+        """
+        row, col = int(cell[0]), int(cell[1])
+        current = self._working_tango_board[row, col]
+        if current != TangoBoardStates.Empty.value and current != value:
+            raise ValueError("Cell {} already holds a {}".format(cell, TangoBoardStates(current).name))
+
+        state = self._save_state()
+        self._set_cell(row, col, value)
+        if not self._propagate([(True, row), (False, col)]):
+            self._restore_state(state)
+            raise ValueError("Move {} on {} leaves a line without valid pattern".format(value, cell))
+        self._moves.append(((row, col), value, state))
+
+        new_cells = self._working_tango_board != state[0]
+        return [((int(new_row), int(new_col)), int(self._working_tango_board[new_row, new_col]))
+                for new_row, new_col in zip(*np.nonzero(new_cells))]
+
+    def retract(self, cell):
+        """
+        Take back the last move played on cell, the moves played after it are replayed on the freed board
+        """
+        cell = (int(cell[0]), int(cell[1]))
+        for move_index in range(len(self._moves) - 1, -1, -1):
+            if self._moves[move_index][0] == cell:
+                break
+        else:
+            raise ValueError("No move was played on {}".format(cell))
+
+        later_moves = self._moves[move_index + 1:]
+        self._restore_state(self._moves[move_index][2])
+        del self._moves[move_index:]
+        for later_cell, value, _ in later_moves:
+            self.place(later_cell, value)
+
+    def _save_state(self):
+        return (self._working_tango_board.copy(), list(self._row_suns), list(self._row_moons), list(self._col_suns),
+                list(self._col_moons))
+
+    def _restore_state(self, state):
+        board, row_suns, row_moons, col_suns, col_moons = state
+        self._working_tango_board[...] = board
+        self._row_suns[:], self._row_moons[:] = row_suns, row_moons
+        self._col_suns[:], self._col_moons[:] = col_suns, col_moons
+
+    def _apply_all_relations(self):
+        self._apply_relations(True)
+        self._apply_relations(False)
+
+    @instrumented
+    def solve_row_col(self, row: bool):
+        """
+        Deduce every row or every column from the valid line patterns
+        :param row: work on the rows, otherwise on the columns
+        :return: True if a cell was filled
+        """
+        working_board = self._working_tango_board
+        working_relations = self.vertical_relations
+        if not row:
+            working_board = working_board.T
+            working_relations = self.horizontal_relations.T
+
+        return self.easy_row_completion(working_board, working_relations)
+
+    @staticmethod
+    def easy_row_completion(working_board, working_relations):
+        """
+        Fill the forced cells of every line of working_board in place
+        :param working_board: lines to complete, a view on the board
+        :param working_relations: relations between the consecutive cells of each line
+        :return: True if a cell was filled
+        """
+        changed = False
+        length = working_board.shape[1]
+        for row_index, row in enumerate(working_board):
+            suns, moons = line_to_masks(row)
+            deduced = deduce_line(suns, moons, relation_patterns(length, tuple(working_relations[row_index].tolist())),
+                                  length)
+            if deduced is None:
+                raise ValueError("No valid pattern for line {}".format(row_index))
+            if deduced != (suns, moons):
+                working_board[row_index] = masks_to_line(*deduced, length)
+                changed = True
+        return changed
+
+    @staticmethod
+    def apply_fill_row_col(row):
+        num_moons = np.sum(row == TangoBoardStates.Moon.value)
+        num_suns = np.sum(row == TangoBoardStates.Sun.value)
+        # a line holds as many suns as moons
+        max_per_line = len(row) // 2
+
+        if num_moons > max_per_line or num_suns > max_per_line:
+            raise ValueError("Too many moons or suns in a row")
+
+        # if the line is full
+        if num_moons == max_per_line and num_suns == max_per_line:
+            return row
+        elif num_suns == max_per_line:
+            row[row == TangoBoardStates.Empty.value] = TangoBoardStates.Moon.value
+        elif num_moons == max_per_line:
+            row[row == TangoBoardStates.Empty.value] = TangoBoardStates.Sun.value
+
+        return row
+
+    @staticmethod
+    def apply_stop_triple_row_col(row):
+        """
+        If there are two symbols in a row the third is automatically the opposite
+        :param row:
+        :return:
+        """
+        # two consecutive equal symbols block both ends
+        for index in np.where((row[1:] == row[:-1]) & (row[1:] != TangoBoardStates.Empty.value))[0]:
+            if index + 2 < len(row) and row[index + 2] == TangoBoardStates.Empty.value:
+                row[index + 2] = -row[index]
+            if index - 1 >= 0 and row[index - 1] == TangoBoardStates.Empty.value:
+                row[index - 1] = -row[index]
+
+        # two equal symbols around an empty cell block the middle
+        for index in np.where((row[2:] == row[:-2]) & (row[2:] != TangoBoardStates.Empty.value))[0]:
+            if row[index + 1] == TangoBoardStates.Empty.value:
+                row[index + 1] = -row[index]
+        return row
+
+    def get_tango_board(self):
+        return self._working_tango_board
+
+    @instrumented
+    def _apply_relations(self, vertical: bool):
+        """
+        Apply the relations of equality to the working board
+        :param vertical: do vertical or horizontal strafing
+        :return:
+        """
+
+        def manual_transpose(list_of_xs_ys):
+            return tuple(zip(*list_of_xs_ys))
+
+        # set it up as vertical
+        if vertical:
+            working_board = self._working_vertical_relations
+        else:
+            working_board = self._working_horizontal_relations
+
+        interesting_indices_to_apply = np.where(working_board != EqualityStates.Free.value)
+
+        # loop that takes care of the equality states
+        for index in manual_transpose(interesting_indices_to_apply):
+            equal = working_board[index] == EqualityStates.Equal.value
+
+            if vertical:
+                zone_of_interest = (index[0], slice(index[1], index[1] + 2))
+            else:
+                zone_of_interest = (slice(index[0], index[0] + 2), index[1])
+
+            temp_zone_arr = self._working_tango_board[zone_of_interest]
+            # if the zone of interest is not empty or not full
+            if not np.all(temp_zone_arr == TangoBoardStates.Empty.value):
+                if not np.all((temp_zone_arr == TangoBoardStates.Moon.value) |
+                              (temp_zone_arr == TangoBoardStates.Sun.value)):
+
+                    # temporary zone to fill the spot with the equal slice
+
+                    # replace the empty spot with the other value or with the opposite of value
+                    if equal:
+                        temp_zone_arr[temp_zone_arr == TangoBoardStates.Empty.value] = temp_zone_arr[
+                            temp_zone_arr != TangoBoardStates.Empty.value][0]
+                    else:
+                        temp_zone_arr[temp_zone_arr == TangoBoardStates.Empty.value] = - temp_zone_arr[
+                            temp_zone_arr != TangoBoardStates.Empty.value][0]
+
+                    # apply the changes
+                    self._working_tango_board[zone_of_interest] = temp_zone_arr
+
+                    # get rid of the equality state
+                    working_board[index] = EqualityStates.Free.value
+                # no working value
+                working_board[index] = EqualityStates.Free.value
+
+
+class SatTangoSolver:
+    """
+    Tango encoded by solver_core.constraints and solved by the CDCL engine
+    """
+
+    def __init__(self, tango_board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+        self.tango_board = np.array(tango_board, dtype=np.int8)
+        self.vertical_relations = np.array(vertical_relations, dtype=np.int8)
+        self.horizontal_relations = np.array(horizontal_relations, dtype=np.int8)
+        self.nodes_visited = 0
+
+    def _encode(self):
+        solver = CDCLSolver()
+        return solver, encode_tango(solver, self.tango_board, self.vertical_relations, self.horizontal_relations)
+
+    def solve(self):
+        """
+        :return: True if the board was filled
+        """
+        solver, cells = self._encode()
+        solved = solver.solve()
+        self.nodes_visited = solver.decisions
+        if not solved:
+            return False
+        self.tango_board = np.where(cell_values(solver, cells), TangoBoardStates.Sun.value,
+                                    TangoBoardStates.Moon.value).astype(np.int8)
+        return True
+
+    def count_solutions(self, limit: int = 2):
+        """
+        Count the fillings of the board
+        :param limit: stop counting once this many solutions are found, 2 is enough to check uniqueness
+        :return: number of solutions found
+        """
+        solver, cells = self._encode()
+        count = count_models(solver, cells, limit)
+        self.nodes_visited = solver.decisions
+        return count
+
+    def get_tango_board(self):
+        return self.tango_board
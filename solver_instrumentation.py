@@ -0,0 +1,42 @@
+import argparse
+
+from solver_core.instrumentation import instrumented, SolverInstrumentation
+
+
+if __name__ == "__main__":
+    import numpy as np
+
+    from archive_runner import QUEENS, TANGO
+    from solver_core.queens import QueensSolver
+    from solver_core.tango import TangoSolver, order_relations
+
+    parser = argparse.ArgumentParser(description="Solve one saved board with instrumentation on")
+    subparsers = parser.add_subparsers(dest="game", required=True)
+    queens_parser = subparsers.add_parser(QUEENS)
+    queens_parser.add_argument("colors")
+    queens_parser.add_argument("queens")
+    tango_parser = subparsers.add_parser(TANGO)
+    tango_parser.add_argument("board")
+    tango_parser.add_argument("vertical_relations")
+    tango_parser.add_argument("horizontal_relations")
+    for game_parser in (queens_parser, tango_parser):
+        game_parser.add_argument("--json")
+        game_parser.add_argument("--trace", help="chrome trace event file")
+        game_parser.add_argument("--folded", help="folded stacks for flame graphs")
+    args = parser.parse_args()
+
+    if args.game == QUEENS:
+        solver = QueensSolver(np.load(args.colors), np.load(args.queens))
+    else:
+        board = np.load(args.board)
+        solver = TangoSolver(board, *order_relations(board, np.load(args.vertical_relations),
+                                                     np.load(args.horizontal_relations)))
+    solver.instrumentation = SolverInstrumentation()
+    print("solved" if solver.solve() else "not solved")
+    print(solver.instrumentation.summary())
+    if args.json:
+        solver.instrumentation.save_json(args.json)
+    if args.trace:
+        solver.instrumentation.save_chrome_trace(args.trace)
+    if args.folded:
+        solver.instrumentation.save_folded(args.folded)
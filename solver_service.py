@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from functools import partial
+
+import numpy as np
+
+from archive_runner import QUEENS, TANGO, _warm_worker
+from batch_solver import solve_queens_batch, solve_tango_batch
+from solution_cache import SolutionCache
+from solver_core.enums import SquareState
+from solver_core.tango import pack_cells, unpack_cells
+
+# a frame is a little endian uint32 payload length then the payload
+# request payload: game code, height, width then
+#   queens: the colors as one byte per square, the preplaced queens as one bit per square
+#   tango: the board, the relations between horizontal then between vertical neighbours, 2 bits per cell, see pack_cells
+# response payload: a Status then the column of the queen of every row or the packed tango board
+GAME_CODES = {QUEENS: 0, TANGO: 1}
+# a request of this code gets the metrics as json
+METRICS_CODE = 2
+# unix sockets are missing on windows, the service listens on a localhost port there
+DEFAULT_PORT = 8765
+if hasattr(socket, "AF_UNIX"):
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "queenoftango_solver.sock")
+else:
+    DEFAULT_ADDRESS = ("127.0.0.1", DEFAULT_PORT)
+
+
+class Status(Enum):
+    Ok = 0
+    Unsolved = 1
+    Error = 2
+
+
+def parse_address(text: str):
+    """
+    :return: a port number as a localhost (host, port), anything else as a unix socket path
+    """
+    if text.isdigit():
+        return "127.0.0.1", int(text)
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError("Unix sockets are not available here, give a port")
+    return text
+
+
+def encode_request(game: str, *arrays):
+    """
+    :param arrays: the puzzle in solver order, colors and queens or board and both relations
+    """
+    height, width = arrays[0].shape
+    if game == QUEENS:
+        colors, queens = arrays
+        if colors.min() < 0 or colors.max() > 255:
+            raise ValueError("Colors must fit in a byte")
+        body = colors.astype(np.uint8).tobytes() + np.packbits(queens == SquareState.Queen.value).tobytes()
+    else:
+        body = b"".join(pack_cells(np.asarray(array)).tobytes() for array in arrays)
+    return bytes([GAME_CODES[game], height, width]) + body
+
+
+def decode_request(payload: bytes):
+    """
+    :return: the game and the puzzle in solver order
+    """
+    games = {code: game for game, code in GAME_CODES.items()}
+    if len(payload) < 3 or payload[0] not in games:
+        raise ValueError("Not a board request")
+    game, height, width = games[payload[0]], payload[1], payload[2]
+    body = np.frombuffer(payload, dtype=np.uint8, offset=3)
+
+    if game == QUEENS:
+        num_squares = height * width
+        if body.size != num_squares + -(-num_squares // 8):
+            raise ValueError("Wrong payload size for a {}x{} Queens board".format(height, width))
+        colors = body[:num_squares].reshape(height, width).astype(int)
+        placed = np.unpackbits(body[num_squares:], count=num_squares).reshape(height, width).astype(bool)
+        return game, (colors, np.where(placed, SquareState.Queen.value, SquareState.Free.value))
+
+    shapes = ((height, width), (height, width - 1), (height - 1, width))
+    sizes = [-(-rows * cols // 4) for rows, cols in shapes]
+    if body.size != sum(sizes):
+        raise ValueError("Wrong payload size for a {}x{} Tango board".format(height, width))
+    arrays = []
+    offset = 0
+    for shape, size in zip(shapes, sizes):
+        arrays.append(unpack_cells(body[offset:offset + size], shape))
+        offset += size
+    return game, tuple(arrays)
+
+
+def encode_response(game: str, solution: np.ndarray | None):
+    if solution is None:
+        return bytes([Status.Unsolved.value])
+    if game == QUEENS:
+        body = np.argmax(solution == SquareState.Queen.value, axis=1).astype(np.uint8).tobytes()
+    else:
+        body = pack_cells(solution).tobytes()
+    return bytes([Status.Ok.value]) + body
+
+
+def decode_response(game: str, shape: tuple, payload: bytes):
+    """
+    :return: the solution, None if the service found none
+    """
+    status = Status(payload[0])
+    if status == Status.Error:
+        raise ValueError("The solver service could not read the board")
+    if status == Status.Unsolved:
+        return None
+    body = np.frombuffer(payload, dtype=np.uint8, offset=1)
+    if game == QUEENS:
+        solution = np.full(shape, SquareState.Occupied.value)
+        solution[np.arange(shape[0]), body] = SquareState.Queen.value
+        return solution
+    return unpack_cells(body, shape)
+
+
+def solve_boards(game: str, puzzles: list):
+    """
+    Solve boards of one game and one shape together in a pool worker, the rules run on the whole stack
+    :param puzzles: the arrays of every board in solver order
+    :return: the solution of every board, None where there is none
+    """
+    stacks = [np.stack(arrays) for arrays in zip(*puzzles)]
+    solved, success = (solve_queens_batch if game == QUEENS else solve_tango_batch)(*stacks)
+    return [solution if ok else None for solution, ok in zip(solved, success.tolist())]
+
+
+class ServiceMetrics:
+    """
+    Counters of a SolverService and the latencies of its last requests
+    """
+
+    def __init__(self, window: int = 4096):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.solves = 0
+        # requests that waited on the solve of the same board for another request
+        self.coalesced = 0
+        self.errors = 0
+        self.batches = 0
+        self.latencies = deque(maxlen=window)
+
+    def to_dict(self):
+        uptime = time.perf_counter() - self.started
+        latencies = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        return {"uptime_s": uptime, "requests": self.requests, "requests_per_s": self.requests / uptime,
+                "solves": self.solves, "coalesced": self.coalesced, "errors": self.errors, "batches": self.batches,
+                "mean_batch": self.requests / self.batches if self.batches else 0.,
+                "p50_ms": float(np.median(latencies)), "p99_ms": float(np.percentile(latencies, 99))}
+
+
+class SolverService:
+    """
+    Long running solver shared by the bot instances, requests arriving within batch_window of each other are
+    looked up in the cache together, a board several clients ask for is solved once and the misses are solved
+    on a pool of warm worker processes
+    """
+
+    def __init__(self, cache: SolutionCache, processes: int | None = None, batch_window: float = 0.002,
+                 max_batch: int = 64):
+        """
+        :param cache: shared by every client
+        :param processes: number of solver processes, defaults to the number of cores
+        :param batch_window: seconds a batch stays open after its first request
+        :param max_batch: requests after which a batch is closed early
+        """
+        self.cache = cache
+        self.processes = processes or os.cpu_count()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.metrics = ServiceMetrics()
+        self._pool = ProcessPoolExecutor(self.processes, initializer=_warm_worker)
+        self._queue = None
+        # canonical key to the (game, arrays, future) of the requests waiting on its solve
+        self._in_flight = {}
+
+    async def serve(self, address=DEFAULT_ADDRESS):
+        """
+        :param address: unix socket path or localhost (host, port)
+        """
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        # start every worker now so the first boards do not pay for it
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _warm_worker) for _ in range(self.processes)))
+        batcher = asyncio.create_task(self._batcher())
+
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._handle_client, *address)
+        elif not hasattr(socket, "AF_UNIX"):
+            raise ValueError("Unix sockets are not available here, give a (host, port)")
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = await asyncio.start_unix_server(self._handle_client, address)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            self._pool.shutdown(cancel_futures=True)
+            self.cache.close()
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(4)
+                    payload = await reader.readexactly(int.from_bytes(header, "little"))
+                except asyncio.IncompleteReadError:
+                    break
+                response = await self._respond(payload)
+                writer.write(len(response).to_bytes(4, "little") + response)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, payload: bytes):
+        if payload[:1] == bytes([METRICS_CODE]):
+            return bytes([Status.Ok.value]) + json.dumps(self.metrics_dict()).encode()
+
+        start = time.perf_counter()
+        try:
+            game, arrays = decode_request(payload)
+        except ValueError:
+            self.metrics.errors += 1
+            return bytes([Status.Error.value])
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((game, arrays, future))
+        try:
+            solution = await future
+        except ValueError:
+            return bytes([Status.Error.value])
+        self.metrics.requests += 1
+        self.metrics.latencies.append(time.perf_counter() - start)
+        return encode_response(game, solution)
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: list):
+        """
+        Answer the cached boards of a batch, then solve the distinct missing boards of every game and shape
+        as stacks, split over the workers
+        """
+        loop = asyncio.get_running_loop()
+        self.metrics.batches += 1
+        # (game, shape) to the (key, symmetry, arrays) of the boards to solve
+        groups = {}
+        for game, arrays, future in batch:
+            try:
+                key, symmetry, solution = self.cache.lookup(game, *arrays)
+            except Exception:
+                # a board the cache cannot read must not stop the batcher
+                self.metrics.errors += 1
+                _set_exception(future, ValueError("The board could not be looked up"))
+                continue
+            if solution is not None:
+                _set_result(future, solution)
+                continue
+            waiters = self._in_flight.setdefault(key, [])
+            waiters.append((game, arrays, future))
+            if len(waiters) > 1:
+                self.metrics.coalesced += 1
+                continue
+            self.metrics.solves += 1
+            groups.setdefault((game, arrays[0].shape), []).append((key, symmetry, arrays))
+
+        for (game, _), boards in groups.items():
+            chunk_size = -(-len(boards) // self.processes)
+            for start in range(0, len(boards), chunk_size):
+                chunk = boards[start:start + chunk_size]
+                solve = loop.run_in_executor(self._pool, solve_boards, game, [arrays for _, _, arrays in chunk])
+                solve.add_done_callback(partial(self._solved, game, [(key, symmetry) for key, symmetry, _ in chunk]))
+
+    def _solved(self, game: str, boards: list, solve: asyncio.Future):
+        """
+        :param boards: (key, symmetry) of the boards solved together, in the order they were sent
+        """
+        try:
+            solutions = solve.result()
+        except Exception:
+            self.metrics.errors += len(boards)
+            solutions = [None] * len(boards)
+        for (key, symmetry), solution in zip(boards, solutions):
+            waiters = self._in_flight.pop(key)
+            if solution is None:
+                for _, _, future in waiters:
+                    _set_result(future, None)
+                continue
+
+            self.cache.store(game, key, symmetry, solution)
+            # every waiter gets the solution in the orientation it sent the board in, its miss is already counted
+            for waiter_game, waiter_arrays, future in waiters:
+                _set_result(future, self.cache.lookup(waiter_game, *waiter_arrays, count=False)[2])
+
+    def metrics_dict(self):
+        return {**self.metrics.to_dict(), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
+
+
+def _set_result(future: asyncio.Future, result):
+    # the client may have gone away while waiting
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future: asyncio.Future, exception: Exception):
+    if not future.done():
+        future.set_exception(exception)
+
+
+class SolverClient:
+    """
+    Blocking client of a SolverService, solve_queens and solve_tango behave like the SolutionCache ones
+    so the bot can use either
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout: float | None = None):
+        """
+        :param address: unix socket path or localhost (host, port) of the service
+        :param timeout: seconds to wait for an answer, None to wait forever
+        """
+        self._socket = socket.socket(socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX,
+                                     socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(address)
+
+    def _request(self, payload: bytes):
+        self._socket.sendall(len(payload).to_bytes(4, "little") + payload)
+        return self._receive(int.from_bytes(self._receive(4), "little"))
+
+    def _receive(self, size: int):
+        chunks = []
+        while size:
+            chunk = self._socket.recv(size)
+            if not chunk:
+                raise ConnectionError("The solver service closed the connection")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def solve_queens(self, colors: np.ndarray, queens: np.ndarray):
+        """
+        :return: the solved queens board, None if the service found no solution
+        """
+        solution = decode_response(QUEENS, colors.shape, self._request(encode_request(QUEENS, colors, queens)))
+        return None if solution is None else solution.astype(queens.dtype)
+
+    def solve_tango(self, board: np.ndarray, vertical_relations: np.ndarray, horizontal_relations: np.ndarray):
+        """
+        :return: the solved tango board, None if the service found no solution
+        """
+        return decode_response(TANGO, board.shape, self._request(
+            encode_request(TANGO, board, vertical_relations, horizontal_relations)))
+
+    def metrics(self):
+        return json.loads(self._request(bytes([METRICS_CODE]))[1:])
+
+    def close(self):
+        self._socket.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the solvers to the bot instances of this machine")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS if isinstance(DEFAULT_ADDRESS, str) else str(DEFAULT_PORT),
+                        help="unix socket path or localhost port, a port where unix sockets are missing")
+    parser.add_argument("--cache", default="solutions.sqlite")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--batch-window-ms", type=float, default=2.)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--metrics", action="store_true", help="print the metrics of the running service")
+    args = parser.parse_args()
+
+    service_address = parse_address(args.address)
+    if args.metrics:
+        client = SolverClient(service_address)
+        print(json.dumps(client.metrics(), indent=2))
+        client.close()
+    else:
+        service = SolverService(SolutionCache(args.cache), args.processes, args.batch_window_ms / 1e3, args.max_batch)
+        try:
+            asyncio.run(service.serve(service_address))
+        except KeyboardInterrupt:
+            pass
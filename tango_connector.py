@@ -1,40 +1,54 @@
 import os
-import re
-
-import dotenv
-from enum import Enum
 
 import numpy as np
 from selenium.webdriver.common.by import By
-from bs4 import BeautifulSoup
-from selenium.webdriver.remote.webelement import WebElement
 
 from linkedin_connector import LinkedinGameConnector
-
-
-class EqualityStates(Enum):
-    Free = 0
-    Equal = 1
-    NotEqual = -1
-
-
-class TangoBoardStates(Enum):
-    Empty = 0
-    Sun = 1
-    Moon = -1
+from solver_core.enums import EqualityStates, TangoBoardStates
 
 
 class TangoConnector(LinkedinGameConnector):
-    BOARD_SHAPE = (6, 6)
-    RELATIONS_SHAPE_HORIZONTAL = (6, 5)
-    RELATIONS_SHAPE_VERTICAL = (5, 6)
-
-    def __init__(self, path_to_driver, full_screen=True, save_file='tango_test_files'):
-        super().__init__(path_to_driver, "https://linkedin.com/games/tango", full_screen=full_screen)
-        self.tango_board = np.zeros(self.BOARD_SHAPE, dtype=np.int8)
+    # an empty cell cycles through sun then moon
+    CLICKS_PER_SYMBOL = {TangoBoardStates.Sun.value: 1, TangoBoardStates.Moon.value: 2}
+    # one round trip returns the grid shape, the symbol and the edge relations of every cell and the cells themselves
+    SNAPSHOT_SCRIPT = """
+        const grid = document.querySelector('.lotka-grid');
+        const shape = ((grid.getAttribute('style') || '').match(/\\d+/g) || []).map(Number);
+        const cells = [];
+        const elements = [];
+        for (const cell of grid.children) {
+            const content = cell.querySelector('.lotka-cell-content-img');
+            let symbol = 0;
+            if (content !== null && content.tagName.toLowerCase() !== 'span') {
+                const label = content.getAttribute('aria-label');
+                symbol = label === 'Sun' ? 1 : (label === 'Moon' ? -1 : 0);
+            }
+            const edges = [];
+            for (const edge of cell.querySelectorAll('.lotka-cell-edge')) {
+                const direction = (edge.classList[1] || '').match(/\\b(right|down)\\b/);
+                const svg = edge.querySelector('svg');
+                const label = svg === null ? null : svg.getAttribute('aria-label');
+                if (direction !== null && (label === 'Equal' || label === 'Cross')) {
+                    edges.push([direction[0], label === 'Equal' ? 1 : -1]);
+                }
+            }
+            cells.push([symbol, edges]);
+            elements.push(cell);
+        }
+        return {shape: shape, cells: cells, elements: elements};
+    """
+
+    GAME_URL = "https://linkedin.com/games/tango"
+    GRID_LOCATOR = (By.CLASS_NAME, "lotka-grid")
+
+    def __init__(self, path_to_driver, full_screen=True, save_file='tango_test_files', session=None,
+                 extraction: str = 'dom'):
+        super().__init__(path_to_driver, self.GAME_URL, full_screen=full_screen, session=session,
+                         extraction=extraction)
+        self.tango_board: None | np.ndarray = None
         self.clickable_squares = []
-        self.horizontal_equals = np.zeros(self.RELATIONS_SHAPE_HORIZONTAL).astype(np.int8)
-        self.vertical_equals = np.zeros(self.RELATIONS_SHAPE_VERTICAL).astype(np.int8)
+        self.horizontal_equals: None | np.ndarray = None
+        self.vertical_equals: None | np.ndarray = None
         self.extract_board()
         self.boards_folder = save_file
 
@@ -42,68 +56,62 @@ class TangoConnector(LinkedinGameConnector):
         self.boards_folder = new_folder
 
     def extract_board(self):
-        # extract the shape
-        board_elements = self.driver.find_element(By.CLASS_NAME, "lotka-grid")
-        # fully empty board means full 0s
-        board_elements_soupified = BeautifulSoup(board_elements.get_attribute("innerHTML"), 'html.parser')
-        self.populate_moons_sun(board_elements_soupified)
-        self.populate_relations(board_elements_soupified)
-        self.populate_clickers(board_elements)
-
-    def populate_moons_sun(self, board_elements_soupified: BeautifulSoup):
-        # iterate through grid cells
-        index = 0
-        for cell in board_elements_soupified.find_all(recursive=False):
-            # append sun or Moon
-            content = cell.find(class_="lotka-cell-content-img")
-            if content is not None and content.name != 'span':
-                if content.get("aria-label") == "Sun":
-                    try:
-                        self.tango_board[int(np.floor(index / self.BOARD_SHAPE[1]))][
-                            index % self.BOARD_SHAPE[0]] = TangoBoardStates.Sun.value
-                    except IndexError:
-                        print(f"Index {index} is out of bounds")
-                        raise IndexError
-                elif content.get("aria-label") == "Moon":
-                    self.tango_board[int(np.floor(index / self.BOARD_SHAPE[1]))][
-                        index % self.BOARD_SHAPE[0]] = TangoBoardStates.Moon.value
-
-                index += 1
-
-
-    def populate_relations(self, board_elements_soupified: BeautifulSoup):
-        index = 0
-        for cell in board_elements_soupified.find_all(recursive=False):
-            # create categories
-            # iterate through all the edges found
-            edge_relations = cell.find_all(class_="lotka-cell-edge")
-
-            # check if it is a cell
-            content = cell.find(class_="lotka-cell-content-img")
-            if content is not None and content.name != 'span':
-                continue
-
-            for edge_relation in edge_relations:
-                # get the class
-                classes = edge_relation.get("class")
-                # extract right or left
-                match = re.search(r'\b(right|down)\b', classes[1])
-                if match is not None:
-                    if match.group() == "right":
-                        relation_table = self.horizontal_equals
-                    else:
-                        relation_table = self.vertical_equals
-
-                    edge_relation_type = edge_relation.find('svg').get('aria-label')
-                    if edge_relation_type == "Cross" or edge_relation_type == "Equal":
-                        relation_table[int(np.floor(index / self.BOARD_SHAPE[1]))][index % self.BOARD_SHAPE[
-                            0]] = EqualityStates.Equal.value if edge_relation_type == "Equal" else EqualityStates.NotEqual.value
-
-            index += 1
-
-    def populate_clickers(self, board_elements: WebElement):
-        for index, cell in enumerate(board_elements.find_elements(By.XPATH, './*')):
-            self.clickable_squares.append(cell)
+        if self.extraction == 'screenshot':
+            # only loaded when asked for, the default path does not need the image code
+            from png_codec import decode_png
+            from screenshot_extractor import extract_tango
+
+            screenshot, self.clickable_squares = self.screenshot_grid()
+            self.tango_board, self.horizontal_equals, self.vertical_equals = extract_tango(decode_png(screenshot))
+            return
+        snapshot = self.driver.execute_script(self.SNAPSHOT_SCRIPT)
+        self.populate_from_snapshot(snapshot)
+        self.clickable_squares = snapshot['elements']
+
+    def populate_from_snapshot(self, snapshot: dict):
+        self.tango_board, self.horizontal_equals, self.vertical_equals = self.arrays_from_snapshot(snapshot)
+
+    @staticmethod
+    def arrays_from_snapshot(snapshot: dict):
+        """
+        Read the board and the relations from the result of SNAPSHOT_SCRIPT, the shape comes from the
+        --rows / --cols of the grid style, a square grid is assumed without them
+        :return: the board, the relations with the right neighbours and with the ones below
+        """
+        num_cells = len(snapshot['cells'])
+        shape = tuple(snapshot.get('shape') or ())[:2]
+        if len(shape) < 2:
+            side = int(np.sqrt(num_cells))
+            shape = (side, side)
+        if shape[0] * shape[1] != num_cells:
+            raise ValueError("A {}x{} grid cannot have {} cells".format(*shape, num_cells))
+
+        n_rows, n_cols = shape
+        tango_board = np.full(shape, TangoBoardStates.Empty.value, dtype=np.int8)
+        right_relations = np.full((n_rows, n_cols - 1), EqualityStates.Free.value, dtype=np.int8)
+        down_relations = np.full((n_rows - 1, n_cols), EqualityStates.Free.value, dtype=np.int8)
+
+        for index, (symbol, edges) in enumerate(snapshot['cells']):
+            row, col = divmod(index, n_cols)
+            tango_board[row, col] = symbol
+            for direction, relation in edges:
+                relation_table = right_relations if direction == "right" else down_relations
+                relation_table[row, col] = relation
+        return tango_board, right_relations, down_relations
+
+    def cell_element(self, row, col):
+        return self.clickable_squares[row * self.tango_board.shape[1] + col]
+
+    def solve_board(self, solved_board: np.ndarray, mode: str = 'script'):
+        """
+        Click the symbols of the solution in the cells that are still empty
+        :param solved_board: full board of suns and moons
+        :param mode: see LinkedinGameConnector.submit_moves
+        """
+        moves = []
+        for row, col in np.column_stack(np.where(self.tango_board == TangoBoardStates.Empty.value)):
+            moves.append(((row, col), self.CLICKS_PER_SYMBOL[int(solved_board[row, col])]))
+        self.submit_moves(moves, mode)
 
     def save_boards(self, tango_name="tango_board", vertical_name="vertical_board", horizontal_name="horizontal_board",
                     use_folder=True):
@@ -138,17 +146,17 @@ class TangoConnector(LinkedinGameConnector):
     def get_vertical_relations(self):
         return self.vertical_equals
 
-    def __del__(self):
-        self.quit()
-
     def __str__(self):
         return str(self.tango_board)
 
     def quit(self):
-        self.driver.quit()
+        # a pooled session is shared with the other connectors, only close what this connector launched
+        self.close()
 
 
 if __name__ == "__main__":
+    import dotenv
+
     dotenv.load_dotenv()
     tango_connector = TangoConnector(os.getenv('PATH_TO_GECKODRIVER'), full_screen=True)
     print(tango_connector)
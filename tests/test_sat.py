@@ -0,0 +1,115 @@
+import itertools
+from math import comb
+
+import numpy as np
+import pytest
+
+from solver_core.constraints import count_models
+from solver_core.sat import CDCLSolver, at_most_one, exactly_one, at_most_k, at_least_k, exactly_k
+
+
+def _count(solver: CDCLSolver, variables, limit: int = 10000):
+    # only the assignments of variables are told apart, the counter variables of the encodings are not
+    return count_models(solver, np.array(variables), limit)
+
+
+def _brute_force(clauses, num_vars: int):
+    return sum(all(any((literal > 0) == values[abs(literal) - 1] for literal in clause) for clause in clauses)
+               for values in itertools.product((False, True), repeat=num_vars))
+
+
+@pytest.mark.parametrize("n", range(1, 9))
+@pytest.mark.parametrize("k", range(0, 5))
+def test_exactly_k_counts_every_subset_of_size_k(n, k):
+    solver = CDCLSolver(n)
+    variables = list(range(1, n + 1))
+    exactly_k(solver, variables, k)
+    assert _count(solver, variables) == comb(n, k)
+
+
+@pytest.mark.parametrize("n", range(1, 8))
+@pytest.mark.parametrize("k", range(0, 4))
+def test_at_most_and_at_least_k_counts(n, k):
+    variables = list(range(1, n + 1))
+    solver = CDCLSolver(n)
+    at_most_k(solver, variables, k)
+    assert _count(solver, variables) == sum(comb(n, size) for size in range(0, min(k, n) + 1))
+    solver = CDCLSolver(n)
+    at_least_k(solver, variables, k)
+    assert _count(solver, variables) == sum(comb(n, size) for size in range(k, n + 1))
+
+
+@pytest.mark.parametrize("n", [2, 6, 7, 12])
+def test_at_most_one_pairwise_and_sequential(n):
+    # pairwise clauses up to 6 literals, the sequential counter above
+    variables = list(range(1, n + 1))
+    solver = CDCLSolver(n)
+    at_most_one(solver, variables)
+    assert _count(solver, variables) == n + 1
+    solver = CDCLSolver(n)
+    exactly_one(solver, variables)
+    assert _count(solver, variables) == n
+
+
+def test_exactly_k_on_negated_literals():
+    solver = CDCLSolver(5)
+    exactly_k(solver, [-1, -2, 3, 4, -5], 2)
+    assert _count(solver, [1, 2, 3, 4, 5]) == comb(5, 2)
+    assert solver.solve() is False
+
+
+def test_contradictory_cardinalities_are_unsatisfiable():
+    solver = CDCLSolver(6)
+    at_most_k(solver, range(1, 7), 2)
+    at_least_k(solver, range(1, 7), 3)
+    assert solver.solve() is False
+    assert _count(solver, list(range(1, 7))) == 0
+
+
+def test_contradictory_clauses():
+    solver = CDCLSolver(2)
+    assert solver.add_clause([1, 2])
+    assert solver.add_clause([-1])
+    assert not solver.add_clause([-2])
+    assert solver.solve() is False
+    # once unsatisfiable every later clause is refused
+    assert not solver.add_clause([1])
+    assert not CDCLSolver(1).add_clause([])
+
+
+def test_unknown_literal_is_refused():
+    with pytest.raises(ValueError):
+        CDCLSolver(2).add_clause([3])
+    with pytest.raises(ValueError):
+        CDCLSolver(2).add_clause([0])
+
+
+def test_model_satisfies_the_clauses():
+    rng = np.random.default_rng(0)
+    clauses = [[int(variable) * int(sign) for variable, sign in zip(rng.choice(np.arange(1, 31), 3, replace=False),
+                                                                   rng.choice([-1, 1], 3))]
+               for _ in range(100)]
+    solver = CDCLSolver(30)
+    solver.add_clauses(clauses)
+    assert solver.solve()
+    assert all(any(solver.value(literal) for literal in clause) for clause in clauses)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_random_cnf_counts_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    num_vars = 10
+    clauses = [[int(variable) * int(sign) for variable, sign in zip(rng.choice(np.arange(1, num_vars + 1), 3,
+                                                                               replace=False),
+                                                                    rng.choice([-1, 1], 3))]
+               for _ in range(20 + 5 * seed)]
+    solver = CDCLSolver(num_vars)
+    solver.add_clauses(clauses)
+    assert _count(solver, list(range(1, num_vars + 1)), 2 ** num_vars + 1) == _brute_force(clauses, num_vars)
+
+
+def test_count_models_stops_at_the_limit():
+    solver = CDCLSolver(8)
+    assert _count(solver, list(range(1, 9)), 5) == 5
+    # the blocking clauses stay, the next count goes on from there
+    assert _count(solver, list(range(1, 9))) == 2 ** 8 - 5
@@ -0,0 +1,63 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+from png_codec import decode_png, encode_png, _unfilter_rows, _unfilter_wavefront, NONE, SUB, UP, AVERAGE, PAETH
+from screenshot_extractor import render_queens, render_tango, extract_queens, extract_tango, extract_from_png
+from solution_cache import _relabel
+from archive_runner import QUEENS, TANGO
+
+# pairs saved by python fixture_driver.py capture, <name>.png with the arrays the connector read in <name>.npz
+CAPTURED = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "fixtures", "screenshots", "*.png")))
+
+
+@pytest.mark.parametrize("filter_type", [NONE, SUB, UP, AVERAGE, PAETH, None])
+def test_png_round_trip(filter_type):
+    image = np.random.default_rng(filter_type or 0).integers(0, 256, (21, 17, 3), dtype=np.uint8)
+    # flat areas and edges like a screenshot as well as noise
+    image[5:15, 3:9] = (200, 10, 90)
+    assert np.array_equal(decode_png(encode_png(image, filter_type)), image)
+
+
+def test_row_decoding_matches_the_wavefront():
+    rng = np.random.default_rng(1)
+    for samples in (1, 3, 4):
+        lines = (rng.integers(0, 2, (30, 25, samples)) * 200).astype(np.uint8)
+        filters = rng.choice([NONE, SUB, UP, PAETH], 30).astype(np.uint8)
+        assert np.array_equal(_unfilter_rows(filters, lines), _unfilter_wavefront(filters, lines))
+
+
+def test_queens_screenshot_is_read_back():
+    rng = np.random.default_rng(2)
+    colors = np.repeat(np.repeat(rng.permutation(9).reshape(3, 3), 3, axis=0), 3, axis=1)
+    queens = np.zeros(colors.shape, dtype=int)
+    queens[[0, 4, 8], [1, 4, 6]] = 1
+    read_colors, read_queens = extract_queens(decode_png(encode_png(render_queens(colors, queens))))
+    assert np.array_equal(read_colors, _relabel(colors))
+    assert np.array_equal(read_queens, queens)
+
+
+def test_tango_screenshot_is_read_back():
+    rng = np.random.default_rng(3)
+    board = rng.choice([-1, 0, 0, 1], (6, 6)).astype(np.int8)
+    right_relations = rng.choice([-1, 0, 0, 1], (6, 5)).astype(np.int8)
+    down_relations = rng.choice([-1, 0, 0, 1], (5, 6)).astype(np.int8)
+    arrays = extract_tango(decode_png(encode_png(render_tango(board, right_relations, down_relations))))
+    for read, expected in zip(arrays, (board, right_relations, down_relations)):
+        assert np.array_equal(read, expected)
+
+
+@pytest.mark.skipif(not CAPTURED, reason="no captured screenshot in tests/fixtures/screenshots")
+@pytest.mark.parametrize("path", CAPTURED)
+def test_captured_screenshot_is_read_like_the_page(path):
+    game = QUEENS if os.path.basename(path).startswith(QUEENS) else TANGO
+    with open(path, "rb") as screenshot:
+        arrays = extract_from_png(game, screenshot.read())
+    with np.load(os.path.splitext(path)[0] + ".npz") as expected_file:
+        expected = [expected_file["arr_{}".format(index)] for index in range(len(expected_file.files))]
+    if game == QUEENS:
+        expected[0] = _relabel(expected[0])
+    for read, expected_array in zip(arrays, expected):
+        assert np.array_equal(read, expected_array)
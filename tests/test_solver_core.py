@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+
+from benchmarks.generators import queens_puzzle, tango_puzzle
+from portfolio import verify_queens, verify_tango
+from solver_core import (QueensSolver, BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver, TangoSolver,
+                         SatTangoSolver, SquareState, TangoBoardStates)
+
+QUEENS_SOLVERS = [QueensSolver, BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver]
+# QueensSolver only solves, the others count as well
+COUNTING_QUEENS_SOLVERS = [BitboardQueensSolver, DancingLinksQueensSolver, SatQueensSolver]
+TANGO_SOLVERS = [TangoSolver, SatTangoSolver]
+
+QUEENS_PUZZLES = [(size, seed) for size in (6, 7, 8, 9) for seed in range(3)]
+TANGO_PUZZLES = [(size, seed) for size in (4, 6, 8) for seed in range(3)]
+
+
+def _queens(colors: np.ndarray, given: np.ndarray | None = None):
+    queens = np.zeros(colors.shape, dtype=int)
+    if given is not None:
+        queens[given] = SquareState.Queen.value
+    return queens
+
+
+def _placed(solution: np.ndarray):
+    return np.asarray(solution) == SquareState.Queen.value
+
+
+@pytest.mark.parametrize("solver_class", QUEENS_SOLVERS)
+@pytest.mark.parametrize("size, seed", QUEENS_PUZZLES)
+def test_queens_solvers_find_the_unique_solution(solver_class, size, seed):
+    colors, solution = queens_puzzle(size, seed)
+    queens = _queens(colors)
+    solver = solver_class(colors, queens.copy())
+    assert solver.solve()
+    assert verify_queens(colors, queens, solver.get_queens())
+    assert np.array_equal(_placed(solver.get_queens()), _placed(solution))
+
+
+@pytest.mark.parametrize("solver_class", QUEENS_SOLVERS)
+def test_queens_solvers_keep_the_preplaced_queen(solver_class):
+    colors, solution = queens_puzzle(8, 5)
+    queens = _queens(colors, tuple(np.argwhere(_placed(solution))[3]))
+    solver = solver_class(colors, queens.copy())
+    assert solver.solve()
+    assert np.array_equal(_placed(solver.get_queens()), _placed(solution))
+
+
+@pytest.mark.parametrize("solver_class", COUNTING_QUEENS_SOLVERS)
+@pytest.mark.parametrize("size, seed", QUEENS_PUZZLES)
+def test_generated_queens_boards_have_one_solution(solver_class, size, seed):
+    colors, _ = queens_puzzle(size, seed)
+    assert solver_class(colors, _queens(colors)).count_solutions(2) == 1
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_queens_counts_agree_on_ambiguous_boards(seed):
+    rng = np.random.default_rng(seed)
+    # every row its own color, with a few squares given to the row below, leaves many solutions
+    colors = np.repeat(np.arange(7)[:, None], 7, axis=1)
+    moved = rng.random(colors.shape) < 0.15
+    colors[:-1][moved[:-1]] += 1
+    # a limit above the few hundred solutions so every engine enumerates all of them
+    counts = {solver_class.__name__: solver_class(colors, _queens(colors)).count_solutions(10000)
+              for solver_class in COUNTING_QUEENS_SOLVERS}
+    assert len(set(counts.values())) == 1, counts
+    assert 1 < counts["BitboardQueensSolver"] < 10000
+
+
+@pytest.mark.parametrize("solver_class", QUEENS_SOLVERS)
+def test_queens_solvers_reject_a_wrong_preplaced_queen(solver_class):
+    colors, solution = queens_puzzle(7, 1)
+    # the board has one solution, a queen anywhere else leaves none
+    wrong = tuple(np.argwhere(~_placed(solution))[0])
+    solver = solver_class(colors, _queens(colors, wrong))
+    assert not solver.solve()
+
+
+@pytest.mark.parametrize("solver_class", COUNTING_QUEENS_SOLVERS)
+def test_queens_count_is_zero_without_solution(solver_class):
+    colors, solution = queens_puzzle(7, 1)
+    wrong = tuple(np.argwhere(~_placed(solution))[0])
+    assert solver_class(colors, _queens(colors, wrong)).count_solutions(2) == 0
+
+
+@pytest.mark.parametrize("solver_class", TANGO_SOLVERS)
+@pytest.mark.parametrize("size, seed", TANGO_PUZZLES)
+def test_tango_solvers_find_the_unique_solution(solver_class, size, seed):
+    board, vertical_relations, horizontal_relations, solution = tango_puzzle(size, seed)
+    solver = solver_class(board.copy(), vertical_relations.copy(), horizontal_relations.copy())
+    assert solver.solve()
+    assert verify_tango(board, vertical_relations, horizontal_relations, solver.get_tango_board())
+    assert np.array_equal(solver.get_tango_board(), solution)
+
+
+@pytest.mark.parametrize("solver_class", TANGO_SOLVERS)
+@pytest.mark.parametrize("size, seed", TANGO_PUZZLES)
+def test_generated_tango_boards_have_one_solution(solver_class, size, seed):
+    board, vertical_relations, horizontal_relations, _ = tango_puzzle(size, seed)
+    assert solver_class(board.copy(), vertical_relations.copy(), horizontal_relations.copy()).count_solutions(2) == 1
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_tango_counts_agree_on_open_boards(seed):
+    rng = np.random.default_rng(seed)
+    # two givens and two relations each way leave a hundred or more solutions
+    board = np.zeros((6, 6), dtype=np.int8)
+    board.flat[rng.choice(36, 2, replace=False)] = rng.choice([TangoBoardStates.Sun.value,
+                                                                TangoBoardStates.Moon.value], 2)
+    vertical_relations = np.zeros((6, 5), dtype=np.int8)
+    horizontal_relations = np.zeros((5, 6), dtype=np.int8)
+    for relations in (vertical_relations, horizontal_relations):
+        relations.flat[rng.choice(30, 2, replace=False)] = rng.choice([-1, 1], 2)
+    counts = [solver_class(board.copy(), vertical_relations.copy(), horizontal_relations.copy()).count_solutions(10000)
+              for solver_class in TANGO_SOLVERS]
+    assert counts[0] == counts[1]
+    assert 1 < counts[0] < 10000
+
+
+def test_empty_tango_boards_are_counted_alike():
+    # no balanced line of 4 has three equal symbols in a row, so these are the 90 4x4 0/1 matrices with two ones
+    # in every row and column
+    board = np.zeros((4, 4), dtype=np.int8)
+    vertical_relations = np.zeros((4, 3), dtype=np.int8)
+    horizontal_relations = np.zeros((3, 4), dtype=np.int8)
+    for solver_class in TANGO_SOLVERS:
+        assert solver_class(board.copy(), vertical_relations, horizontal_relations).count_solutions(1000) == 90
+
+
+@pytest.mark.parametrize("solver_class", TANGO_SOLVERS)
+def test_tango_solvers_reject_three_equal_givens(solver_class):
+    board = np.zeros((6, 6), dtype=np.int8)
+    board[0, :3] = TangoBoardStates.Sun.value
+    vertical_relations = np.zeros((6, 5), dtype=np.int8)
+    horizontal_relations = np.zeros((5, 6), dtype=np.int8)
+    assert not solver_class(board.copy(), vertical_relations, horizontal_relations).solve()
+    assert solver_class(board.copy(), vertical_relations, horizontal_relations).count_solutions(2) == 0
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from benchmarks.generators import queens_puzzle
+from portfolio import verify_queens
+from solution_cache import SolutionCache
+from solver_service import SolverService, SolverClient
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="the test service listens on a unix socket")
+
+
+@pytest.fixture
+def service(tmp_path):
+    address = str(tmp_path / "solver.sock")
+    # a wide window so the requests sent together land in one batch
+    solver_service = SolverService(SolutionCache(None), processes=1, batch_window=0.3)
+    loop = asyncio.new_event_loop()
+    serving = loop.create_task(solver_service.serve(address))
+
+    def run():
+        try:
+            loop.run_until_complete(serving)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not os.path.exists(address):
+        assert time.monotonic() < deadline, "the service did not start"
+        time.sleep(0.05)
+    yield address
+    # cancelling serve shuts the worker pool down
+    loop.call_soon_threadsafe(serving.cancel)
+    thread.join(30)
+    loop.close()
+
+
+def _puzzle(seed: int):
+    colors, _ = queens_puzzle(6, seed)
+    return colors, np.zeros(colors.shape, dtype=int)
+
+
+def test_cache_hits_and_misses_are_counted_once(service):
+    address = service
+    puzzles = [_puzzle(seed) for seed in range(4)]
+
+    # the same board in two orientations in one batch, solved once, each request is a miss
+    first_colors, first_queens = puzzles[0]
+    barrier = threading.Barrier(2)
+    solutions = [None, None]
+
+    def send(index, colors, queens):
+        client = SolverClient(address, timeout=60)
+        barrier.wait()
+        solutions[index] = client.solve_queens(colors, queens)
+        client.close()
+
+    threads = [threading.Thread(target=send, args=(0, first_colors, first_queens)),
+               threading.Thread(target=send, args=(1, np.rot90(first_colors), np.rot90(first_queens)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert verify_queens(first_colors, first_queens, solutions[0])
+    assert verify_queens(np.rot90(first_colors), np.rot90(first_queens), solutions[1])
+
+    client = SolverClient(address, timeout=60)
+    for colors, queens in puzzles[1:]:
+        assert verify_queens(colors, queens, client.solve_queens(colors, queens))
+    # the transposes are symmetries of boards already solved
+    for colors, queens in puzzles:
+        assert verify_queens(colors.T, queens.T, client.solve_queens(colors.T, queens.T))
+    metrics = client.metrics()
+    client.close()
+
+    assert metrics["cache_misses"] == 5
+    assert metrics["cache_hits"] == 4
+    assert metrics["solves"] == 4
+    assert metrics["coalesced"] == 1
+    assert metrics["errors"] == 0